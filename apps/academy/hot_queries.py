@@ -0,0 +1,16 @@
+"""
+Academy - Consultas críticas auditadas por `manage.py explain_hot_queries`
+"""
+from apps.core.hot_queries import register
+
+from .models import WaitlistEntry
+
+
+@register('academy.waitlist_admin')
+def waitlist_admin():
+    return WaitlistEntry.objects.order_by('-created_at')[:100]
+
+
+@register('academy.waitlist_unconfirmed')
+def waitlist_unconfirmed():
+    return WaitlistEntry.objects.filter(is_confirmed=False).order_by('-created_at')[:100]
@@ -40,6 +40,15 @@ class WaitlistEntry(models.Model):
         verbose_name = 'Inscripción lista de espera'
         verbose_name_plural = 'Lista de espera'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='waitlist_created_idx'),
+            # Inscripciones pendientes de confirmar
+            models.Index(
+                fields=['-created_at'],
+                name='waitlist_unconfirmed_idx',
+                condition=models.Q(is_confirmed=False)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.email} - {self.company or 'Sin empresa'}"
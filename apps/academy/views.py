@@ -1,16 +1,16 @@
 """
 Academy - Vistas para IAlfabetización
 """
-from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.db import IntegrityError
+from apps.core.pagecache import cached_page
 from .models import WaitlistEntry
 
 
 def program(request):
     """Vista del programa de IAlfabetización (si se separa de la home)."""
-    return render(request, 'academy/program.html')
+    return cached_page(request, 'academy/program.html')
 
 
 @require_POST
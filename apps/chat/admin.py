@@ -1,8 +1,10 @@
 """
 Chat - Configuración del Admin
 """
-from django.contrib import admin
-from .models import ChatSession, ChatMessage, KnowledgeDocument
+from django.contrib import admin, messages
+from .cache import response_cache
+from .models import ChatDailyStats, ChatJob, ChatSession, ChatMessage, KnowledgeDocument
+from .stats import recent_stats
 
 
 class ChatMessageInline(admin.TabularInline):
@@ -20,14 +22,21 @@ class ChatSessionAdmin(admin.ModelAdmin):
     list_display = ['session_id', 'user_email', 'total_messages', 'is_active', 'created_at', 'updated_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['session_id', 'user_email', 'user_name']
-    readonly_fields = ['session_id', 'created_at', 'updated_at', 'total_messages', 'history', 'summary']
+    readonly_fields = ['session_id', 'created_at', 'updated_at', 'total_messages', 'history', 'summary', 'summary_until']
     inlines = [ChatMessageInline]
+    # Resumen diario sobre la lista (desde ChatDailyStats, no desde ChatMessage)
+    change_list_template = 'admin/chat/chatsession/change_list.html'
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'daily_stats': recent_stats(14)}
+        return super().changelist_view(request, extra_context=extra_context)
 
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ['session', 'role', 'content_preview', 'created_at']
     list_filter = ['role', 'created_at']
+    list_select_related = ['session']
     search_fields = ['content', 'session__session_id']
     readonly_fields = ['created_at']
     
@@ -42,3 +51,42 @@ class KnowledgeDocumentAdmin(admin.ModelAdmin):
     list_filter = ['category', 'is_indexed', 'is_active']
     search_fields = ['title', 'content']
     readonly_fields = ['created_at', 'updated_at', 'indexed_at']
+    actions = ['invalidate_response_cache']
+    
+    @admin.action(description='Invalidar caché de respuestas del chatbot')
+    def invalidate_response_cache(self, request, queryset):
+        stats = response_cache.stats()
+        response_cache.invalidate()
+        self.message_user(
+            request,
+            f"Caché invalidada ({stats['size']} entradas, "
+            f"{stats['hits']} hits / {stats['misses']} misses en este worker).",
+            messages.SUCCESS
+        )
+
+
+@admin.register(ChatJob)
+class ChatJobAdmin(admin.ModelAdmin):
+    list_display = ['job_id', 'kind', 'status', 'attempts', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['session']
+    search_fields = ['job_id', 'session__session_id']
+    readonly_fields = [
+        'job_id', 'session', 'kind', 'message', 'status', 'result', 'error',
+        'attempts', 'worker', 'created_at', 'started_at', 'finished_at'
+    ]
+
+
+@admin.register(ChatDailyStats)
+class ChatDailyStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        'date', 'turns', 'sessions', 'cache_hits', 'avg_latency_ms', 'p95_latency_ms',
+        'p95_ttft_ms', 'avg_retrieval_ms', 'prompt_tokens', 'completion_tokens'
+    ]
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
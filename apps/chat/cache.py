@@ -0,0 +1,149 @@
+"""
+Chat - Caché de respuestas del chatbot
+
+La mayoría del tráfico son las mismas preguntas (precios, ubicación,
+IAlfabetización). Cada respuesta se cachea por:
+- mensaje del usuario normalizado (minúsculas, sin acentos ni puntuación)
+- hash del system prompt y del contexto recuperado (RAG / historial)
+
+Características:
+- TTL por entrada y desalojo LRU al superar el tamaño máximo
+- contadores de hits/misses
+- invalidación global (admin o cambios en KnowledgeDocument) propagada a
+  todos los workers del host mediante un archivo "stamp" compartido
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from .text import fold_accents
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántos segundos se revisa el stamp de invalidación compartido
+STAMP_CHECK_INTERVAL = 1.0
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Normaliza una pregunta: '¿Cuál es el PRECIO?' -> 'cual es el precio'."""
+    text = _PUNCTUATION_RE.sub(' ', fold_accents(text))
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def fingerprint(*parts: str) -> str:
+    """Hash estable de una o más cadenas."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Caché LRU en memoria con TTL, contadores e invalidación entre workers."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 3600,
+        stamp_path: Optional[Path] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stamp: Optional[int] = None
+        self._stamp_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, message: str, system_prompt: str, context: str = '') -> str:
+        """Clave de caché: mensaje normalizado + hash de prompt y contexto."""
+        return fingerprint(normalize_message(message), fingerprint(system_prompt, context))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna el valor cacheado o None (cuenta hit/miss)."""
+        self._check_stamp()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Vacía la caché de este proceso y notifica al resto de workers."""
+        self.clear()
+        if self.stamp_path is not None:
+            try:
+                self.stamp_path.parent.mkdir(parents=True, exist_ok=True)
+                self.stamp_path.touch()
+                self._stamp = self.stamp_path.stat().st_mtime_ns
+            except OSError as e:
+                logger.warning("No se pudo escribir el stamp de caché: %s", e)
+        logger.info("Caché de respuestas del chatbot invalidada")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
+
+    def _check_stamp(self) -> None:
+        """Si otro worker invalidó la caché, vaciar la local."""
+        if self.stamp_path is None:
+            return
+        now = time.monotonic()
+        if now - self._stamp_checked_at < STAMP_CHECK_INTERVAL:
+            return
+        self._stamp_checked_at = now
+        try:
+            stamp = os.stat(self.stamp_path).st_mtime_ns
+        except OSError:
+            stamp = 0
+        if self._stamp is None:
+            self._stamp = stamp
+        elif stamp != self._stamp:
+            self._stamp = stamp
+            self.clear()
+
+
+response_cache = ResponseCache(
+    max_entries=settings.CHAT_RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.CHAT_RESPONSE_CACHE_TTL,
+    stamp_path=Path(settings.CHAT_DATA_DIR) / 'response-cache.stamp',
+)
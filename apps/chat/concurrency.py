@@ -0,0 +1,198 @@
+"""
+Chat - Límite global de llamadas concurrentes al LLM (por host)
+
+Ante un pico de tráfico es mejor que algunas solicitudes respondan rápido
+y otras reciban 503, a que todas se vuelvan lentas. ConcurrencyGate es un
+semáforo entre procesos (todos los workers de gunicorn y chat_worker del
+host) basado en file locks (flock):
+- CHAT_LLM_MAX_CONCURRENCY archivos "slot": quien tiene el lock de uno
+  está llamando al LLM
+- CHAT_LLM_QUEUE_SIZE archivos "queue": cola de espera acotada; si no hay
+  slot ni lugar en la cola se rechaza de inmediato (LLMOverloadedError)
+- quien espera en la cola más de CHAT_LLM_QUEUE_TIMEOUT también se rechaza
+
+Los locks los libera el kernel al cerrar el archivo, incluso si el
+proceso muere: no quedan slots tomados por workers caídos. La cola no es
+FIFO estricta (los que esperan reintentan con backoff).
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin límite entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Retry-After sugerido al rechazar por sobrecarga
+SHED_RETRY_AFTER = 5
+
+
+class LLMOverloadedError(Exception):
+    """No hay capacidad para otra llamada al LLM (responder 503)."""
+
+    def __init__(self, message: str, retry_after: int = SHED_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyGate:
+    """Semáforo entre procesos con cola de espera acotada."""
+
+    SLOT = 'slot'
+    QUEUE = 'queue'
+
+    def __init__(
+        self,
+        directory: Path,
+        limit: int,
+        queue_size: int = 0,
+        queue_timeout: float = 10.0,
+        poll_interval: float = 0.02,
+        max_poll_interval: float = 0.25
+    ):
+        self.directory = Path(directory)
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.shed = 0  # rechazos en este proceso
+        self._ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0 and fcntl is not None
+
+    @contextmanager
+    def slot(self):
+        """Ocupa un slot mientras dura el bloque (sync)."""
+        if not self.enabled:
+            yield
+            return
+        fd = self._lock_any(self.SLOT, self.limit)
+        if fd is None:
+            fd = self._wait_in_queue()
+        try:
+            yield
+        finally:
+            os.close(fd)
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Versión async de slot(): espera en la cola sin bloquear el event loop."""
+        if not self.enabled:
+            yield
+            return
+        fd = self._lock_any(self.SLOT, self.limit)
+        if fd is None:
+            fd = await self._await_in_queue()
+        try:
+            yield
+        finally:
+            os.close(fd)
+
+    def stats(self) -> Dict[str, int]:
+        """Llamadas en curso y en cola en todo el host (más rechazos de este proceso)."""
+        enabled = self.enabled
+        return {
+            'limit': self.limit,
+            'in_flight': self._count_locked(self.SLOT, self.limit) if enabled else 0,
+            'queue_size': self.queue_size,
+            'queued': self._count_locked(self.QUEUE, self.queue_size) if enabled else 0,
+            'shed': self.shed,
+        }
+
+    def _wait_in_queue(self) -> int:
+        ticket = self._enter_queue()
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            interval = self.poll_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._overloaded('tiempo de espera en cola agotado')
+                time.sleep(min(interval, remaining))
+                fd = self._lock_any(self.SLOT, self.limit)
+                if fd is not None:
+                    return fd
+                interval = min(interval * 2, self.max_poll_interval)
+        finally:
+            os.close(ticket)
+
+    async def _await_in_queue(self) -> int:
+        ticket = self._enter_queue()
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            interval = self.poll_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._overloaded('tiempo de espera en cola agotado')
+                await asyncio.sleep(min(interval, remaining))
+                fd = self._lock_any(self.SLOT, self.limit)
+                if fd is not None:
+                    return fd
+                interval = min(interval * 2, self.max_poll_interval)
+        finally:
+            os.close(ticket)
+
+    def _enter_queue(self) -> int:
+        ticket = self._lock_any(self.QUEUE, self.queue_size) if self.queue_size > 0 else None
+        if ticket is None:
+            raise self._overloaded('cola de espera llena')
+        return ticket
+
+    def _overloaded(self, reason: str) -> LLMOverloadedError:
+        self.shed += 1
+        logger.warning("LLM sobrecargado (%s): solicitud rechazada", reason)
+        return LLMOverloadedError(f"Servicio saturado: {reason}")
+
+    def _path(self, kind: str, index: int) -> str:
+        if not self._ready:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._ready = True
+        return str(self.directory / f"{kind}-{index}.lock")
+
+    def _lock_any(self, kind: str, count: int) -> Optional[int]:
+        """Toma el lock de algún archivo libre (sin bloquear). Retorna el fd o None."""
+        # Empezar en un índice aleatorio reparte los intentos entre archivos
+        start = random.randrange(count) if count else 0
+        for offset in range(count):
+            fd = os.open(self._path(kind, (start + offset) % count), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def _count_locked(self, kind: str, count: int) -> int:
+        locked = 0
+        for index in range(count):
+            fd = os.open(self._path(kind, index), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                locked += 1
+            finally:
+                os.close(fd)
+        return locked
+
+
+llm_gate = ConcurrencyGate(
+    Path(settings.CHAT_DATA_DIR) / 'llm-gate',
+    limit=settings.CHAT_LLM_MAX_CONCURRENCY,
+    queue_size=settings.CHAT_LLM_QUEUE_SIZE,
+    queue_timeout=settings.CHAT_LLM_QUEUE_TIMEOUT,
+)
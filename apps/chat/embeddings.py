@@ -0,0 +1,71 @@
+"""
+Chat - Modelos de embeddings para RAG
+
+- HashingEmbedder: local, sin servicios externos (feature hashing de
+  palabras y bigramas). Determinista entre procesos.
+- GeminiEmbedder: embeddings semánticos vía Google (text-embedding-004).
+"""
+import zlib
+from typing import List
+
+import numpy as np
+
+from .services import Embedder
+from .text import tokenize
+
+
+class HashingEmbedder(Embedder):
+    """
+    Embeddings por feature hashing (signed hashing trick).
+    Útil para desarrollo y como fallback sin API key.
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+
+    def embed(self, texts: List[str], task: str = 'document') -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                matrix[row, h % self.dimension] += sign
+        return _l2_normalize(matrix)
+
+
+class GeminiEmbedder(Embedder):
+    """Embeddings de Google Gemini (requiere GOOGLE_API_KEY)."""
+
+    TASK_TYPES = {
+        'document': 'retrieval_document',
+        'query': 'retrieval_query',
+    }
+
+    def __init__(self, model: str = 'models/text-embedding-004', dimension: int = 768):
+        self.model = model
+        self.dimension = dimension
+
+    def embed(self, texts: List[str], task: str = 'document') -> np.ndarray:
+        import google.generativeai as genai
+        from .gemini import registry
+
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        if not registry.configure():
+            raise RuntimeError("GOOGLE_API_KEY no configurada")
+
+        result = genai.embed_content(
+            model=self.model,
+            content=texts,
+            task_type=self.TASK_TYPES.get(task, 'retrieval_document'),
+        )
+        return _l2_normalize(np.asarray(result['embedding'], dtype=np.float32))
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza filas a norma 1 (coseno = producto punto)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
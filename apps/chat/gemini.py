@@ -0,0 +1,131 @@
+"""
+Chat - Registro de Gemini a nivel de proceso
+
+Evita repetir trabajo en cada turno de chat:
+- genai.configure() se ejecuta una sola vez por proceso (o si cambia la API key)
+- los GenerativeModel se cachean por (modelo, system instruction) con LRU;
+  el system instruction es estático (turns.GEMINI_SYSTEM_PROMPT) y los
+  datos de cada sesión van en el historial, así hay un modelo por prompt
+  y no uno por conversación
+- si el modelo principal falla al construirse, se usa el fallback
+  durante un tiempo sin reintentar en cada request
+
+El warm-up se ejecuta al iniciar cada worker (ver gunicorn.conf.py).
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_MODEL = "gemini-flash-latest"
+FALLBACK_MODEL = "gemini-pro"
+
+# Cantidad máxima de modelos cacheados (una entrada por modelo y system
+# prompt estático: chat, resumen de memoria)
+MAX_CACHED_MODELS = 16
+
+# Segundos antes de reintentar un modelo que falló al construirse
+FAILED_MODEL_RETRY_SECONDS = 300
+
+
+class GeminiRegistry:
+    """Configuración del SDK y pool de GenerativeModel compartidos por el proceso."""
+
+    def __init__(self, max_models: int = MAX_CACHED_MODELS):
+        self.max_models = max_models
+        self._lock = threading.Lock()
+        self._configured_key: Optional[str] = None
+        self._models: "OrderedDict[Tuple[str, str], genai.GenerativeModel]" = OrderedDict()
+        self._failed_until = {}
+
+    def configure(self) -> bool:
+        """Configura el SDK si hace falta. Retorna False si no hay API key."""
+        api_key = os.environ.get("GOOGLE_API_KEY")
+        if not api_key:
+            return False
+        if api_key == self._configured_key:
+            return True
+        with self._lock:
+            if api_key != self._configured_key:
+                genai.configure(api_key=api_key)
+                self._configured_key = api_key
+                self._models.clear()
+        return True
+
+    def get_model(self, system_instruction: str) -> Tuple["genai.GenerativeModel", str]:
+        """
+        Retorna (model, model_name) para el system instruction dado.
+        Usa el modelo principal y, si falla su construcción, el fallback.
+        """
+        if time.monotonic() >= self._failed_until.get(PRIMARY_MODEL, 0):
+            try:
+                return self._get_or_create(PRIMARY_MODEL, system_instruction), PRIMARY_MODEL
+            except Exception as e:
+                logger.warning("Error initializing model %s: %s", PRIMARY_MODEL, e)
+                self._failed_until[PRIMARY_MODEL] = time.monotonic() + FAILED_MODEL_RETRY_SECONDS
+
+        return self._get_or_create(FALLBACK_MODEL, system_instruction), FALLBACK_MODEL
+
+    def get_named_model(self, model_name: str, system_instruction: str) -> "genai.GenerativeModel":
+        """Modelo específico, sin fallback (el failover lo maneja el llamador)."""
+        return self._get_or_create(model_name, system_instruction)
+
+    def _get_or_create(self, model_name: str, system_instruction: str):
+        key = (model_name, system_instruction)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+        model = genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=system_instruction
+        )
+
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    def warm_up(self) -> None:
+        """
+        Configura el SDK y construye los modelos que usan los turnos (chat
+        con el principal y el fallback, resumen de memoria), para que el
+        primer turno del worker no pague ese costo. Con GEMINI_WARM_UP_PING
+        además consulta el modelo principal a la API.
+        """
+        from django.conf import settings
+        from .memory import SUMMARY_INSTRUCTION
+        from .turns import GEMINI_SYSTEM_PROMPT
+
+        if not self.configure():
+            logger.info("GOOGLE_API_KEY no configurada - warm-up de Gemini omitido")
+            return
+        try:
+            for model_name in (PRIMARY_MODEL, FALLBACK_MODEL):
+                self.get_named_model(model_name, GEMINI_SYSTEM_PROMPT)
+            self.get_named_model(PRIMARY_MODEL, SUMMARY_INSTRUCTION)
+            if settings.GEMINI_WARM_UP_PING:
+                genai.get_model(f"models/{PRIMARY_MODEL}")
+            logger.info("Gemini warm-up completo (%s modelos)", len(self._models))
+        except Exception as e:
+            logger.warning("Gemini warm-up falló: %s", e)
+
+    def clear(self) -> None:
+        """Vacía el pool de modelos (útil en tests o al rotar la API key)."""
+        with self._lock:
+            self._models.clear()
+            self._failed_until.clear()
+            self._configured_key = None
+
+
+registry = GeminiRegistry()
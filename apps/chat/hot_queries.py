@@ -0,0 +1,64 @@
+"""
+Chat - Consultas críticas auditadas por `manage.py explain_hot_queries`
+"""
+from django.db.models import F, Q
+
+from apps.core.hot_queries import register
+
+from .models import ChatMessage, ChatSession, KnowledgeDocument
+
+
+@register('chat.history_page')
+def history_page():
+    """Última página del historial de una sesión (/chat/history/)."""
+    return ChatMessage.objects.filter(session_id=1).order_by('-created_at', '-id')[:51]
+
+
+@register('chat.history_since')
+def history_since():
+    """Polling incremental del widget (?since=<cursor>)."""
+    return ChatMessage.objects.filter(session_id=1).filter(
+        Q(created_at__gt='2026-01-01T00:00:00Z') | Q(created_at='2026-01-01T00:00:00Z', id__gt=1)
+    ).order_by('created_at', 'id')[:51]
+
+
+@register('chat.session_admin')
+def session_admin():
+    """Changelist de sesiones (orden por defecto -updated_at)."""
+    return ChatSession.objects.order_by('-updated_at')[:100]
+
+
+@register('chat.active_sessions')
+def active_sessions():
+    return ChatSession.objects.filter(is_active=True).order_by('-updated_at')[:100]
+
+
+@register('chat.message_admin')
+def message_admin():
+    return ChatMessage.objects.select_related('session').order_by('created_at')[:100]
+
+
+@register('chat.documents_to_index')
+def documents_to_index():
+    """Documentos pendientes de `manage.py index_knowledge` (incremental)."""
+    return KnowledgeDocument.objects.filter(is_active=True).filter(
+        Q(is_indexed=False) | Q(indexed_at__isnull=True) | Q(updated_at__gt=F('indexed_at'))
+    ).order_by('pk')
+
+
+@register('chat.job_queue')
+def job_queue():
+    """Reclamo de trabajos de `manage.py chat_worker`."""
+    from .jobs import claimable_jobs
+    return claimable_jobs().order_by('created_at', 'id')[:10]
+
+
+@register('chat.daily_stats_day')
+def daily_stats_day():
+    """Mensajes de un día que recalcula `manage.py rollup_chat_stats`."""
+    from django.utils import timezone
+    from .stats import day_range
+    start, end = day_range(timezone.localdate())
+    return ChatMessage.objects.filter(
+        role='assistant', created_at__gte=start, created_at__lt=end
+    ).values_list('id', 'session_id', 'metadata')
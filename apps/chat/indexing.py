@@ -0,0 +1,301 @@
+"""
+Chat - Pipeline de indexación de la base de conocimiento
+
+Etapas:
+1. Stream de KnowledgeDocument activos con iterator() (solo los
+   modificados desde su última indexación, salvo en modo full)
+2. Chunking por párrafos con solapamiento
+3. Se omiten los chunks cuyo hash de contenido no cambió
+4. Embeddings en batches sobre un pool de workers (threads para APIs
+   remotas, procesos para embedders locales que usan CPU)
+5. upsert en el VectorStore configurado y marca de indexed_at
+
+Re-ejecutar tras editar un documento solo toca ese documento.
+"""
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import KnowledgeDocument
+from .services import Embedder, PlaceholderVectorStore, VectorStore
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ID_RE = re.compile(r"^kd-(\d+)-(\d+)$")
+
+
+def chunk_id(document_pk: int, index: int) -> str:
+    return f"kd-{document_pk}-{index}"
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def chunk_text(text: str, max_chars: int = 1200, overlap: int = 200) -> List[str]:
+    """
+    Divide un texto en chunks de hasta max_chars, cortando por párrafos
+    (o por oraciones si un párrafo es muy largo) con solapamiento.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= max_chars:
+            if paragraph:
+                pieces.append(paragraph)
+            continue
+        sentences = re.split(r"(?<=[.!?])\s+", paragraph)
+        for sentence in sentences:
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars - overlap:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks: List[str] = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ''
+            current = f"{tail}\n\n{piece}" if tail and len(tail) + len(piece) + 2 <= max_chars else piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _embed_batch(embedder: Embedder, texts: List[str]):
+    """Función top-level (picklable) para ejecutar en el pool de workers."""
+    return embedder.embed(texts, task='document')
+
+
+@dataclass
+class IndexingReport:
+    documents_seen: int = 0
+    documents_indexed: int = 0
+    chunks_embedded: int = 0
+    chunks_skipped: int = 0
+    chunks_deleted: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class KnowledgeIndexer:
+    """Indexa KnowledgeDocument en un VectorStore de forma incremental y paralela."""
+
+    def __init__(
+        self,
+        store: VectorStore,
+        embedder: Optional[Embedder] = None,
+        batch_size: int = 32,
+        write_batch_size: int = 512,
+        workers: Optional[int] = None,
+        executor: str = 'thread',
+        max_chars: int = 1200,
+        overlap: int = 200
+    ):
+        if isinstance(store, PlaceholderVectorStore):
+            raise ValueError("El vector store configurado no permite indexar (placeholder).")
+        self.store = store
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.write_batch_size = write_batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.max_chars = max_chars
+        self.overlap = overlap
+
+    def run(self, full: bool = False) -> IndexingReport:
+        report = IndexingReport()
+        # indexed_at = inicio de la corrida: un documento editado mientras
+        # corre el pipeline queda pendiente para la siguiente.
+        self._started_at = timezone.now()
+        self._write_buffer: List[Tuple[list, object]] = []
+        indexed_chunks = self._indexed_chunks()
+
+        # Documentos eliminados o desactivados: quitar sus chunks
+        active_pks = set(
+            KnowledgeDocument.objects.filter(is_active=True).values_list('pk', flat=True)
+        )
+        for pk in set(indexed_chunks) - active_pks:
+            report.chunks_deleted += self._delete_chunks(indexed_chunks.pop(pk))
+        KnowledgeDocument.objects.filter(is_active=False, is_indexed=True).update(is_indexed=False)
+
+        pending_chunks: Dict[int, int] = {}
+        batch: List[Tuple[int, str, str, dict]] = []
+        in_flight = {}
+
+        pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+        with pool_class(max_workers=self.workers) as pool:
+            for document in self._documents(full):
+                report.documents_seen += 1
+                chunks = self._changed_chunks(document, indexed_chunks.get(document.pk, set()), full, report)
+                if not chunks:
+                    self._mark_indexed([document.pk])
+                    report.documents_indexed += 1
+                    continue
+
+                pending_chunks[document.pk] = len(chunks)
+                for item in chunks:
+                    batch.append((document.pk, *item))
+                    if len(batch) >= self.batch_size:
+                        in_flight[self._submit(pool, batch)] = batch
+                        batch = []
+                    # Acotar memoria: no más de 2 batches por worker en vuelo
+                    while len(in_flight) >= self.workers * 2:
+                        self._drain(in_flight, pending_chunks, report, return_when=FIRST_COMPLETED)
+
+            if batch:
+                in_flight[self._submit(pool, batch)] = batch
+            while in_flight:
+                self._drain(in_flight, pending_chunks, report, return_when=FIRST_COMPLETED)
+            self._flush(pending_chunks, report)
+
+        return report
+
+    # ------------------------------------------------------------------
+    # Etapas
+    # ------------------------------------------------------------------
+
+    def _documents(self, full: bool) -> Iterator[KnowledgeDocument]:
+        queryset = KnowledgeDocument.objects.filter(is_active=True)
+        if not full:
+            queryset = queryset.filter(
+                Q(is_indexed=False) | Q(indexed_at__isnull=True) | Q(updated_at__gt=F('indexed_at'))
+            )
+        return queryset.only(
+            'pk', 'title', 'content', 'category', 'source_url'
+        ).order_by('pk').iterator(chunk_size=200)
+
+    def _changed_chunks(
+        self,
+        document: KnowledgeDocument,
+        existing_ids: Set[str],
+        full: bool,
+        report: IndexingReport
+    ) -> List[Tuple[str, str, dict]]:
+        """Chunks nuevos o modificados del documento; borra los sobrantes."""
+        texts = chunk_text(document.content, self.max_chars, self.overlap)
+        changed = []
+        current_ids = set()
+        for index, text in enumerate(texts):
+            doc_id = chunk_id(document.pk, index)
+            current_ids.add(doc_id)
+            metadata = {
+                'knowledge_document_id': document.pk,
+                'chunk': index,
+                'title': document.title,
+                'source': document.title,
+                'source_url': document.source_url,
+                'category': document.category,
+                'content_hash': content_hash(document.title, document.category, document.source_url, text),
+            }
+            stored = self.store.get_metadata(doc_id) if doc_id in existing_ids else None
+            if not full and stored and stored.get('content_hash') == metadata['content_hash']:
+                report.chunks_skipped += 1
+                continue
+            changed.append((doc_id, text, metadata))
+
+        report.chunks_deleted += self._delete_chunks(existing_ids - current_ids)
+        return changed
+
+    def _submit(self, pool, batch):
+        if self.embedder is None:
+            # Store sin embeddings (solo BM25): nada que calcular en el pool
+            future = Future()
+            future.set_result(None)
+            return future
+        return pool.submit(_embed_batch, self.embedder, [text for _, _, text, _ in batch])
+
+    def _drain(self, in_flight, pending_chunks, report, return_when):
+        """Recoge embeddings terminados; escribe al store en bloques grandes."""
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            batch = in_flight.pop(future)
+            try:
+                self._write_buffer.append((batch, future.result()))
+            except Exception as e:
+                logger.exception("Error calculando embeddings")
+                report.errors.append(str(e))
+                for pk, *_ in batch:
+                    pending_chunks.pop(pk, None)
+
+        if sum(len(batch) for batch, _ in self._write_buffer) >= self.write_batch_size:
+            self._flush(pending_chunks, report)
+
+    def _flush(self, pending_chunks, report):
+        """Un único upsert_many por bloque (cada escritura persiste el índice)."""
+        if not self._write_buffer:
+            return
+        buffered, self._write_buffer = self._write_buffer, []
+        items = [item for batch, _ in buffered for item in batch]
+        embeddings = None
+        if self.embedder is not None:
+            embeddings = np.concatenate([np.asarray(emb, dtype=np.float32) for _, emb in buffered])
+
+        try:
+            self.store.upsert_many(
+                [(doc_id, text, metadata) for _, doc_id, text, metadata in items],
+                embeddings
+            )
+        except Exception as e:
+            logger.exception("Error escribiendo en el vector store")
+            report.errors.append(str(e))
+            for pk, *_ in items:
+                pending_chunks.pop(pk, None)
+            return
+
+        report.chunks_embedded += len(items)
+        completed = []
+        for pk, *_ in items:
+            if pk not in pending_chunks:
+                continue
+            pending_chunks[pk] -= 1
+            if pending_chunks[pk] == 0:
+                del pending_chunks[pk]
+                completed.append(pk)
+        self._mark_indexed(completed)
+        report.documents_indexed += len(completed)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _indexed_chunks(self) -> Dict[int, Set[str]]:
+        """Chunks presentes en el store agrupados por KnowledgeDocument."""
+        grouped: Dict[int, Set[str]] = {}
+        for doc_id in self.store.document_ids():
+            match = CHUNK_ID_RE.match(doc_id)
+            if match:
+                grouped.setdefault(int(match.group(1)), set()).add(doc_id)
+        return grouped
+
+    def _delete_chunks(self, ids) -> int:
+        return sum(1 for doc_id in ids if self.store.delete(doc_id))
+
+    def _mark_indexed(self, pks: List[int]) -> None:
+        # update() no modifica updated_at (auto_now), así que updated_at >
+        # indexed_at sigue significando "editado después de indexar".
+        if pks:
+            KnowledgeDocument.objects.filter(pk__in=pks).update(
+                is_indexed=True, indexed_at=self._started_at
+            )
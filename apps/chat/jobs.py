@@ -0,0 +1,166 @@
+"""
+Chat - Cola de trabajos en base de datos (modo asíncrono)
+
+Con CHAT_ASYNC_JOBS (o "async": true en el body) /chat/message/ y
+/chat/api/ no esperan al LLM: encolan un ChatJob y responden 202 con el
+job_id. `manage.py chat_worker` reclama y ejecuta los trabajos; el cliente
+consulta /chat/jobs/<job_id>/?wait=20 (long-polling).
+
+Reclamo de trabajos:
+- PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED (varios workers sin
+  bloquearse entre sí) y lock de la fila de la ChatSession mientras se
+  reclama: dos workers no pueden tomar turnos de la misma conversación
+- SQLite (y motores sin SKIP LOCKED): UPDATE condicional
+  "WHERE id = X AND status = 'pending'"; si otro worker ganó, se prueba
+  el siguiente
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .concurrency import LLMOverloadedError
+from .models import ChatJob, ChatSession
+
+logger = logging.getLogger(__name__)
+
+# Intentos antes de marcar como fallido un trabajo cuyo worker murió
+MAX_ATTEMPTS = 3
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(chat_session, kind: str, message: str) -> ChatJob:
+    return ChatJob.objects.create(session=chat_session, kind=kind, message=message)
+
+
+async def aenqueue(chat_session, kind: str, message: str) -> ChatJob:
+    return await ChatJob.objects.acreate(session=chat_session, kind=kind, message=message)
+
+
+def job_payload(job: ChatJob) -> dict:
+    """Estado del trabajo para el endpoint de polling."""
+    payload = {'job_id': str(job.job_id), 'status': job.status}
+    if job.status == 'done':
+        payload.update(job.result or {})
+        payload['status'] = 'done'
+    elif job.status == 'failed':
+        payload['error'] = job.error
+    return payload
+
+
+def claimable_jobs():
+    """
+    Pendientes cuya sesión no tiene otro turno en ejecución: los turnos de
+    una misma conversación se procesan en orden, uno a la vez.
+    """
+    busy = ChatJob.objects.filter(session_id=OuterRef('session_id'), status='running')
+    return ChatJob.objects.filter(status='pending').filter(~Exists(busy))
+
+
+def claim_next(worker: str) -> Optional[ChatJob]:
+    """
+    Reclama el trabajo pendiente más antiguo (o None si la cola está vacía).
+    El trabajo se retorna con su sesión cargada.
+    """
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            candidates = (
+                claimable_jobs().select_for_update(skip_locked=True)
+                .order_by('created_at', 'id')[:10]
+            )
+            for job in candidates:
+                # Sin este lock, dos workers pueden tomar a la vez dos turnos
+                # pendientes de la misma sesión (ninguno ve al otro 'running')
+                session = (
+                    ChatSession.objects.select_for_update(skip_locked=True)
+                    .filter(pk=job.session_id)
+                    .first()
+                )
+                if session is None:
+                    continue  # otro worker está reclamando en esta sesión
+                # Consulta nueva (READ COMMITTED): ve los reclamos ya confirmados
+                if ChatJob.objects.filter(session_id=job.session_id, status='running').exists():
+                    continue
+                _mark_running(job, worker)
+                job.save(update_fields=['status', 'started_at', 'attempts', 'worker'])
+                job.session = session
+                return job
+            return None
+
+    # Fallback: UPDATE condicional (a lo más un worker gana cada fila)
+    while True:
+        candidates = list(
+            claimable_jobs()
+            .order_by('created_at', 'id')
+            .values_list('pk', flat=True)[:10]
+        )
+        if not candidates:
+            return None
+        for pk in candidates:
+            claimed = claimable_jobs().filter(pk=pk).update(
+                status='running',
+                started_at=timezone.now(),
+                attempts=F('attempts') + 1,
+                worker=worker
+            )
+            if claimed:
+                return ChatJob.objects.select_related('session').get(pk=pk)
+
+
+def _mark_running(job: ChatJob, worker: str) -> None:
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.attempts += 1
+    job.worker = worker
+
+
+async def arun_job(job: ChatJob) -> bool:
+    """
+    Ejecuta el turno y guarda el resultado (o el error) en el trabajo.
+    Si el LLM está saturado lo devuelve a la cola y retorna False.
+
+    Corre en el event loop del worker (uno por proceso, ver chat_worker):
+    los clientes async de Gemini quedan ligados al loop donde se crearon.
+    """
+    from .turns import run_gemini_turn, run_service_turn
+
+    turn = run_gemini_turn if job.kind == 'gemini' else run_service_turn
+    jobs = ChatJob.objects.filter(pk=job.pk)
+    try:
+        result = await turn(job.session, job.message)
+    except LLMOverloadedError:
+        # No cuenta como intento: el trabajo no llegó a ejecutarse
+        await jobs.aupdate(status='pending', worker='', attempts=F('attempts') - 1)
+        return False
+    except Exception as e:
+        logger.exception("Error ejecutando el trabajo de chat %s", job.job_id)
+        await jobs.aupdate(status='failed', error=str(e), finished_at=timezone.now())
+        return True
+    await jobs.aupdate(status='done', result=result, finished_at=timezone.now())
+    return True
+
+
+def requeue_stale(timeout: Optional[float] = None) -> int:
+    """
+    Devuelve a la cola los trabajos 'running' de workers que murieron
+    (más de `timeout` segundos sin terminar); tras MAX_ATTEMPTS, fallan.
+    """
+    timeout = timeout if timeout is not None else settings.CHAT_JOB_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = ChatJob.objects.filter(status='running', started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed', error='El worker no terminó el trabajo', finished_at=timezone.now()
+    )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='pending', worker='')
+    if failed or requeued:
+        logger.warning("Trabajos de chat huérfanos: %s re-encolados, %s fallidos", requeued, failed)
+    return requeued
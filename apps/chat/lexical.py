@@ -0,0 +1,507 @@
+"""
+Chat - Búsqueda léxica (BM25) y recuperación híbrida
+
+Los embeddings rankean mal términos exactos como "RPA", "SaaS" o
+"IAlfabetización". BM25Index es un índice invertido con tokenización en
+español (sin acentos, sin stopwords, plurales reducidos) que no requiere
+llamadas externas: para queries cortas es mucho más barato que un
+embedding.
+
+HybridVectorStore combina ambos rankings (scores normalizados y
+ponderados) antes de entregar los documentos a ChatService.
+
+Persistencia de BM25 (directorio del índice): solo frecuencias de
+términos, largos y metadata; el contenido lo aporta el vector store
+(modo híbrido) o, en modo 'lexical', un DocumentLog propio.
+    CURRENT             generación vigente (n)
+    bm25.<n>.json.gz    snapshot de las estadísticas por documento
+    bm25.<n>.delta      cambios posteriores al snapshot, un JSON por
+                        línea (append-only)
+    documents.<m>.log   contenido (solo sin content_store)
+    .lock               lock de escritura entre procesos
+
+Cada escritura agrega una línea al delta y los procesos lectores aplican
+solo las líneas nuevas a sus postings en memoria. Cuando el delta supera
+al snapshot se escribe la generación n+1 (snapshot completo, delta vacío).
+"""
+import fcntl
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .services import RetrievedDocument, VectorStore
+from .text import tokenize
+from .vectorstores import COMPACT_MIN_BYTES, DocumentLog, matches_filter
+
+logger = logging.getLogger(__name__)
+
+# Formato anterior: contenido y términos de todos los documentos en un
+# solo archivo reescrito en cada cambio
+LEGACY_INDEX_NAME = 'bm25.json.gz'
+
+
+def analyze(text: str) -> List[str]:
+    """Tokenización usada tanto al indexar como al buscar."""
+    return tokenize(text, drop_stopwords=True, stemming=True)
+
+
+class BM25Index(VectorStore):
+    """
+    Índice invertido BM25 (Okapi) con actualización incremental.
+
+    Implementa la interfaz VectorStore para poder usarse solo (modo
+    'lexical') o dentro de HybridVectorStore. Con `content_store` (el
+    vector store del modo híbrido) no guarda el contenido de los
+    documentos: lo pide a ese store al armar los resultados.
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        k1: float = 1.2,
+        b: float = 0.75,
+        content_store: Optional[VectorStore] = None
+    ):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self.content_store = content_store
+        self._lock = threading.RLock()
+        self._current_mtime: Optional[int] = None
+        self._generation: Optional[int] = None
+        self._snapshot_size = 0
+        self._delta_offset = 0
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._total_length = 0
+        self._garbage = 0
+        self._log = DocumentLog(self.path)
+
+    # ------------------------------------------------------------------
+    # API VectorStore
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        return self.search_terms(analyze(query), top_k=top_k, filter=filter)
+
+    def search_terms(
+        self,
+        terms: List[str],
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        """Búsqueda con términos ya analizados."""
+        with self._lock:
+            self._refresh()
+            total_docs = len(self._documents)
+            if not terms or total_docs == 0 or top_k <= 0:
+                return []
+
+            avg_length = self._total_length / total_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    length = self._documents[doc_id]['length']
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(
+                (
+                    (score, doc_id) for doc_id, score in scores.items()
+                    if matches_filter(self._documents[doc_id]['metadata'], filter)
+                ),
+                key=lambda item: (-item[0], item[1])
+            )[:top_k]
+            return self._to_documents(ranked)
+
+    def upsert(
+        self,
+        document_id: str,
+        content: str,
+        metadata: Dict[str, Any]
+    ) -> bool:
+        return self.upsert_many([(document_id, content, metadata)]) == 1
+
+    def upsert_many(self, documents: List[Tuple[str, str, Dict[str, Any]]], embeddings=None) -> int:
+        """Indexa varios documentos en una sola línea de delta (embeddings se ignora)."""
+        if not documents:
+            return 0
+        latest = {document_id: (content, metadata) for document_id, content, metadata in documents}
+        with self._write_lock():
+            if self.content_store is None:
+                records = self._log.append(latest.values())
+            else:
+                records = [None] * len(latest)
+            put = {}
+            for (document_id, (content, metadata)), record in zip(latest.items(), records):
+                terms = Counter(analyze(f"{metadata.get('title', '')}\n{content}"))
+                entry = {'length': sum(terms.values()), 'terms': dict(terms), 'metadata': metadata}
+                if record is not None:
+                    entry['record'] = record
+                put[document_id] = entry
+            self._write_delta({'put': put})
+        return len(documents)
+
+    def delete(self, document_id: str) -> bool:
+        with self._write_lock():
+            if document_id not in self._documents:
+                return False
+            self._write_delta({'del': [document_id]})
+        return True
+
+    def document_ids(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._documents)
+
+    def get_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            doc = self._documents.get(document_id)
+            if doc is None or (self.content_store is None and 'record' not in doc):
+                # Sin contenido propio (indexado en modo híbrido): hay que reindexarlo
+                return None
+            return doc['metadata']
+
+    def get_contents(self, document_ids: List[str]) -> Dict[str, str]:
+        with self._lock:
+            self._refresh()
+            if self.content_store is not None:
+                return self.content_store.get_contents(document_ids)
+            return {
+                document_id: self._log.read(self._documents[document_id]['record'])['content']
+                for document_id in document_ids
+                if 'record' in self._documents.get(document_id, {})
+            }
+
+    def __len__(self) -> int:
+        return len(self.document_ids())
+
+    # ------------------------------------------------------------------
+    # Índice invertido
+    # ------------------------------------------------------------------
+
+    def _apply(self, delta: Dict[str, Any]) -> None:
+        """Aplica una línea del delta a los postings en memoria."""
+        for document_id in delta.get('del', ()):
+            self._remove(document_id)
+        for document_id, entry in delta.get('put', {}).items():
+            self._remove(document_id)
+            self._add(document_id, entry)
+
+    def _add(self, document_id: str, entry: Dict[str, Any]) -> None:
+        self._documents[document_id] = entry
+        for term, tf in entry['terms'].items():
+            self._postings[term][document_id] = tf
+        self._total_length += entry['length']
+
+    def _remove(self, document_id: str) -> bool:
+        doc = self._documents.pop(document_id, None)
+        if doc is None:
+            return False
+        for term in doc['terms']:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(document_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= doc['length']
+        if 'record' in doc:
+            self._garbage += doc['record'][1]
+        return True
+
+    def _to_documents(self, ranked: List[Tuple[float, str]]) -> List[RetrievedDocument]:
+        contents = self.get_contents([doc_id for _, doc_id in ranked])
+        results = []
+        for score, document_id in ranked:
+            content = contents.get(document_id)
+            if content is None:
+                # Falta en el store de contenido: el indexador lo vuelve a escribir
+                continue
+            metadata = self._documents[document_id]['metadata']
+            results.append(RetrievedDocument(
+                content=content,
+                source=metadata.get('source') or document_id,
+                score=score,
+                metadata={**metadata, 'id': document_id}
+            ))
+        return results
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    @property
+    def _current_path(self) -> Path:
+        return self.path / 'CURRENT'
+
+    def _snapshot_path(self, generation: int) -> Path:
+        return self.path / f"bm25.{generation}.json.gz"
+
+    def _delta_path(self, generation: int) -> Path:
+        return self.path / f"bm25.{generation}.delta"
+
+    def _refresh(self) -> None:
+        """Aplica los cambios de otros procesos (solo las líneas nuevas del delta)."""
+        for _ in range(3):
+            try:
+                mtime = self._current_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                return
+            try:
+                if mtime != self._current_mtime:
+                    self._load_snapshot(mtime)
+                self._read_deltas()
+                return
+            except FileNotFoundError:
+                # Una compactación concurrente reemplazó la generación
+                self._current_mtime = None
+        raise FileNotFoundError(f"No se encontró la generación vigente del índice BM25 en {self.path}")
+
+    def _load_snapshot(self, mtime: int) -> None:
+        generation = int(self._current_path.read_text())
+        snapshot_path = self._snapshot_path(generation)
+        with gzip.open(snapshot_path, 'rt', encoding='utf-8') as f:
+            state = json.load(f)
+        self._log.open(state['log'])
+
+        self._documents = {}
+        self._postings = defaultdict(dict)
+        self._total_length = 0
+        for document_id, entry in state['documents'].items():
+            self._add(document_id, entry)
+        self._garbage = state['garbage']
+        self._generation = generation
+        self._snapshot_size = snapshot_path.stat().st_size
+        self._delta_offset = 0
+        self._current_mtime = mtime
+
+    def _read_deltas(self) -> None:
+        path = self._delta_path(self._generation)
+        size = path.stat().st_size
+        if size <= self._delta_offset:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self._delta_offset)
+            data = f.read(size - self._delta_offset)
+        # Una línea a medio escribir se aplica en el próximo refresh
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self._delta_offset += end
+
+    def _write_delta(self, delta: Dict[str, Any]) -> None:
+        line = json.dumps(delta, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        with open(self._delta_path(self._generation), 'r+b') as f:
+            # Descarta una línea incompleta de una escritura interrumpida
+            f.truncate(self._delta_offset)
+            f.seek(self._delta_offset)
+            f.write(line)
+        self._apply(delta)
+        self._delta_offset += len(line)
+
+        records = [doc['record'] for doc in self._documents.values() if 'record' in doc]
+        compact_log = self._log.needs_compaction(records, self._garbage)
+        if compact_log or self._delta_offset >= max(self._snapshot_size, COMPACT_MIN_BYTES):
+            self._compact(compact_log)
+
+    def _compact(self, compact_log: bool) -> None:
+        """Publica la generación siguiente: snapshot con el estado actual y delta vacío."""
+        previous = self._generation
+        stale_log = None
+        if compact_log:
+            ids = [doc_id for doc_id, doc in self._documents.items() if 'record' in doc]
+            records, stale_log = self._log.compact([self._documents[doc_id]['record'] for doc_id in ids])
+            for doc_id, record in zip(ids, records):
+                self._documents[doc_id]['record'] = record
+            self._garbage = 0
+        self._write_snapshot(previous + 1)
+        for path in (self._snapshot_path(previous), self._delta_path(previous), stale_log):
+            if path is not None:
+                path.unlink(missing_ok=True)
+
+    def _write_snapshot(self, generation: int) -> None:
+        """Escribe el snapshot y un delta vacío de `generation` y la publica en CURRENT."""
+        snapshot_path = self._snapshot_path(generation)
+        tmp_path = snapshot_path.with_name(snapshot_path.name + '.tmp')
+        state = {'log': self._log.name, 'garbage': self._garbage, 'documents': self._documents}
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, snapshot_path)
+        self._delta_path(generation).write_bytes(b'')
+
+        tmp_path = self.path / 'CURRENT.tmp'
+        tmp_path.write_text(str(generation))
+        os.replace(tmp_path, self._current_path)
+        self._generation = generation
+        self._snapshot_size = snapshot_path.stat().st_size
+        self._delta_offset = 0
+        self._current_mtime = self._current_path.stat().st_mtime_ns
+
+    @contextmanager
+    def _write_lock(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path / '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                if self.content_store is None and self._log.name is None:
+                    # El snapshot nombra el log: se crea antes de publicarlo
+                    self._log.create()
+                    if self._generation is not None:
+                        self._compact(compact_log=False)
+                if self._generation is None:
+                    # Índice nuevo. Un índice del formato anterior se descarta:
+                    # el indexador vuelve a escribir sus documentos
+                    (self.path / LEGACY_INDEX_NAME).unlink(missing_ok=True)
+                    self._write_snapshot(0)
+                yield
+            except BaseException:
+                # Estado en memoria a medio escribir: se recarga del disco
+                self._current_mtime = None
+                raise
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class HybridVectorStore(VectorStore):
+    """
+    Recuperación híbrida: BM25 + vector store.
+
+    score = alpha * vector_normalizado + (1 - alpha) * bm25_normalizado
+    (cada lista se normaliza por su score máximo). Los documentos sin
+    ninguna señal (score combinado 0) se descartan.
+
+    Queries cortas (<= short_query_terms términos) con suficientes hits
+    léxicos se resuelven solo con BM25, sin calcular el embedding.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        lexical_index: BM25Index,
+        alpha: float = 0.5,
+        candidates: int = 20,
+        short_query_terms: int = 2
+    ):
+        self.vector_store = vector_store
+        self.lexical = lexical_index
+        self.alpha = alpha
+        self.candidates = candidates
+        self.short_query_terms = short_query_terms
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        if top_k <= 0:
+            return []
+        pool = max(self.candidates, top_k)
+        terms = analyze(query)
+        lexical_docs = self.lexical.search_terms(terms, top_k=pool, filter=filter)
+
+        if len(terms) <= self.short_query_terms and len(lexical_docs) >= top_k:
+            return lexical_docs[:top_k]
+
+        vector_docs = self.vector_store.search(query, top_k=pool, filter=filter)
+        return self.fuse(vector_docs, lexical_docs, top_k)
+
+    def fuse(
+        self,
+        vector_docs: List[RetrievedDocument],
+        lexical_docs: List[RetrievedDocument],
+        top_k: int
+    ) -> List[RetrievedDocument]:
+        """Combina ambos rankings por documento (metadata['id'])."""
+        vector_scores = _normalized_scores(vector_docs)
+        lexical_scores = _normalized_scores(lexical_docs)
+
+        documents = {}
+        for doc in lexical_docs + vector_docs:
+            documents.setdefault(_doc_key(doc), doc)
+
+        fused = []
+        for key, doc in documents.items():
+            vector_score = vector_scores.get(key, 0.0)
+            lexical_score = lexical_scores.get(key, 0.0)
+            score = self.alpha * vector_score + (1 - self.alpha) * lexical_score
+            if score > 0:
+                fused.append((score, key, doc, vector_score, lexical_score))
+
+        fused.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            RetrievedDocument(
+                content=doc.content,
+                source=doc.source,
+                score=score,
+                metadata={**doc.metadata, 'vector_score': vector_score, 'lexical_score': lexical_score}
+            )
+            for score, _, doc, vector_score, lexical_score in fused[:top_k]
+        ]
+
+    def upsert(
+        self,
+        document_id: str,
+        content: str,
+        metadata: Dict[str, Any]
+    ) -> bool:
+        indexed = self.vector_store.upsert(document_id, content, metadata)
+        return self.lexical.upsert(document_id, content, metadata) and indexed
+
+    def upsert_many(self, documents, embeddings=None) -> int:
+        self.vector_store.upsert_many(documents, embeddings)
+        return self.lexical.upsert_many(documents)
+
+    def delete(self, document_id: str) -> bool:
+        deleted = self.vector_store.delete(document_id)
+        return self.lexical.delete(document_id) or deleted
+
+    def document_ids(self) -> List[str]:
+        """IDs de ambos índices (también los que quedaron en uno solo)."""
+        return sorted(set(self.vector_store.document_ids()) | set(self.lexical.document_ids()))
+
+    def get_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata solo si el documento está igual en ambos índices: si falta
+        en uno (o difiere) retorna None y el indexador lo vuelve a escribir.
+        """
+        metadata = self.vector_store.get_metadata(document_id)
+        if metadata is None or self.lexical.get_metadata(document_id) != metadata:
+            return None
+        return metadata
+
+    def get_contents(self, document_ids: List[str]) -> Dict[str, str]:
+        return self.vector_store.get_contents(document_ids)
+
+
+def _doc_key(doc: RetrievedDocument) -> str:
+    return doc.metadata.get('id') or doc.source
+
+
+def _normalized_scores(docs: List[RetrievedDocument]) -> Dict[str, float]:
+    """Scores normalizados a [0, 1] dividiendo por el máximo (negativos = 0)."""
+    if not docs:
+        return {}
+    high = max(doc.score for doc in docs)
+    return {
+        _doc_key(doc): max(doc.score, 0.0) / high if high > 0 else 0.0
+        for doc in docs
+    }
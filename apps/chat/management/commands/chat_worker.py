@@ -0,0 +1,128 @@
+"""
+Worker de la cola de trabajos de chat (modo asíncrono).
+
+Ejecuta los ChatJob encolados por /chat/message/ y /chat/api/ fuera de los
+workers web: la latencia del LLM deja de limitar el throughput HTTP.
+
+Uso:
+    python manage.py chat_worker                  # 1 proceso
+    python manage.py chat_worker --processes 4
+    python manage.py chat_worker --burst          # vacía la cola y termina
+
+Cada proceso corre un solo event loop para todos sus trabajos: los
+clientes grpc.aio de Gemini quedan ligados al primer loop que los usa
+(async_to_sync por trabajo crearía uno nuevo cada vez).
+"""
+import asyncio
+import multiprocessing
+import signal
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from apps.chat.jobs import arun_job, claim_next, requeue_stale, worker_name
+from apps.chat.stats import rollup
+
+# Cada cuántos segundos se buscan trabajos huérfanos
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de trabajos de chat (LLM fuera del proceso web).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Procesos worker (default: 1).'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=0.5,
+            help='Segundos de espera cuando la cola está vacía (default: 0.5).'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Procesa los trabajos pendientes y termina.'
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        if processes == 1:
+            processed = work(options['poll_interval'], options['burst'])
+            self.stdout.write(self.style.SUCCESS(f"{processed} trabajos procesados."))
+            return
+
+        # Las conexiones a BD no deben compartirse con los hijos
+        connections.close_all()
+        children = [
+            multiprocessing.Process(
+                target=work, args=(options['poll_interval'], options['burst']), daemon=True
+            )
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"chat_worker: {processes} procesos iniciados.")
+
+        def stop(signum, frame):
+            for child in children:
+                child.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for child in children:
+            child.join()
+
+
+def work(poll_interval: float, burst: bool = False) -> int:
+    """Proceso worker. Retorna la cantidad de trabajos procesados."""
+    return asyncio.run(awork(poll_interval, burst))
+
+
+async def awork(poll_interval: float, burst: bool = False) -> int:
+    """
+    Loop de un proceso worker. Las operaciones síncronas de BD corren con
+    sync_to_async en el mismo hilo que el ORM async de los turnos, así
+    close_old_connections() cierra las conexiones que efectivamente se usan.
+    """
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, stop)
+    name = worker_name()
+    processed = 0
+    last_stale_check = 0.0
+    last_rollup = time.monotonic()
+
+    while running:
+        await sync_to_async(close_old_connections)()
+        if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL:
+            await sync_to_async(requeue_stale)()
+            last_stale_check = time.monotonic()
+        if settings.CHAT_STATS_ROLLUP_INTERVAL and (
+            time.monotonic() - last_rollup > settings.CHAT_STATS_ROLLUP_INTERVAL
+        ):
+            # Idempotente: da igual si varios procesos lo ejecutan
+            await sync_to_async(rollup)()
+            last_rollup = time.monotonic()
+
+        job = await sync_to_async(claim_next)(name)
+        if job is None:
+            if burst:
+                break
+            await asyncio.sleep(poll_interval)
+            continue
+
+        if await arun_job(job):
+            processed += 1
+        else:
+            # LLM saturado: el trabajo volvió a la cola, esperar antes de reintentar
+            await asyncio.sleep(poll_interval)
+
+    await sync_to_async(close_old_connections)()
+    return processed
@@ -0,0 +1,71 @@
+"""
+Indexa la base de conocimiento (KnowledgeDocument) en el vector store.
+
+Uso:
+    python manage.py index_knowledge                  # incremental
+    python manage.py index_knowledge --full           # reindexar todo
+    python manage.py index_knowledge --executor process --workers 8
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chat.indexing import KnowledgeIndexer
+from apps.chat.services import get_vector_store
+
+
+class Command(BaseCommand):
+    help = 'Chunking, embeddings y upsert incremental de KnowledgeDocument en el vector store.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Reindexa todos los documentos activos, aunque no hayan cambiado.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Workers para calcular embeddings (default: núcleos de CPU).'
+        )
+        parser.add_argument(
+            '--executor', choices=['thread', 'process'], default=None,
+            help="'thread' para embedders remotos (Gemini), 'process' para locales. "
+                 "Default: según CHAT_EMBEDDER."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=32,
+            help='Chunks por llamada de embeddings (default: 32).'
+        )
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        store = get_vector_store()
+        # En modo híbrido los embeddings los usa el store vectorial interno
+        embedder = getattr(getattr(store, 'vector_store', store), 'embedder', None)
+        executor = options['executor'] or ('thread' if settings.CHAT_EMBEDDER == 'gemini' else 'process')
+
+        try:
+            indexer = KnowledgeIndexer(
+                store,
+                embedder=embedder,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                executor=executor,
+            )
+        except ValueError as e:
+            raise CommandError(f"{e} Configura CHAT_VECTOR_STORE o CHAT_RETRIEVAL_MODE.")
+
+        started = time.perf_counter()
+        report = indexer.run(full=options['full'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Documentos: {report.documents_seen} revisados, {report.documents_indexed} indexados. "
+            f"Chunks: {report.chunks_embedded} embebidos, {report.chunks_skipped} sin cambios, "
+            f"{report.chunks_deleted} eliminados ({elapsed:.1f}s, {indexer.workers} workers {executor})."
+        )
+        for error in report.errors:
+            self.stderr.write(self.style.ERROR(error))
+        if report.errors:
+            raise CommandError(f"{len(report.errors)} batches con errores.")
+        self.stdout.write(self.style.SUCCESS('Indexación completa.'))
@@ -0,0 +1,44 @@
+"""
+Reconstruye el índice aproximado (IVF) del vector store.
+
+Uso:
+    python manage.py rebuild_vector_index
+    python manage.py rebuild_vector_index --nlist 256 --iterations 25
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chat.services import get_vector_store
+from apps.chat.vectorstores import IVFVectorStore
+
+
+class Command(BaseCommand):
+    help = 'Reentrena los centroides del índice IVF y reasigna todos los vectores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nlist', type=int, default=None,
+            help='Número de listas/centroides (default: CHAT_IVF_NLIST o sqrt(N)).'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Iteraciones de k-means (default: 20).'
+        )
+
+    def handle(self, *args, **options):
+        store = get_vector_store()
+        # En modo híbrido el índice vectorial está envuelto junto a BM25
+        store = getattr(store, 'vector_store', store)
+        if not isinstance(store, IVFVectorStore):
+            raise CommandError(
+                "El vector store configurado no es IVF. Usa CHAT_VECTOR_STORE=ivf."
+            )
+
+        started = time.perf_counter()
+        nlist = store.rebuild(nlist=options['nlist'], iterations=options['iterations'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice reconstruido: {len(store)} vectores en {nlist} listas ({elapsed:.1f}s)."
+        ))
@@ -0,0 +1,31 @@
+"""
+Actualiza las estadísticas diarias del chatbot (ChatDailyStats).
+
+Recalcula solo los días con mensajes nuevos desde la última ejecución;
+chat_worker lo ejecuta cada CHAT_STATS_ROLLUP_INTERVAL segundos.
+
+Uso:
+    python manage.py rollup_chat_stats            # incremental
+    python manage.py rollup_chat_stats --full     # recalcula todos los días
+"""
+from django.core.management.base import BaseCommand
+
+from apps.chat.stats import rollup
+
+
+class Command(BaseCommand):
+    help = 'Condensa latencias, tokens y throughput del chat en ChatDailyStats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recalcula todos los días, no solo los que tienen mensajes nuevos.'
+        )
+
+    def handle(self, *args, **options):
+        days = rollup(full=options['full'])
+        if days:
+            listed = ', '.join(str(day) for day in days[-5:])
+            self.stdout.write(self.style.SUCCESS(f"{len(days)} día(s) actualizados ({listed})."))
+        else:
+            self.stdout.write("Sin mensajes nuevos.")
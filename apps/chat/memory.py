@@ -0,0 +1,216 @@
+"""
+Chat - Memoria de conversación acotada
+
+Los turnos se guardan como filas ChatMessage (append-only). En vez de
+re-enviar toda la conversación en cada turno:
+- se conservan textuales los últimos turnos que caben en un presupuesto
+  de tokens (CHAT_MEMORY_TOKEN_BUDGET / CHAT_MEMORY_MAX_TURNS)
+- los turnos más antiguos se resumen en ChatSession.summary, y
+  ChatSession.summary_until marca el último mensaje resumido
+
+La compactación corre en un thread de fondo, fuera del request: una
+conversación larga cuesta por turno lo mismo que una corta.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Overhead aproximado por mensaje (rol, separadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Rol de ChatMessage -> rol de Gemini
+GEMINI_ROLES = {'user': 'user', 'assistant': 'model'}
+
+# Respuesta del modelo a un mensaje de contexto (resumen, datos de la sesión)
+CONTEXT_ACK = "Entendido, continúo con ese contexto."
+
+SUMMARY_INSTRUCTION = (
+    "Resumes conversaciones entre un cliente potencial y el consultor de bestIA. "
+    "Conserva datos concretos: nombre, empresa, necesidades, presupuesto, "
+    "servicios consultados y acuerdos. Máximo 6 oraciones, en español."
+)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-memory')
+_pending_lock = threading.Lock()
+_pending: set = set()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida (~4 caracteres por token en español)."""
+    return len(text) // 4 + 1
+
+
+def entry_text(entry: Dict) -> str:
+    """Texto de una entrada de historial en formato Gemini."""
+    return ' '.join(str(part) for part in entry.get('parts', []))
+
+
+def entry_tokens(entry: Dict) -> int:
+    return estimate_tokens(entry_text(entry)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def to_gemini_entry(message) -> Dict:
+    """ChatMessage -> entrada de historial en formato Gemini."""
+    return {'role': GEMINI_ROLES[message.role], 'parts': [message.content]}
+
+
+def unsummarized_messages(session):
+    """Mensajes de la conversación posteriores al resumen."""
+    from .models import ChatMessage
+
+    queryset = ChatMessage.objects.filter(
+        session_id=session.pk, role__in=tuple(GEMINI_ROLES)
+    )
+    if session.summary_until:
+        queryset = queryset.filter(id__gt=session.summary_until)
+    return queryset.only('id', 'role', 'content')
+
+
+def recent_window(session):
+    """Últimas filas sin resumir (una más que la ventana, para detectar desborde)."""
+    window = settings.CHAT_MEMORY_MAX_TURNS * 2
+    return unsummarized_messages(session).order_by('-created_at', '-id')[:window + 1]
+
+
+def _split_window(rows) -> Tuple[List[Dict], bool]:
+    window = settings.CHAT_MEMORY_MAX_TURNS * 2
+    overflow = len(rows) > window
+    rows = rows[:window]
+    rows.reverse()
+
+    older, recent = split_history([to_gemini_entry(message) for message in rows])
+    return recent, overflow or bool(older)
+
+
+def load_recent_history(session) -> Tuple[List[Dict], bool]:
+    """
+    Turnos recientes en formato Gemini para el próximo turno.
+    Lee como máximo una ventana acotada de filas (nunca toda la sesión).
+
+    Retorna (recientes, requiere_compactación).
+    """
+    return _split_window(list(recent_window(session)))
+
+
+async def aload_recent_history(session) -> Tuple[List[Dict], bool]:
+    """Versión async de load_recent_history()."""
+    return _split_window([message async for message in recent_window(session)])
+
+
+def split_history(
+    history: List[Dict],
+    token_budget: Optional[int] = None,
+    max_turns: Optional[int] = None
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Divide el historial en (antiguos, recientes). Los recientes son los
+    últimos turnos (pares usuario/modelo) que caben en el presupuesto.
+    """
+    token_budget = token_budget if token_budget is not None else settings.CHAT_MEMORY_TOKEN_BUDGET
+    max_turns = max_turns if max_turns is not None else settings.CHAT_MEMORY_MAX_TURNS
+
+    start = len(history)
+    used = 0
+    turns = 0
+    # Recorrer desde el final, un turno (user + model) a la vez
+    while start > 0 and turns < max_turns:
+        turn_start = start - 1
+        if history[turn_start].get('role') != 'user' and turn_start > 0:
+            turn_start -= 1
+        cost = sum(entry_tokens(entry) for entry in history[turn_start:start])
+        if used + cost > token_budget and turns > 0:
+            break
+        used += cost
+        turns += 1
+        start = turn_start
+    return history[:start], history[start:]
+
+
+def build_gemini_history(summary: Optional[str], recent: List[Dict]) -> List[Dict]:
+    """Historial para model.start_chat(): resumen (si existe) + turnos recientes."""
+    if not summary:
+        return list(recent)
+    return [
+        {'role': 'user', 'parts': [f"Resumen de la conversación anterior: {summary}"]},
+        {'role': 'model', 'parts': [CONTEXT_ACK]},
+    ] + list(recent)
+
+
+def summarize(previous_summary: Optional[str], entries: List[Dict]) -> str:
+    """Integra los turnos antiguos en el resumen (Gemini si está disponible)."""
+    transcript = '\n'.join(
+        f"{'Cliente' if entry.get('role') == 'user' else 'Consultor'}: {entry_text(entry)}"
+        for entry in entries
+    )
+    max_chars = settings.CHAT_MEMORY_SUMMARY_MAX_CHARS
+
+    from .gemini import registry
+    if registry.configure():
+        try:
+            model, _ = registry.get_model(SUMMARY_INSTRUCTION)
+            prompt = (
+                f"Resumen previo:\n{previous_summary or '(ninguno)'}\n\n"
+                f"Nuevos turnos:\n{transcript}\n\n"
+                "Escribe el resumen actualizado."
+            )
+            return model.generate_content(prompt).text.strip()[:max_chars]
+        except Exception as e:
+            logger.warning("No se pudo resumir con Gemini: %s", e)
+
+    # Fallback sin LLM: conservar lo más reciente dentro del límite
+    combined = f"{previous_summary}\n{transcript}" if previous_summary else transcript
+    return combined[-max_chars:]
+
+
+def schedule_compaction(session_pk: int) -> None:
+    """Encola la compactación de una sesión (una a la vez por sesión)."""
+    with _pending_lock:
+        if session_pk in _pending:
+            return
+        _pending.add(session_pk)
+    _executor.submit(_run_compaction, session_pk)
+
+
+def _run_compaction(session_pk: int) -> None:
+    try:
+        compact_session(session_pk)
+    except Exception:
+        logger.exception("Error compactando la sesión de chat %s", session_pk)
+    finally:
+        with _pending_lock:
+            _pending.discard(session_pk)
+        close_old_connections()
+
+
+def compact_session(session_pk: int) -> bool:
+    """
+    Resume los mensajes que no caben en el presupuesto y avanza
+    summary_until. El LLM se llama fuera de la transacción; al guardar se
+    verifica que otra compactación no se haya adelantado.
+    """
+    from .models import ChatSession
+
+    session = ChatSession.objects.only('summary', 'summary_until').get(pk=session_pk)
+    messages = list(unsummarized_messages(session).order_by('created_at', 'id'))
+    older, _ = split_history([to_gemini_entry(message) for message in messages])
+    if not older:
+        return False
+
+    summary = summarize(session.summary, older)
+    last_summarized_id = messages[len(older) - 1].id
+
+    with transaction.atomic():
+        locked = ChatSession.objects.select_for_update().only('summary_until').get(pk=session_pk)
+        if locked.summary_until != session.summary_until:
+            logger.info("La sesión %s ya fue compactada por otro proceso", session_pk)
+            return False
+        locked.summary = summary
+        locked.summary_until = last_summarized_id
+        locked.save(update_fields=['summary', 'summary_until'])
+    return True
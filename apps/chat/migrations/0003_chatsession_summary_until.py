@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+
+def history_to_messages(apps, schema_editor):
+    """Copia el historial JSON legado a filas ChatMessage (sesiones sin mensajes)."""
+    ChatSession = apps.get_model('chat', 'ChatSession')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    roles = {'user': 'user', 'model': 'assistant'}
+
+    sessions = ChatSession.objects.exclude(history=[]).filter(messages__isnull=True)
+    for session in sessions.iterator(chunk_size=100):
+        messages = [
+            ChatMessage(
+                session=session,
+                role=roles[entry['role']],
+                content=' '.join(str(part) for part in entry.get('parts', [])),
+            )
+            for entry in session.history
+            if isinstance(entry, dict) and entry.get('role') in roles
+        ]
+        ChatMessage.objects.bulk_create(messages)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatsession_history_chatsession_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_until',
+            field=models.PositiveBigIntegerField(blank=True, help_text='ID del último ChatMessage incluido en el resumen', null=True, verbose_name='Resumido hasta'),
+        ),
+        migrations.AlterField(
+            model_name='chatsession',
+            name='history',
+            field=models.JSONField(blank=True, default=list, help_text='Historial en formato Gemini (legado, reemplazado por ChatMessage)', verbose_name='Historial (legado)'),
+        ),
+        migrations.RunPython(history_to_messages, migrations.RunPython.noop),
+    ]
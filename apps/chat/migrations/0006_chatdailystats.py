@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_chatjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Fecha')),
+                ('turns', models.PositiveIntegerField(default=0, verbose_name='Turnos')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='Sesiones')),
+                ('cache_hits', models.PositiveIntegerField(default=0, verbose_name='Aciertos de caché')),
+                ('avg_latency_ms', models.FloatField(blank=True, null=True, verbose_name='Latencia promedio (ms)')),
+                ('p95_latency_ms', models.FloatField(blank=True, null=True, verbose_name='Latencia p95 (ms)')),
+                ('p95_ttft_ms', models.FloatField(blank=True, null=True, verbose_name='Primer token p95 (ms)')),
+                ('avg_retrieval_ms', models.FloatField(blank=True, null=True, verbose_name='Recuperación promedio (ms)')),
+                ('prompt_tokens', models.PositiveBigIntegerField(default=0, verbose_name='Tokens de prompt')),
+                ('completion_tokens', models.PositiveBigIntegerField(default=0, verbose_name='Tokens de respuesta')),
+                ('last_message_id', models.PositiveBigIntegerField(default=0, verbose_name='Último mensaje')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria del chat',
+                'verbose_name_plural': 'Estadísticas diarias del chat',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -29,14 +29,23 @@ class ChatSession(models.Model):
     user_email = models.EmailField('Email del usuario', blank=True, null=True)
     user_name = models.CharField('Nombre', max_length=100, blank=True)
     
-    # Persistencia de Chat (Gemini History)
+    # Legado: historial en formato Gemini. Ya no se escribe; los turnos se
+    # guardan como filas ChatMessage (append-only).
     history = models.JSONField(
-        'Historial',
+        'Historial (legado)',
         default=list,
         blank=True,
-        help_text='Historial completo de la conversación (formato Gemini)'
+        help_text='Historial en formato Gemini (legado, reemplazado por ChatMessage)'
     )
+    
+    # Memoria resumida: turnos antiguos condensados + último mensaje incluido
     summary = models.TextField('Resumen', blank=True, null=True)
+    summary_until = models.PositiveBigIntegerField(
+        'Resumido hasta',
+        blank=True,
+        null=True,
+        help_text='ID del último ChatMessage incluido en el resumen'
+    )
     
     # Metadatos de la sesión
     created_at = models.DateTimeField('Creado', auto_now_add=True)
@@ -60,6 +69,16 @@ class ChatSession(models.Model):
         verbose_name = 'Sesión de chat'
         verbose_name_plural = 'Sesiones de chat'
         ordering = ['-updated_at']
+        indexes = [
+            # Changelist del admin (orden por defecto)
+            models.Index(fields=['-updated_at'], name='chat_session_updated_idx'),
+            # Sesiones activas, las más recientes primero
+            models.Index(
+                fields=['-updated_at'],
+                name='chat_session_active_idx',
+                condition=models.Q(is_active=True)
+            ),
+        ]
     
     def __str__(self):
         return f"Sesión {self.session_id} - {self.user_email or 'Anónimo'}"
@@ -119,6 +138,12 @@ class ChatMessage(models.Model):
         verbose_name = 'Mensaje de chat'
         verbose_name_plural = 'Mensajes de chat'
         ordering = ['created_at']
+        indexes = [
+            # Historial de una sesión y paginación keyset (created_at, id)
+            models.Index(fields=['session', 'created_at', 'id'], name='chat_msg_session_created_idx'),
+            # Changelist del admin
+            models.Index(fields=['created_at'], name='chat_msg_created_idx'),
+        ]
     
     def __str__(self):
         preview = self.content[:50] + '...' if len(self.content) > 50 else self.content
@@ -162,6 +187,119 @@ class KnowledgeDocument(models.Model):
         verbose_name = 'Documento de conocimiento'
         verbose_name_plural = 'Base de conocimiento'
         ordering = ['-updated_at']
+        indexes = [
+            # Recorrido incremental de `manage.py index_knowledge`
+            models.Index(fields=['id'], name='kd_active_idx', condition=models.Q(is_active=True)),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.get_category_display()})"
+
+
+class ChatJob(models.Model):
+    """
+    Turno de chat encolado (modo asíncrono).
+    La vista responde de inmediato con el job_id y `manage.py chat_worker`
+    ejecuta la llamada al LLM fuera del proceso web.
+    """
+    
+    KIND_CHOICES = [
+        ('service', 'ChatService (/chat/message/)'),
+        ('gemini', 'Gemini (/chat/api/)'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('done', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+    
+    # Identificador público para el polling (no expone IDs internos)
+    job_id = models.UUIDField('ID de trabajo', default=uuid.uuid4, unique=True, editable=False)
+    session = models.ForeignKey(
+        ChatSession,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        verbose_name='Sesión'
+    )
+    kind = models.CharField('Tipo', max_length=20, choices=KIND_CHOICES)
+    message = models.TextField('Mensaje')
+    
+    status = models.CharField('Estado', max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField('Resultado', blank=True, null=True)
+    error = models.TextField('Error', blank=True)
+    attempts = models.PositiveSmallIntegerField('Intentos', default=0)
+    worker = models.CharField('Worker', max_length=100, blank=True)
+    
+    created_at = models.DateTimeField('Creado', auto_now_add=True)
+    started_at = models.DateTimeField('Iniciado', blank=True, null=True)
+    finished_at = models.DateTimeField('Terminado', blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Trabajo de chat'
+        verbose_name_plural = 'Cola de trabajos de chat'
+        ordering = ['-created_at']
+        indexes = [
+            # Cola: trabajos pendientes en orden de llegada
+            models.Index(
+                fields=['created_at', 'id'],
+                name='chat_job_pending_idx',
+                condition=models.Q(status='pending')
+            ),
+            # Trabajos en ejecución (detección de workers caídos)
+            models.Index(
+                fields=['started_at'],
+                name='chat_job_running_idx',
+                condition=models.Q(status='running')
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Trabajo {self.job_id} ({self.get_status_display()})"
+
+
+class ChatDailyStats(models.Model):
+    """
+    Resumen diario de los turnos del chatbot (throughput, latencia, tokens).
+    Lo mantiene `manage.py rollup_chat_stats` (también chat_worker) a partir
+    de ChatMessage.metadata, recalculando solo los días con mensajes nuevos:
+    el admin lo lee sin recorrer la tabla de mensajes.
+    """
+    
+    date = models.DateField('Fecha', unique=True)
+    
+    # Throughput
+    turns = models.PositiveIntegerField('Turnos', default=0)
+    sessions = models.PositiveIntegerField('Sesiones', default=0)
+    cache_hits = models.PositiveIntegerField('Aciertos de caché', default=0)
+    
+    # Latencias (ms, solo turnos que llamaron al LLM)
+    avg_latency_ms = models.FloatField('Latencia promedio (ms)', blank=True, null=True)
+    p95_latency_ms = models.FloatField('Latencia p95 (ms)', blank=True, null=True)
+    p95_ttft_ms = models.FloatField('Primer token p95 (ms)', blank=True, null=True)
+    avg_retrieval_ms = models.FloatField('Recuperación promedio (ms)', blank=True, null=True)
+    
+    # Consumo de tokens
+    prompt_tokens = models.PositiveBigIntegerField('Tokens de prompt', default=0)
+    completion_tokens = models.PositiveBigIntegerField('Tokens de respuesta', default=0)
+    
+    # Último ChatMessage incluido (marca de agua del rollup incremental)
+    last_message_id = models.PositiveBigIntegerField('Último mensaje', default=0)
+    updated_at = models.DateTimeField('Actualizado', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estadística diaria del chat'
+        verbose_name_plural = 'Estadísticas diarias del chat'
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.date}: {self.turns} turnos"
+    
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+    
+    @property
+    def cache_hit_rate(self):
+        return self.cache_hits / self.turns if self.turns else 0.0
@@ -0,0 +1,58 @@
+"""
+Chat - Paginación keyset del historial
+
+Los mensajes se paginan por la clave (created_at, id), nunca con OFFSET:
+cada página cuesta lo mismo sin importar cuántos mensajes tenga la sesión.
+
+El cursor es opaco para el cliente: base64 url-safe de
+"<created_at ISO>|<id>".
+"""
+import base64
+import binascii
+from typing import Optional, Tuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado o manipulado."""
+
+
+def encode_cursor(created_at, message_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{message_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    """Retorna (created_at, id) o lanza InvalidCursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        timestamp, message_id = raw.rsplit('|', 1)
+        created_at = parse_datetime(timestamp)
+        message_id = int(message_id)
+    except (ValueError, UnicodeError, binascii.Error) as e:
+        raise InvalidCursor(str(e)) from e
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return created_at, message_id
+
+
+def after(cursor: Tuple) -> Q:
+    """Mensajes posteriores al cursor."""
+    created_at, message_id = cursor
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+
+
+def before(cursor: Tuple) -> Q:
+    """Mensajes anteriores al cursor."""
+    created_at, message_id = cursor
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+
+
+def message_cursor(message: dict) -> Optional[str]:
+    """Cursor de un mensaje serializado con values('id', 'created_at', ...)."""
+    if message is None:
+        return None
+    return encode_cursor(message['created_at'], message['id'])
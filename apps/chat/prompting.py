@@ -0,0 +1,141 @@
+"""
+Chat - Armado del prompt con presupuesto de tokens
+
+ChatService ya no concatena todo el contexto recuperado: PromptBuilder
+arma los mensajes dentro de CHAT_PROMPT_TOKEN_BUDGET.
+- system prompt, historial reciente (ya acotado por la memoria) y mensaje
+  del usuario siempre entran
+- los documentos se agregan por score descendente; el primero que no cabe
+  se recorta (si queda espacio útil) y el resto se descarta
+
+El conteo de tokens es una estimación local por largo del texto (sin
+llamadas a la API); cuesta menos que una búsqueda en caché, así que no se
+memoiza ni se retienen los textos de los usuarios.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.conf import settings
+
+from .memory import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from .services import Message, RetrievedDocument
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_HEADER = "Contexto relevante:\n"
+# Caracteres por token usados al recortar (coherente con estimate_tokens)
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """Tokens estimados de un texto."""
+    return estimate_tokens(text)
+
+
+def message_tokens(message: Message) -> int:
+    return count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def format_document(doc: RetrievedDocument) -> str:
+    return f"[Documento: {doc.source}]\n{doc.content}"
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Recorta un texto a ~tokens, cortando en el último espacio."""
+    max_chars = max(tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(' ')
+    return (cut[:space] if space > max_chars // 2 else cut).rstrip() + ' […]'
+
+
+@dataclass
+class PromptPlan:
+    """Resultado del armado: mensajes para el LLM y contabilidad de tokens."""
+    messages: List[Message]
+    documents: List[RetrievedDocument]
+    prompt_tokens: int
+    budget: int
+    dropped_documents: int = 0
+    truncated_documents: int = 0
+    document_tokens: List[int] = field(default_factory=list)
+
+
+class PromptBuilder:
+    """Arma el prompt respetando un presupuesto de tokens."""
+
+    def __init__(self, token_budget: Optional[int] = None, min_document_tokens: Optional[int] = None):
+        self.token_budget = (
+            token_budget if token_budget is not None else settings.CHAT_PROMPT_TOKEN_BUDGET
+        )
+        self.min_document_tokens = (
+            min_document_tokens if min_document_tokens is not None
+            else settings.CHAT_PROMPT_MIN_DOCUMENT_TOKENS
+        )
+
+    def build(
+        self,
+        system_prompt: str,
+        user_message: str,
+        documents: List[RetrievedDocument],
+        history: Optional[List[Message]] = None
+    ) -> PromptPlan:
+        system = Message(role='system', content=system_prompt)
+        user = Message(role='user', content=user_message)
+        history = history or []
+        used = message_tokens(system) + message_tokens(user)
+        used += sum(message_tokens(message) for message in history)
+
+        # Documentos por relevancia: se recortan/descartan los de menor score
+        remaining = self.token_budget - used - count_tokens(CONTEXT_HEADER) - MESSAGE_OVERHEAD_TOKENS
+        selected: List[RetrievedDocument] = []
+        blocks: List[str] = []
+        costs: List[int] = []
+        truncated = 0
+        for doc in sorted(documents, key=lambda d: d.score, reverse=True):
+            block = format_document(doc)
+            cost = count_tokens(block) + 1  # separador
+            if cost > remaining:
+                if remaining < self.min_document_tokens:
+                    break
+                header = count_tokens(f"[Documento: {doc.source}]\n")
+                block = format_document(RetrievedDocument(
+                    content=truncate_to_tokens(doc.content, remaining - header - 2),
+                    source=doc.source,
+                    score=doc.score,
+                    metadata={**doc.metadata, 'truncated': True},
+                ))
+                cost = count_tokens(block) + 1
+                truncated += 1
+            selected.append(doc)
+            blocks.append(block)
+            costs.append(cost)
+            remaining -= cost
+            if truncated:
+                break
+
+        messages = [system]
+        if blocks:
+            context = Message(role='system', content=CONTEXT_HEADER + "\n\n".join(blocks))
+            messages.append(context)
+            used += message_tokens(context)
+        messages.extend(history)
+        messages.append(user)
+
+        plan = PromptPlan(
+            messages=messages,
+            documents=selected,
+            prompt_tokens=used,
+            budget=self.token_budget,
+            dropped_documents=len(documents) - len(selected),
+            truncated_documents=truncated,
+            document_tokens=costs,
+        )
+        if plan.dropped_documents or plan.truncated_documents:
+            logger.info(
+                "Prompt ajustado al presupuesto (%s tokens): %s documentos descartados, %s recortados",
+                self.token_budget, plan.dropped_documents, plan.truncated_documents
+            )
+        return plan
@@ -2,17 +2,33 @@
 Chat - Capa de servicios para integración con LLMs
 
 ARQUITECTURA DE SERVICIOS:
-- ChatService: Orquesta la conversación
-- LLMProvider: Interfaz abstracta para LLMs (OpenAI, Anthropic, etc.)
-- RAGService: Retrieval-Augmented Generation (futura implementación)
+- ChatService: Orquesta la conversación (historial, RAG, presupuesto de
+  tokens y caché de respuestas)
+- LLMProvider: Interfaz abstracta para LLMs. GeminiProvider es el cliente
+  real; FailoverLLMProvider agrega deadlines, hedging y circuit breaker y
+  GatedLLMProvider el límite de concurrencia del host
+- VectorStore / Embedder: Recuperación (RAG) con los stores de
+  vectorstores.py (NumPy, IVF) y lexical.py (BM25, híbrido)
 
-NOTA: Esta es la ARQUITECTURA preparada, no la implementación completa.
-La lógica de IA se implementará en una fase posterior.
+Los factories get_*() arman cada pieza según settings. Los Placeholder*
+sirven para desarrollo sin API key ni índice.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 from dataclasses import dataclass
+import asyncio
 import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from bestia_site.metrics import llm_phase
+
+from .cache import ResponseCache, response_cache
+from .concurrency import ConcurrencyGate, llm_gate
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +54,14 @@ class LLMResponse:
     raw_response: Optional[Any] = None
 
 
+@dataclass
+class StreamChunk:
+    """Fragmento de una respuesta en streaming. El último trae tokens_used."""
+    text: str
+    model: str
+    tokens_used: Optional[Dict[str, int]] = None
+
+
 @dataclass
 class RetrievedDocument:
     """Documento recuperado del vector store (RAG)."""
@@ -68,6 +92,42 @@ class LLMProvider(ABC):
         """Genera una respuesta dado un historial de mensajes."""
         pass
     
+    async def agenerate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        """
+        Versión awaitable de generate().
+        
+        Por defecto ejecuta generate() en un thread aparte para no bloquear
+        el event loop. Los proveedores con cliente async nativo deben
+        sobrescribir este método.
+        """
+        return await sync_to_async(self.generate, thread_sensitive=False)(
+            messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+    
+    async def astream(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Respuesta en fragmentos (async generator de StreamChunk).
+        
+        Por defecto entrega la respuesta de agenerate() en un solo
+        fragmento. Los proveedores con streaming nativo deben sobrescribirlo.
+        """
+        response = await self.agenerate(
+            messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+        yield StreamChunk(response.content, response.model, response.tokens_used)
+    
     @abstractmethod
     def is_available(self) -> bool:
         """Verifica si el proveedor está disponible y configurado."""
@@ -90,6 +150,17 @@ class VectorStore(ABC):
         """Busca documentos relevantes para la query."""
         pass
     
+    async def asearch(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        """Versión awaitable de search() (por defecto en un thread aparte)."""
+        return await sync_to_async(self.search, thread_sensitive=False)(
+            query, top_k=top_k, filter=filter
+        )
+    
     @abstractmethod
     def upsert(
         self,
@@ -99,10 +170,53 @@ class VectorStore(ABC):
     ) -> bool:
         """Indexa o actualiza un documento."""
         pass
+    
+    def upsert_many(self, documents: List[tuple], embeddings: Optional[Any] = None) -> int:
+        """
+        Indexa varios documentos (document_id, content, metadata).
+        Las implementaciones con escritura en batch deben sobrescribirlo.
+        """
+        return sum(
+            1 for document_id, content, metadata in documents
+            if self.upsert(document_id, content, metadata)
+        )
+    
+    def delete(self, document_id: str) -> bool:
+        """Elimina un documento del índice."""
+        return False
+    
+    def document_ids(self) -> List[str]:
+        """IDs de todos los documentos indexados."""
+        return []
+    
+    def get_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata guardada para un documento (None si no existe)."""
+        return None
+    
+    def get_contents(self, document_ids: List[str]) -> Dict[str, str]:
+        """Contenido de los documentos pedidos (se omiten los que no existen)."""
+        return {}
+
+
+class Embedder(ABC):
+    """
+    Interfaz abstracta para modelos de embeddings.
+    Implementaciones en apps/chat/embeddings.py.
+    """
+    
+    dimension: int
+    
+    @abstractmethod
+    def embed(self, texts: List[str], task: str = 'document') -> Any:
+        """
+        Retorna una matriz (len(texts), dimension) de float32.
+        task: 'document' para indexar, 'query' para búsquedas.
+        """
+        pass
 
 
 # =============================================================================
-# SERVICE IMPLEMENTATIONS (STUBS)
+# SERVICE IMPLEMENTATIONS
 # =============================================================================
 
 class PlaceholderLLMProvider(LLMProvider):
@@ -159,10 +273,503 @@ class PlaceholderVectorStore(VectorStore):
         return False
 
 
+class GeminiProvider(LLMProvider):
+    """
+    Proveedor Gemini (google-generativeai) con cliente async nativo.
+    El primer mensaje 'system' es el system instruction (estático: es la
+    clave del pool de modelos); los demás (resumen, documentos, datos de
+    la sesión) van al historial del chat como un intercambio de contexto.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None):
+        from .gemini import PRIMARY_MODEL
+        self.model_name = model_name or PRIMARY_MODEL
+    
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        chat, last_message, config = self._start_chat(messages, temperature, max_tokens)
+        return self._to_response(chat.send_message(last_message, generation_config=config))
+    
+    async def agenerate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        chat, last_message, config = self._start_chat(messages, temperature, max_tokens)
+        return self._to_response(await chat.send_message_async(last_message, generation_config=config))
+    
+    async def astream(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[StreamChunk]:
+        chat, last_message, config = self._start_chat(messages, temperature, max_tokens)
+        response = await chat.send_message_async(last_message, generation_config=config, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield StreamChunk(chunk.text, self.model_name)
+        yield StreamChunk('', self.model_name, self._tokens(getattr(response, 'usage_metadata', None)))
+    
+    def is_available(self) -> bool:
+        from .gemini import registry
+        return registry.configure()
+    
+    def _start_chat(self, messages: List[Message], temperature: float, max_tokens: int):
+        from .gemini import registry
+        from .memory import CONTEXT_ACK
+        
+        if not registry.configure():
+            raise RuntimeError("GOOGLE_API_KEY no configurada")
+        system_instruction = ''
+        if messages and messages[0].role == 'system':
+            system_instruction, messages = messages[0].content, messages[1:]
+        if not messages or messages[-1].role != 'user':
+            raise ValueError("El último mensaje debe ser del usuario")
+        
+        history = []
+        for m in messages[:-1]:
+            if m.role == 'system':
+                history.append({'role': 'user', 'parts': [m.content]})
+                history.append({'role': 'model', 'parts': [CONTEXT_ACK]})
+            else:
+                history.append({'role': 'model' if m.role == 'assistant' else 'user', 'parts': [m.content]})
+        
+        model = registry.get_named_model(self.model_name, system_instruction)
+        chat = model.start_chat(history=history)
+        config = {'temperature': temperature, 'max_output_tokens': max_tokens}
+        return chat, messages[-1].content, config
+    
+    def _to_response(self, response) -> LLMResponse:
+        return LLMResponse(
+            content=response.text,
+            model=self.model_name,
+            tokens_used=self._tokens(getattr(response, 'usage_metadata', None)),
+            finish_reason='stop',
+            raw_response=response
+        )
+    
+    @staticmethod
+    def _tokens(usage) -> Dict[str, int]:
+        return {
+            'prompt': getattr(usage, 'prompt_token_count', 0) or 0,
+            'completion': getattr(usage, 'candidates_token_count', 0) or 0,
+            'total': getattr(usage, 'total_token_count', 0) or 0,
+        }
+
+
+# =============================================================================
+# RESILIENCIA: FAILOVER, HEDGING Y CIRCUIT BREAKER
+# =============================================================================
+
+class ProviderUnavailableError(Exception):
+    """Ningún proveedor respondió (todos fallaron, vencieron o están abiertos)."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por proveedor.
+    - closed: se llama normalmente
+    - open: tras failure_threshold fallas seguidas no se llama durante
+      reset_timeout segundos (no se paga la latencia de un timeout)
+    - half-open: pasado ese tiempo se deja pasar una llamada de prueba
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+    
+    def allow(self) -> bool:
+        """True si se puede llamar al proveedor (reserva la llamada de prueba)."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+    
+    def release(self) -> None:
+        """Libera la llamada de prueba reservada por allow() sin registrar resultado (cancelada)."""
+        with self._lock:
+            self._probing = False
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("Circuit breaker abierto tras %s fallas", self._failures)
+                self._opened_at = self._clock()
+            self._probing = False
+    
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+
+class LatencyTracker:
+    """Ventana deslizante de latencias exitosas para estimar percentiles."""
+    
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil q (0-1) o None si aún no hay suficientes muestras."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class FailoverLLMProvider(LLMProvider):
+    """
+    Proveedor compuesto: prueba varios proveedores en orden.
+    
+    - deadline por llamada (timeout): un upstream colgado no retiene el worker
+    - hedging: si la primera llamada no respondió tras el p95 observado, se
+      lanza una segunda (al siguiente proveedor disponible, o al mismo) y
+      gana la primera que responda
+    - circuit breaker por proveedor: tras fallas seguidas se salta el
+      proveedor hasta reset_timeout
+    
+    En astream() lo anterior aplica hasta el primer fragmento (el p95 es
+    el del tiempo al primer fragmento); después el deadline es entre
+    fragmentos y ya no hay failover: el texto parcial ya se entregó.
+    """
+    
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        timeout: float = 20.0,
+        hedge: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_initial_delay: float = 5.0,
+        hedge_min_delay: float = 0.05,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0
+    ):
+        if not providers:
+            raise ValueError("FailoverLLMProvider requiere al menos un proveedor")
+        self.providers = providers
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.breakers = [CircuitBreaker(failure_threshold, reset_timeout) for _ in providers]
+        self.latencies = [LatencyTracker() for _ in providers]
+        self.first_chunk_latencies = [LatencyTracker() for _ in providers]
+    
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        return async_to_sync(self.agenerate)(
+            messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+    
+    async def agenerate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        call_kwargs = {'temperature': temperature, 'max_tokens': max_tokens, **kwargs}
+        _, response = await self._failover(
+            lambda index: self.providers[index].agenerate(messages, **call_kwargs),
+            self.latencies
+        )
+        return response
+    
+    async def astream(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[StreamChunk]:
+        call_kwargs = {'temperature': temperature, 'max_tokens': max_tokens, **kwargs}
+        index, (stream, first) = await self._failover(
+            lambda index: _open_stream(self.providers[index].astream(messages, **call_kwargs)),
+            self.first_chunk_latencies,
+            discard=lambda opened: opened[0].aclose()
+        )
+        try:
+            if first is None:
+                return
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception:
+            self.breakers[index].record_failure()
+            raise
+        finally:
+            await stream.aclose()
+    
+    def is_available(self) -> bool:
+        return any(
+            breaker.state != CircuitBreaker.OPEN and provider.is_available()
+            for provider, breaker in zip(self.providers, self.breakers)
+        )
+    
+    def hedge_delay(self, index: int, latencies: Optional[List[LatencyTracker]] = None) -> Optional[float]:
+        """Segundos de espera antes de lanzar la llamada de respaldo."""
+        if not self.hedge:
+            return None
+        p95 = (latencies or self.latencies)[index].percentile(self.hedge_percentile)
+        delay = self.hedge_initial_delay if p95 is None else p95
+        return max(delay, self.hedge_min_delay)
+    
+    async def _failover(
+        self,
+        call: Callable[[int], Awaitable[Any]],
+        latencies: List[LatencyTracker],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Tuple[int, Any]:
+        """Prueba los proveedores en orden. Retorna (índice que respondió, resultado)."""
+        errors = []
+        for index in range(len(self.providers)):
+            if not self.breakers[index].allow():
+                errors.append(f"{self._name(index)}: circuito abierto")
+                continue
+            try:
+                return await self._attempt(index, call, latencies, discard)
+            except Exception as e:
+                errors.append(f"{self._name(index)}: {type(e).__name__}: {e}")
+                logger.warning("Proveedor %s falló, probando el siguiente: %s", self._name(index), e)
+        raise ProviderUnavailableError('; '.join(errors) or 'sin proveedores')
+    
+    async def _attempt(
+        self,
+        index: int,
+        call: Callable[[int], Awaitable[Any]],
+        latencies: List[LatencyTracker],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Tuple[int, Any]:
+        """
+        Una llamada con deadline y, si se atrasa, una segunda en paralelo.
+        `discard` cierra el resultado de una llamada que respondió pero no
+        se usa (p. ej. un stream que perdió contra otro).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        tasks: Dict[asyncio.Task, int] = {
+            self._call(index, call, latencies): index
+        }
+        hedged = False
+        try:
+            while tasks:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                delay = None if hedged else self.hedge_delay(index, latencies)
+                wait_for = remaining if delay is None else min(delay, remaining)
+                done, _ = await asyncio.wait(tasks, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                
+                winner, error = None, None
+                for task in done:
+                    task_index = tasks.pop(task)
+                    if task.exception() is not None:
+                        self.breakers[task_index].record_failure()
+                        error = task.exception()
+                    elif winner is None:
+                        winner = (task_index, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    return winner
+                if error is not None and not tasks:
+                    raise error
+                
+                if not done and not hedged and delay is not None and loop.time() < deadline:
+                    hedged = True
+                    hedge_index = self._hedge_target(index)
+                    if hedge_index is None:
+                        logger.info("Hedging omitido: %s no respondió y no hay circuito disponible", self._name(index))
+                        continue
+                    logger.info(
+                        "Hedging: %s no respondió en %.2fs, lanzando %s",
+                        self._name(index), wait_for, self._name(hedge_index)
+                    )
+                    tasks[self._call(hedge_index, call, latencies)] = hedge_index
+            
+            # Vencido el deadline: se cancelan y cuentan como falla
+            for task in tasks:
+                task.cancel()
+            for task_index in set(tasks.values()):
+                self.breakers[task_index].record_failure()
+            tasks.clear()
+            raise TimeoutError(f"Sin respuesta en {self.timeout:.1f}s")
+        finally:
+            # Llamadas perdedoras: se cancelan sin contar como falla, pero
+            # liberan la llamada de prueba si su circuito estaba half-open
+            for task, task_index in tasks.items():
+                task.cancel()
+                self.breakers[task_index].release()
+    
+    def _call(
+        self,
+        index: int,
+        call: Callable[[int], Awaitable[Any]],
+        latencies: List[LatencyTracker]
+    ) -> asyncio.Task:
+        async def run():
+            started = time.monotonic()
+            result = await call(index)
+            latencies[index].record(time.monotonic() - started)
+            self.breakers[index].record_success()
+            return result
+        return asyncio.ensure_future(run())
+    
+    def _hedge_target(self, index: int) -> Optional[int]:
+        """
+        Siguiente proveedor cuyo circuit breaker permite la llamada (o el
+        mismo); None si ninguno. allow() reserva la llamada de prueba de
+        un circuito half-open: su resultado se registra en ese breaker.
+        """
+        for candidate in [*range(index + 1, len(self.providers)), index]:
+            if self.breakers[candidate].allow():
+                return candidate
+        return None
+    
+    def _name(self, index: int) -> str:
+        provider = self.providers[index]
+        return getattr(provider, 'model_name', None) or type(provider).__name__
+
+
+async def _open_stream(stream: AsyncIterator[StreamChunk]) -> Tuple[AsyncIterator[StreamChunk], Optional[StreamChunk]]:
+    """Espera el primer fragmento. Retorna (stream, primer fragmento o None si vino vacío)."""
+    try:
+        return stream, await stream.__anext__()
+    except StopAsyncIteration:
+        return stream, None
+    except BaseException:
+        await stream.aclose()
+        raise
+
+
+class GatedLLMProvider(LLMProvider):
+    """
+    Limita las llamadas concurrentes al proveedor en todo el host
+    (ConcurrencyGate). Sin capacidad lanza LLMOverloadedError (503).
+    """
+    
+    def __init__(self, provider: LLMProvider, gate: Optional[ConcurrencyGate] = None):
+        self.provider = provider
+        self.gate = gate or llm_gate
+    
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        with self.gate.slot():
+            return self.provider.generate(
+                messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+            )
+    
+    async def agenerate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        async with self.gate.aslot():
+            return await self.provider.agenerate(
+                messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+            )
+    
+    async def astream(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[StreamChunk]:
+        # El cupo se mantiene hasta el último fragmento
+        async with self.gate.aslot():
+            stream = self.provider.astream(
+                messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+            )
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+    
+    def is_available(self) -> bool:
+        return self.provider.is_available()
+
+
 # =============================================================================
 # MAIN CHAT SERVICE
 # =============================================================================
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _timed(awaitable, timings: Dict[str, float], key: str):
+    """Espera `awaitable` y registra su duración en timings[key] (ms)."""
+    started = time.perf_counter()
+    result = await awaitable
+    timings[key] = _elapsed_ms(started)
+    return result
+
+
 class ChatService:
     """
     Servicio principal de chat.
@@ -172,10 +779,16 @@ class ChatService:
     def __init__(
         self,
         llm_provider: Optional[LLMProvider] = None,
-        vector_store: Optional[VectorStore] = None
+        vector_store: Optional[VectorStore] = None,
+        cache: Optional[ResponseCache] = None,
+        prompt_builder=None
     ):
+        from .prompting import PromptBuilder
+        
         self.llm = llm_provider or PlaceholderLLMProvider()
         self.vector_store = vector_store or PlaceholderVectorStore()
+        self.cache = cache if cache is not None else response_cache
+        self.prompt_builder = prompt_builder or PromptBuilder()
         
         # System prompt base
         self.system_prompt = """Eres un asistente de bestIA Engineering, una consultora de IA B2B.
@@ -200,46 +813,215 @@ sugiere contactar directamente a contacto@bestia.cl."""
         """
         Procesa un mensaje del usuario y genera respuesta.
         
+        Recuperación (RAG) e historial corren en el pool del pipeline, cada
+        uno con su deadline (CHAT_RETRIEVAL_TIMEOUT / CHAT_HISTORY_TIMEOUT);
+        la etapa que se atrasa o falla se omite en vez de bloquear el turno.
+        
         Args:
             session_id: ID de la sesión de chat
             user_message: Mensaje del usuario
             use_rag: Si True, busca en base de conocimiento
         
         Returns:
-            Dict con respuesta y metadatos
+            Dict con respuesta y metadatos (timings: retrieval_ms, llm_ms;
+            needs_compaction: el historial ya no cabe en la ventana)
         """
-        # 1. Recuperar contexto relevante (RAG)
+        from django.conf import settings
+        
+        degraded: List[str] = []
+        timings: Dict[str, float] = {}
+        
+        # 1. Historial y contexto relevante (RAG) en paralelo
+        started = time.perf_counter()
+        executor = _get_pipeline_executor()
+        history_load = executor.submit(_with_db_connection, self.load_history, session_id)
+        retrieval = None
+        if use_rag:
+            retrieval = executor.submit(self.vector_store.search, user_message, top_k=3)
+        
+        try:
+            history, needs_compaction = _stage_result(
+                'history', history_load, started + settings.CHAT_HISTORY_TIMEOUT
+            )
+        except Exception as e:
+            self._log_degraded('history', e)
+            history, needs_compaction = [], False
+            degraded.append('history')
+        
         context_docs = []
+        if retrieval is not None:
+            try:
+                context_docs = _stage_result(
+                    'retrieval', retrieval, started + settings.CHAT_RETRIEVAL_TIMEOUT
+                )
+                timings['retrieval_ms'] = _elapsed_ms(started)
+            except Exception as e:
+                self._log_degraded('retrieval', e)
+                degraded.append('retrieval')
+        
+        # 2. Construir mensajes para el LLM (dentro del presupuesto de tokens)
+        plan = self._build_prompt(user_message, context_docs, history)
+        
+        # 3. Respuesta cacheada (misma pregunta, mismo prompt y contexto)
+        cache_key = self._cache_key(plan.messages)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return {
+                **cached, 'cache_hit': True, 'degraded': degraded, 'timings': timings,
+                'needs_compaction': needs_compaction,
+            }
+        
+        # 4. Generar respuesta
+        started = time.perf_counter()
+        with llm_phase():
+            response = self.llm.generate(plan.messages)
+        timings['llm_ms'] = _elapsed_ms(started)
+        
+        result = self._build_result(response, plan)
+        if not degraded:
+            self.cache.set(cache_key, result)
+        return {
+            **result, 'cache_hit': False, 'degraded': degraded, 'timings': timings,
+            'needs_compaction': needs_compaction,
+        }
+
+    async def aprocess_message(
+        self,
+        session_id: str,
+        user_message: str,
+        use_rag: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Versión async de process_message() para vistas ASGI.
+        Recuperación e historial corren como tareas concurrentes, cada una
+        con su deadline (CHAT_RETRIEVAL_TIMEOUT / CHAT_HISTORY_TIMEOUT).
+        """
+        from django.conf import settings
+        
+        timings: Dict[str, float] = {}
+        stages = {
+            'history': asyncio.wait_for(
+                self.aload_history(session_id), settings.CHAT_HISTORY_TIMEOUT
+            ),
+        }
         if use_rag:
-            context_docs = self.vector_store.search(user_message, top_k=3)
+            stages['retrieval'] = asyncio.wait_for(
+                _timed(self.vector_store.asearch(user_message, top_k=3), timings, 'retrieval_ms'),
+                settings.CHAT_RETRIEVAL_TIMEOUT
+            )
+        outcomes = dict(zip(
+            stages, await asyncio.gather(*stages.values(), return_exceptions=True)
+        ))
         
-        # 2. Construir mensajes para el LLM
-        messages = [Message(role='system', content=self.system_prompt)]
+        degraded: List[str] = []
+        for stage, outcome in outcomes.items():
+            if isinstance(outcome, BaseException):
+                self._log_degraded(stage, outcome)
+                degraded.append(stage)
+                outcomes[stage] = ([], False) if stage == 'history' else []
         
-        # Agregar contexto de documentos si existe
-        if context_docs:
-            context_text = "\n\n".join([
-                f"[Documento: {doc.source}]\n{doc.content}"
-                for doc in context_docs
-            ])
-            messages.append(Message(
-                role='system',
-                content=f"Contexto relevante:\n{context_text}"
-            ))
+        history, needs_compaction = outcomes['history']
+        plan = self._build_prompt(user_message, outcomes.get('retrieval', []), history)
+        
+        cache_key = self._cache_key(plan.messages)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return {
+                **cached, 'cache_hit': True, 'degraded': degraded, 'timings': timings,
+                'needs_compaction': needs_compaction,
+            }
+        
+        started = time.perf_counter()
+        with llm_phase():
+            response = await self.llm.agenerate(plan.messages)
+        timings['llm_ms'] = _elapsed_ms(started)
         
-        # TODO: Agregar historial de conversación desde la sesión
+        result = self._build_result(response, plan)
+        if not degraded:
+            self.cache.set(cache_key, result)
+        return {
+            **result, 'cache_hit': False, 'degraded': degraded, 'timings': timings,
+            'needs_compaction': needs_compaction,
+        }
+
+    def load_history(self, session_id: str) -> Tuple[List[Message], bool]:
+        """
+        Resumen + turnos recientes de la sesión (ventana acotada).
+        Retorna (mensajes, requiere_compactación).
+        """
+        from .memory import load_recent_history
+        from .models import ChatSession
         
-        # Agregar mensaje del usuario
-        messages.append(Message(role='user', content=user_message))
+        session = ChatSession.objects.only('summary', 'summary_until').filter(
+            session_id=session_id
+        ).first()
+        if session is None:
+            return [], False
+        recent, needs_compaction = load_recent_history(session)
+        return self._history_messages(session.summary, recent), needs_compaction
+
+    async def aload_history(self, session_id: str) -> Tuple[List[Message], bool]:
+        """Versión async de load_history()."""
+        from .memory import aload_recent_history
+        from .models import ChatSession
         
-        # 3. Generar respuesta
-        response = self.llm.generate(messages)
+        session = await ChatSession.objects.only('summary', 'summary_until').filter(
+            session_id=session_id
+        ).afirst()
+        if session is None:
+            return [], False
+        recent, needs_compaction = await aload_recent_history(session)
+        return self._history_messages(session.summary, recent), needs_compaction
+
+    @staticmethod
+    def _history_messages(summary: Optional[str], recent: List[Dict]) -> List[Message]:
+        from .memory import entry_text
         
+        messages = []
+        if summary:
+            messages.append(Message(
+                role='system',
+                content=f"Resumen de la conversación anterior: {summary}"
+            ))
+        for entry in recent:
+            role = 'assistant' if entry['role'] == 'model' else 'user'
+            messages.append(Message(role=role, content=entry_text(entry)))
+        return messages
+
+    @staticmethod
+    def _log_degraded(stage: str, error: BaseException) -> None:
+        if isinstance(error, (TimeoutError, FuturesTimeoutError)):
+            logger.warning("Etapa '%s' excedió su deadline; se responde sin ella", stage)
+        else:
+            logger.error("Etapa '%s' falló (%s); se responde sin ella", stage, error)
+
+    def _build_prompt(
+        self,
+        user_message: str,
+        context_docs: List[RetrievedDocument],
+        history: Optional[List[Message]] = None
+    ):
+        """Construye los mensajes para el LLM dentro del presupuesto de tokens."""
+        plan = self.prompt_builder.build(self.system_prompt, user_message, context_docs, history)
+        logger.debug(
+            "Prompt: %s/%s tokens estimados, %s documentos",
+            plan.prompt_tokens, plan.budget, len(plan.documents)
+        )
+        return plan
+
+    def _cache_key(self, messages: List[Message]) -> str:
+        """Clave de caché: último mensaje del usuario + todo el contexto previo."""
+        context = "\n".join(f"{m.role}:{m.content}" for m in messages[1:-1])
+        return self.cache.make_key(messages[-1].content, self.system_prompt, context)
+
+    def _build_result(self, response: LLMResponse, plan) -> Dict[str, Any]:
+        """Formatea la respuesta del LLM para las vistas."""
         return {
             'response': response.content,
-            'sources': [doc.source for doc in context_docs],
+            'sources': [doc.source for doc in plan.documents],
             'model': response.model,
             'tokens': response.tokens_used,
+            'prompt_tokens': plan.prompt_tokens,
         }
 
 
@@ -247,15 +1029,161 @@ sugiere contactar directamente a contacto@bestia.cl."""
 # FACTORY
 # =============================================================================
 
-def get_chat_service() -> ChatService:
+_pipeline_executor: Optional[ThreadPoolExecutor] = None
+_pipeline_lock = threading.Lock()
+
+
+def _with_db_connection(func, *args):
     """
-    Factory para obtener el servicio de chat configurado.
-    En el futuro, aquí se inyectarán los proveedores reales.
+    Ejecuta `func` en un thread del pool y libera su conexión a BD al
+    terminar, como lo haría el ciclo de un request.
     """
-    # TODO: Detectar configuración de entorno y usar proveedores reales
-    # from decouple import config
-    # if config('OPENAI_API_KEY', default=None):
-    #     llm = OpenAIProvider(api_key=config('OPENAI_API_KEY'))
-    # ...
+    from django.db import close_old_connections
     
-    return ChatService()
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def _stage_result(stage: str, future: Future, deadline: float):
+    """
+    Resultado de una etapa del pipeline dentro de su deadline
+    (time.perf_counter()). Si se vence, la etapa queda abandonada: un
+    futuro que ya está corriendo no se puede interrumpir y conserva su
+    worker hasta terminar, por eso CHAT_PIPELINE_WORKERS debe cubrir los
+    turnos concurrentes más las etapas abandonadas.
+    """
+    try:
+        return future.result(timeout=max(0.0, deadline - time.perf_counter()))
+    except FuturesTimeoutError:
+        if not future.cancel():
+            abandoned_at = time.perf_counter()
+            future.add_done_callback(lambda _: logger.info(
+                "Etapa '%s' abandonada terminó %.1f ms después de su deadline",
+                stage, (time.perf_counter() - abandoned_at) * 1000
+            ))
+        raise
+
+
+def _get_pipeline_executor() -> ThreadPoolExecutor:
+    """Pool acotado (CHAT_PIPELINE_WORKERS) para las etapas previas al LLM."""
+    global _pipeline_executor
+    if _pipeline_executor is None:
+        from django.conf import settings
+        
+        with _pipeline_lock:
+            if _pipeline_executor is None:
+                _pipeline_executor = ThreadPoolExecutor(
+                    max_workers=settings.CHAT_PIPELINE_WORKERS,
+                    thread_name_prefix='chat-pipeline'
+                )
+    return _pipeline_executor
+
+
+def get_embedder() -> Embedder:
+    """Embedder según settings.CHAT_EMBEDDER ('hashing' o 'gemini')."""
+    from django.conf import settings
+    from .embeddings import GeminiEmbedder, HashingEmbedder
+    
+    if settings.CHAT_EMBEDDER == 'gemini':
+        return GeminiEmbedder()
+    return HashingEmbedder()
+
+
+_vector_store: Optional[VectorStore] = None
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Store de recuperación según settings:
+    - CHAT_VECTOR_STORE: 'placeholder', 'numpy' o 'ivf'
+    - CHAT_RETRIEVAL_MODE: 'vector', 'lexical' (BM25) o 'hybrid'
+    Es una instancia por proceso: los índices cargados se reutilizan.
+    """
+    global _vector_store
+    if _vector_store is None:
+        from django.conf import settings
+        
+        mode = settings.CHAT_RETRIEVAL_MODE
+        if mode in ('lexical', 'hybrid'):
+            from pathlib import Path
+            from .lexical import BM25Index, HybridVectorStore
+            
+            path = Path(settings.CHAT_DATA_DIR) / 'bm25'
+            # En modo 'lexical' no se abre (ni se mapea) el store de embeddings
+            base = _build_base_vector_store() if mode == 'hybrid' else None
+            if base is None or isinstance(base, PlaceholderVectorStore):
+                _vector_store = BM25Index(path)
+            else:
+                # El contenido de los documentos lo guarda solo el vector store
+                _vector_store = HybridVectorStore(
+                    base, BM25Index(path, content_store=base), alpha=settings.CHAT_HYBRID_ALPHA
+                )
+        else:
+            _vector_store = _build_base_vector_store()
+    return _vector_store
+
+
+def _build_base_vector_store() -> VectorStore:
+    """Vector store de embeddings según settings.CHAT_VECTOR_STORE."""
+    from pathlib import Path
+    from django.conf import settings
+    
+    backend = settings.CHAT_VECTOR_STORE
+    if backend == 'numpy':
+        from .vectorstores import NumpyVectorStore
+        return NumpyVectorStore(
+            Path(settings.CHAT_DATA_DIR) / 'vectors',
+            embedder=get_embedder()
+        )
+    if backend == 'ivf':
+        from .vectorstores import IVFVectorStore
+        return IVFVectorStore(
+            Path(settings.CHAT_DATA_DIR) / 'vectors',
+            embedder=get_embedder(),
+            nlist=settings.CHAT_IVF_NLIST,
+            nprobe=settings.CHAT_IVF_NPROBE,
+            min_train_size=settings.CHAT_IVF_MIN_TRAIN_SIZE
+        )
+    return PlaceholderVectorStore()
+
+
+_gemini_provider: Optional[LLMProvider] = None
+
+
+def get_gemini_provider() -> LLMProvider:
+    """
+    Gemini con failover al modelo de respaldo, deadlines, hedging y
+    circuit breaker, detrás del límite de concurrencia del host. Una
+    instancia por proceso: las latencias observadas y el estado de los
+    breakers se comparten entre requests.
+    """
+    global _gemini_provider
+    if _gemini_provider is None:
+        from django.conf import settings
+        from .gemini import FALLBACK_MODEL, PRIMARY_MODEL
+        
+        _gemini_provider = GatedLLMProvider(FailoverLLMProvider(
+            [GeminiProvider(PRIMARY_MODEL), GeminiProvider(FALLBACK_MODEL)],
+            timeout=settings.CHAT_LLM_TIMEOUT,
+            hedge=settings.CHAT_LLM_HEDGE,
+            failure_threshold=settings.CHAT_LLM_BREAKER_THRESHOLD,
+            reset_timeout=settings.CHAT_LLM_BREAKER_RESET
+        ))
+    return _gemini_provider
+
+
+def get_llm_provider() -> LLMProvider:
+    """Proveedor según settings.CHAT_LLM_PROVIDER ('placeholder' o 'gemini')."""
+    from django.conf import settings
+    
+    if settings.CHAT_LLM_PROVIDER == 'gemini':
+        return get_gemini_provider()
+    return PlaceholderLLMProvider()
+
+
+def get_chat_service() -> ChatService:
+    """Factory para obtener el servicio de chat configurado."""
+    return ChatService(llm_provider=get_llm_provider(), vector_store=get_vector_store())
@@ -0,0 +1,18 @@
+"""
+Chat - Señales
+
+Mantiene derivados de la base de conocimiento (caché de respuestas)
+coherentes cuando cambian los KnowledgeDocument.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import response_cache
+from .models import KnowledgeDocument
+
+
+@receiver(post_save, sender=KnowledgeDocument)
+@receiver(post_delete, sender=KnowledgeDocument)
+def invalidate_response_cache(sender, **kwargs):
+    """Una respuesta cacheada puede depender del documento modificado."""
+    response_cache.invalidate()
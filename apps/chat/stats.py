@@ -0,0 +1,128 @@
+"""
+Chat - Estadísticas diarias (ChatDailyStats)
+
+Cada mensaje del asistente guarda en metadata la latencia del LLM, el
+tiempo al primer token, los tokens y si fue acierto de caché (ver
+turns.turn_metadata). rollup() condensa esos datos por día:
+- solo recalcula los días que tienen mensajes posteriores a la marca de
+  agua (last_message_id), leyendo ese día por el índice de created_at
+- los ids se asignan al insertar pero las transacciones confirman en otro
+  orden: un turno lento puede quedar bajo la marca de agua, por eso los
+  últimos TRAILING_DAYS días con actividad se recalculan siempre
+- cada día se recalcula completo: ejecutarlo dos veces (o en paralelo
+  desde varios workers) da el mismo resultado
+"""
+import logging
+import math
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import ChatDailyStats, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Días (hoy incluido) que se recalculan en cada rollup aunque no haya ids
+# sobre la marca de agua
+TRAILING_DAYS = 2
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil por rango más cercano (None si no hay datos)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _average(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 1) if values else None
+
+
+def message_tokens(metadata: Dict) -> Tuple[int, int]:
+    """(prompt, completion) de un mensaje; acepta el formato anterior ('tokens')."""
+    if 'completion_tokens' in metadata:
+        return metadata.get('prompt_tokens') or 0, metadata.get('completion_tokens') or 0
+    tokens = metadata.get('tokens') or {}
+    return tokens.get('prompt') or 0, tokens.get('completion') or 0
+
+
+def day_range(day) -> Tuple[datetime, datetime]:
+    """Inicio y fin (exclusivo) del día en la zona horaria del sitio."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def compute_day(day) -> Dict:
+    """Recorre los mensajes del asistente de un día y calcula sus estadísticas."""
+    start, end = day_range(day)
+    messages = ChatMessage.objects.filter(
+        role='assistant', created_at__gte=start, created_at__lt=end
+    ).values_list('id', 'session_id', 'metadata')
+
+    turns = cache_hits = prompt_tokens = completion_tokens = last_id = 0
+    sessions = set()
+    latencies, ttfts, retrievals = [], [], []
+    for message_id, session_id, metadata in messages.iterator(chunk_size=2000):
+        metadata = metadata or {}
+        turns += 1
+        sessions.add(session_id)
+        last_id = max(last_id, message_id)
+        if metadata.get('cache_hit'):
+            cache_hits += 1
+        if metadata.get('latency_ms') is not None:
+            latencies.append(metadata['latency_ms'])
+        if metadata.get('ttft_ms') is not None:
+            ttfts.append(metadata['ttft_ms'])
+        if metadata.get('retrieval_ms') is not None:
+            retrievals.append(metadata['retrieval_ms'])
+        prompt, completion = message_tokens(metadata)
+        prompt_tokens += prompt
+        completion_tokens += completion
+
+    return {
+        'turns': turns,
+        'sessions': len(sessions),
+        'cache_hits': cache_hits,
+        'avg_latency_ms': _average(latencies),
+        'p95_latency_ms': percentile(latencies, 0.95),
+        'p95_ttft_ms': percentile(ttfts, 0.95),
+        'avg_retrieval_ms': _average(retrievals),
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'last_message_id': last_id,
+    }
+
+
+def pending_days(full: bool = False) -> List:
+    """
+    Días con mensajes del asistente posteriores a la marca de agua, más los
+    últimos TRAILING_DAYS días con actividad.
+    """
+    pending = Q()
+    if not full:
+        watermark = ChatDailyStats.objects.aggregate(last=Max('last_message_id'))['last'] or 0
+        window_start, _ = day_range(timezone.localdate() - timedelta(days=TRAILING_DAYS - 1))
+        pending = Q(id__gt=watermark) | Q(created_at__gte=window_start)
+    return [
+        moment.date()
+        for moment in ChatMessage.objects.filter(pending, role='assistant')
+        .datetimes('created_at', 'day')
+    ]
+
+
+def rollup(full: bool = False) -> List:
+    """Actualiza ChatDailyStats. Retorna los días recalculados."""
+    days = pending_days(full)
+    for day in days:
+        ChatDailyStats.objects.update_or_create(date=day, defaults=compute_day(day))
+    if days:
+        logger.info("ChatDailyStats actualizado: %s día(s)", len(days))
+    return days
+
+
+def recent_stats(days: int = 14) -> List[ChatDailyStats]:
+    """Últimos `days` días con actividad (para el admin)."""
+    return list(ChatDailyStats.objects.order_by('-date')[:days])
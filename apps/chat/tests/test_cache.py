@@ -0,0 +1,126 @@
+"""
+ResponseCache: normalización, claves, TTL, LRU e invalidación (stamp
+compartido entre workers y señales de KnowledgeDocument).
+"""
+import os
+
+import pytest
+
+from apps.chat import cache as cache_module
+from apps.chat.cache import ResponseCache, fingerprint, normalize_message, response_cache
+from apps.chat.models import KnowledgeDocument
+
+
+class Clock:
+    """Reemplazo de time.monotonic controlado por el test."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+
+# -----------------------------------------------------------------------------
+# Claves
+# -----------------------------------------------------------------------------
+
+def test_normalize_message():
+    assert normalize_message('¿Cuál es el  PRECIO?') == 'cual es el precio'
+    assert normalize_message('  IAlfabetización,\tcursos!! ') == 'ialfabetizacion cursos'
+
+
+def test_fingerprint_separates_parts():
+    assert fingerprint('a', 'b') == fingerprint('a', 'b')
+    assert fingerprint('ab', '') != fingerprint('a', 'b')
+    assert len(fingerprint('x')) == 64
+
+
+def test_make_key_normalizes_message_and_hashes_context():
+    cache = ResponseCache()
+    key = cache.make_key('¿Dónde están?', 'prompt', 'contexto')
+    assert key == cache.make_key('donde estan', 'prompt', 'contexto')
+    assert key != cache.make_key('donde estan', 'otro prompt', 'contexto')
+    assert key != cache.make_key('donde estan', 'prompt', 'otro contexto')
+
+
+# -----------------------------------------------------------------------------
+# TTL y LRU
+# -----------------------------------------------------------------------------
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.set('k', 'valor')
+    clock.now += 59
+    assert cache.get('k') == 'valor'
+    clock.now += 1
+    assert cache.get('k') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 0}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_zero_entries_disables_cache():
+    cache = ResponseCache(max_entries=0)
+    cache.set('k', 'valor')
+    assert cache.get('k') is None
+
+
+# -----------------------------------------------------------------------------
+# Invalidación
+# -----------------------------------------------------------------------------
+
+def test_stamp_propagates_invalidation_between_workers(tmp_path, clock):
+    stamp = tmp_path / 'chat' / 'response-cache.stamp'
+    worker_a = ResponseCache(stamp_path=stamp)
+    worker_b = ResponseCache(stamp_path=stamp)
+    worker_b.get('k')  # lee el stamp inicial (inexistente)
+    worker_b.set('k', 'valor')
+
+    worker_a.invalidate()
+    assert stamp.exists()
+    # El stamp se revisa cada STAMP_CHECK_INTERVAL segundos
+    assert worker_b.get('k') == 'valor'
+    clock.now += cache_module.STAMP_CHECK_INTERVAL
+    assert worker_b.get('k') is None
+
+
+def test_unchanged_stamp_keeps_entries(tmp_path, clock):
+    stamp = tmp_path / 'response-cache.stamp'
+    stamp.touch()
+    cache = ResponseCache(stamp_path=stamp)
+    cache.set('k', 'valor')
+    for _ in range(3):
+        clock.now += cache_module.STAMP_CHECK_INTERVAL
+        assert cache.get('k') == 'valor'
+    os.utime(stamp, ns=(0, 0))
+    clock.now += cache_module.STAMP_CHECK_INTERVAL
+    assert cache.get('k') is None
+
+
+@pytest.mark.parametrize('change', ['save', 'delete'])
+def test_knowledge_document_signals_invalidate(db, change):
+    document = KnowledgeDocument.objects.create(title='Precios', content='Planes y precios')
+    response_cache.set('k', 'valor')
+    if change == 'save':
+        document.content = 'Precios actualizados'
+        document.save()
+    else:
+        document.delete()
+    assert response_cache.get('k') is None
@@ -0,0 +1,90 @@
+"""
+ConcurrencyGate: límite de slots, cola acotada y rechazo con Retry-After.
+Cada instancia sobre el mismo directorio se comporta como otro worker.
+"""
+import asyncio
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from apps.chat.concurrency import SHED_RETRY_AFTER, ConcurrencyGate, LLMOverloadedError, fcntl
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason='ConcurrencyGate requiere fcntl')
+
+
+@pytest.fixture
+def gate_dir(tmp_path):
+    return tmp_path / 'llm-gate'
+
+
+def _gate(gate_dir, limit=2, queue_size=0, queue_timeout=1.0):
+    return ConcurrencyGate(
+        gate_dir, limit=limit, queue_size=queue_size, queue_timeout=queue_timeout, poll_interval=0.005
+    )
+
+
+def test_limit_is_shared_between_instances(gate_dir):
+    gate, other_worker = _gate(gate_dir), _gate(gate_dir)
+    with ExitStack() as held:
+        held.enter_context(gate.slot())
+        held.enter_context(other_worker.slot())
+        assert gate.stats()['in_flight'] == 2
+        with pytest.raises(LLMOverloadedError, match='cola de espera llena') as excinfo:
+            with gate.slot():
+                pass
+    assert excinfo.value.retry_after == SHED_RETRY_AFTER
+    assert gate.stats() == {'limit': 2, 'in_flight': 0, 'queue_size': 0, 'queued': 0, 'shed': 1}
+
+
+def test_slot_is_released_after_error(gate_dir):
+    gate = _gate(gate_dir, limit=1)
+    with pytest.raises(RuntimeError):
+        with gate.slot():
+            raise RuntimeError('fallo del LLM')
+    with gate.slot():
+        assert gate.stats()['in_flight'] == 1
+
+
+def test_queue_timeout_sheds(gate_dir):
+    gate = _gate(gate_dir, limit=1, queue_size=1, queue_timeout=0.05)
+    with gate.slot():
+        started = time.monotonic()
+        with pytest.raises(LLMOverloadedError, match='tiempo de espera'):
+            with gate.slot():
+                pass
+        assert time.monotonic() - started >= 0.05
+    assert gate.stats()['queued'] == 0
+
+
+def test_bounded_queue_hands_slot_to_waiter(gate_dir):
+    gate = _gate(gate_dir, limit=1, queue_size=1)
+    order = []
+
+    async def waiter():
+        async with gate.aslot():
+            order.append('en cola -> slot')
+
+    async def scenario():
+        async with gate.aslot():
+            task = asyncio.create_task(waiter())
+            while gate.stats()['queued'] == 0:
+                await asyncio.sleep(0.001)
+            # Slot y cola ocupados: el siguiente se rechaza sin esperar
+            with pytest.raises(LLMOverloadedError, match='cola de espera llena'):
+                async with gate.aslot():
+                    pass
+            order.append('libera')
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(scenario())
+    assert order == ['libera', 'en cola -> slot']
+    stats = gate.stats()
+    assert (stats['in_flight'], stats['queued'], stats['shed']) == (0, 0, 1)
+
+
+def test_zero_limit_disables_gate(gate_dir):
+    gate = _gate(gate_dir, limit=0)
+    with gate.slot(), gate.slot():
+        pass
+    assert not gate_dir.exists()
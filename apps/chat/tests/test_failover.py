@@ -0,0 +1,231 @@
+"""
+FailoverLLMProvider: circuit breaker, orden de failover, hedging y
+percentiles de latencia (con los fakes del benchmark, sin red).
+"""
+import asyncio
+
+import pytest
+
+from apps.chat.services import (
+    CircuitBreaker,
+    FailoverLLMProvider,
+    LatencyTracker,
+    Message,
+    ProviderUnavailableError,
+)
+from bench.config import FakeLLMConfig, FakeUpstreamError
+from bench.fakes import FakeLLMProvider
+
+MESSAGES = [Message(role='user', content='hola')]
+
+
+class NamedFakeProvider(FakeLLMProvider):
+    """FakeLLMProvider que responde con su propio nombre de modelo y cuenta llamadas."""
+
+    def __init__(self, name, latency=0.0, error_rate=0.0):
+        super().__init__(FakeLLMConfig(latency=latency, jitter=0.0, error_rate=error_rate, seed=1))
+        self.model_name = name
+        self.calls = 0
+
+    async def agenerate(self, messages, **kwargs):
+        self.calls += 1
+        return await super().agenerate(messages, **kwargs)
+
+    def _response(self, messages):
+        response = super()._response(messages)
+        response.model = self.model_name
+        return response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+# -----------------------------------------------------------------------------
+# CircuitBreaker
+# -----------------------------------------------------------------------------
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=FakeClock())
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_allows_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 15
+    assert not breaker.allow()
+
+
+def test_breaker_successful_probe_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_release_frees_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+# -----------------------------------------------------------------------------
+# LatencyTracker
+# -----------------------------------------------------------------------------
+
+def test_latency_tracker_needs_min_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(1.0)
+    tracker.record(2.0)
+    assert tracker.percentile(0.95) is None
+    tracker.record(3.0)
+    assert tracker.percentile(0.95) == 3.0
+
+
+def test_latency_tracker_percentiles():
+    tracker = LatencyTracker(min_samples=1)
+    for value in range(1, 101):
+        tracker.record(value / 100)
+    assert tracker.percentile(0.5) == 0.51
+    assert tracker.percentile(0.95) == 0.96
+    assert tracker.percentile(1.0) == 1.0
+
+
+def test_latency_tracker_sliding_window():
+    tracker = LatencyTracker(window=3, min_samples=1)
+    for value in (10.0, 1.0, 2.0, 3.0):
+        tracker.record(value)
+    assert tracker.percentile(1.0) == 3.0
+
+
+# -----------------------------------------------------------------------------
+# Failover y hedging
+# -----------------------------------------------------------------------------
+
+def test_uses_primary_when_healthy():
+    primary, secondary = NamedFakeProvider('primary'), NamedFakeProvider('secondary')
+    provider = FailoverLLMProvider([primary, secondary], hedge=False)
+    assert run(provider.agenerate(MESSAGES)).model == 'primary'
+    assert secondary.calls == 0
+
+
+def test_fails_over_in_order():
+    providers = [
+        NamedFakeProvider('primary', error_rate=1.0),
+        NamedFakeProvider('secondary', error_rate=1.0),
+        NamedFakeProvider('tertiary'),
+    ]
+    provider = FailoverLLMProvider(providers, hedge=False)
+    assert run(provider.agenerate(MESSAGES)).model == 'tertiary'
+    assert [p.calls for p in providers] == [1, 1, 1]
+
+
+def test_all_failing_raises_unavailable():
+    providers = [NamedFakeProvider('primary', error_rate=1.0), NamedFakeProvider('secondary', error_rate=1.0)]
+    provider = FailoverLLMProvider(providers, hedge=False)
+    with pytest.raises(ProviderUnavailableError) as error:
+        run(provider.agenerate(MESSAGES))
+    assert FakeUpstreamError.__name__ in str(error.value)
+
+
+def test_open_breaker_skips_provider():
+    primary, secondary = NamedFakeProvider('primary', error_rate=1.0), NamedFakeProvider('secondary')
+    provider = FailoverLLMProvider([primary, secondary], hedge=False, failure_threshold=2)
+    for _ in range(3):
+        assert run(provider.agenerate(MESSAGES)).model == 'secondary'
+    assert primary.calls == 2
+    assert provider.breakers[0].state == CircuitBreaker.OPEN
+
+
+def test_timeout_fails_over():
+    primary, secondary = NamedFakeProvider('primary', latency=1.0), NamedFakeProvider('secondary')
+    provider = FailoverLLMProvider([primary, secondary], timeout=0.05, hedge=False)
+    assert run(provider.agenerate(MESSAGES)).model == 'secondary'
+    assert provider.breakers[0]._failures == 1
+
+
+def test_hedge_races_next_provider():
+    primary, secondary = NamedFakeProvider('primary', latency=1.0), NamedFakeProvider('secondary')
+    provider = FailoverLLMProvider([primary, secondary], timeout=5, hedge_initial_delay=0.05)
+    assert run(provider.agenerate(MESSAGES)).model == 'secondary'
+    assert primary.calls == 1
+    # El perdedor se cancela sin contar como falla
+    assert provider.breakers[0].state == CircuitBreaker.CLOSED
+    assert provider.breakers[0]._failures == 0
+
+
+def test_hedge_skips_provider_with_open_breaker():
+    primary, secondary = NamedFakeProvider('primary', latency=0.2), NamedFakeProvider('secondary')
+    provider = FailoverLLMProvider([primary, secondary], timeout=5, hedge_initial_delay=0.05)
+    for _ in range(3):
+        provider.breakers[1].record_failure()
+    assert run(provider.agenerate(MESSAGES)).model == 'primary'
+    assert secondary.calls == 0
+    assert primary.calls == 2  # el respaldo es una segunda llamada al mismo
+
+
+def test_hedge_delay_uses_observed_percentile():
+    provider = FailoverLLMProvider([NamedFakeProvider('primary')], hedge_initial_delay=5.0, hedge_min_delay=0.05)
+    assert provider.hedge_delay(0) == 5.0
+    for _ in range(provider.latencies[0].min_samples):
+        provider.latencies[0].record(0.01)
+    assert provider.hedge_delay(0) == 0.05
+    provider.hedge = False
+    assert provider.hedge_delay(0) is None
+
+
+def test_astream_yields_single_chunk_from_agenerate():
+    provider = FailoverLLMProvider([NamedFakeProvider('primary', error_rate=1.0), NamedFakeProvider('secondary')])
+
+    async def collect():
+        return [chunk async for chunk in provider.astream(MESSAGES)]
+
+    chunks = run(collect())
+    assert len(chunks) == 1
+    assert chunks[0].model == 'secondary'
+    assert chunks[0].tokens_used['total'] > 0
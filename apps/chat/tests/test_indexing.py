@@ -0,0 +1,144 @@
+"""
+KnowledgeIndexer: indexación incremental por content_hash, marca de
+indexed_at y camino paralelo (varios batches en vuelo).
+"""
+import pytest
+
+from apps.chat.embeddings import HashingEmbedder
+from apps.chat.indexing import KnowledgeIndexer, chunk_id
+from apps.chat.models import KnowledgeDocument
+from apps.chat.vectorstores import NumpyVectorStore
+
+# Párrafos de ~40 caracteres: con max_chars=60 cada uno es un chunk
+PARAGRAPHS = [
+    'Desarrollo de software a medida en Chile.',
+    'Automatización de procesos con agentes IA.',
+    'Consultoría de arquitectura para SaaS B2B.',
+]
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Registra los textos embebidos; falla si el texto contiene `fail_on`."""
+
+    def __init__(self, fail_on=None):
+        super().__init__(dimension=32)
+        self.fail_on = fail_on
+        self.embedded = []
+
+    def embed(self, texts, task='document'):
+        if self.fail_on and any(self.fail_on in text for text in texts):
+            raise RuntimeError('embedder caído')
+        self.embedded.extend(texts)
+        return super().embed(texts, task=task)
+
+
+@pytest.fixture
+def documents(db):
+    KnowledgeDocument.objects.all().delete()
+    return [
+        KnowledgeDocument.objects.create(title=f"Doc {i}", content="\n\n".join(PARAGRAPHS))
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbedder()
+
+
+@pytest.fixture
+def store(tmp_path, embedder):
+    return NumpyVectorStore(tmp_path / 'vectors', embedder)
+
+
+def _indexer(store, embedder, **kwargs):
+    options = {'max_chars': 60, 'overlap': 0, 'workers': 1, **kwargs}
+    return KnowledgeIndexer(store, embedder, **options)
+
+
+def test_first_run_indexes_every_chunk(documents, store, embedder):
+    report = _indexer(store, embedder).run()
+    assert (report.documents_seen, report.documents_indexed) == (3, 3)
+    assert report.chunks_embedded == 9 and not report.errors
+    assert sorted(store.document_ids()) == sorted(
+        chunk_id(document.pk, index) for document in documents for index in range(3)
+    )
+    assert store.get_metadata(chunk_id(documents[0].pk, 1))['title'] == 'Doc 0'
+
+
+def test_mark_indexed_keeps_updated_at(documents, store, embedder):
+    before = {document.pk: document.updated_at for document in documents}
+    _indexer(store, embedder).run()
+    for document in KnowledgeDocument.objects.all():
+        assert document.is_indexed
+        assert document.indexed_at >= before[document.pk]
+        assert document.updated_at == before[document.pk]
+
+
+def test_unchanged_documents_are_not_reprocessed(documents, store, embedder):
+    _indexer(store, embedder).run()
+    embedder.embedded.clear()
+    report = _indexer(store, embedder).run()
+    assert report.documents_seen == 0
+    assert embedder.embedded == []
+
+
+def test_edited_document_only_embeds_changed_chunks(documents, store, embedder):
+    _indexer(store, embedder).run()
+    embedder.embedded.clear()
+    edited = documents[1]
+    edited.content = "\n\n".join([PARAGRAPHS[0], 'Cursos de IAlfabetización para ejecutivos.', PARAGRAPHS[2]])
+    edited.save()
+
+    report = _indexer(store, embedder).run()
+    assert report.documents_seen == 1 and report.documents_indexed == 1
+    assert (report.chunks_embedded, report.chunks_skipped) == (1, 2)
+    assert embedder.embedded == ['Cursos de IAlfabetización para ejecutivos.']
+
+
+def test_full_run_ignores_content_hash(documents, store, embedder):
+    _indexer(store, embedder).run()
+    report = _indexer(store, embedder).run(full=True)
+    assert (report.documents_seen, report.chunks_embedded, report.chunks_skipped) == (3, 9, 0)
+
+
+def test_removed_and_deactivated_documents_lose_their_chunks(documents, store, embedder):
+    _indexer(store, embedder).run()
+    documents[0].delete()
+    KnowledgeDocument.objects.filter(pk=documents[1].pk).update(is_active=False)
+    shorter = documents[2]
+    shorter.content = PARAGRAPHS[0]
+    shorter.save()
+
+    report = _indexer(store, embedder).run()
+    assert report.chunks_deleted == 8
+    assert store.document_ids() == [chunk_id(shorter.pk, 0)]
+    assert not KnowledgeDocument.objects.get(pk=documents[1].pk).is_indexed
+
+
+def test_parallel_run_matches_sequential(documents, tmp_path):
+    sequential = NumpyVectorStore(tmp_path / 'sequential', HashingEmbedder(dimension=32))
+    _indexer(sequential, CountingEmbedder()).run()
+
+    # full: la corrida secuencial ya marcó los documentos como indexados
+    parallel = NumpyVectorStore(tmp_path / 'parallel', HashingEmbedder(dimension=32))
+    indexer = _indexer(parallel, CountingEmbedder(), workers=4, batch_size=1, write_batch_size=2)
+    report = indexer.run(full=True)
+    assert (report.documents_indexed, report.chunks_embedded) == (3, 9)
+    assert sorted(parallel.document_ids()) == sorted(sequential.document_ids())
+    for doc_id in sequential.document_ids():
+        assert parallel.get_metadata(doc_id) == sequential.get_metadata(doc_id)
+
+
+def test_failed_batch_leaves_document_pending(documents, store):
+    documents[2].content = 'Contenido que rompe el embedder.'
+    documents[2].save()
+    embedder = CountingEmbedder(fail_on='rompe')
+
+    report = _indexer(store, embedder, workers=2, batch_size=1).run()
+    assert report.errors == ['embedder caído']
+    assert report.documents_indexed == 2
+    assert not KnowledgeDocument.objects.get(pk=documents[2].pk).is_indexed
+    # La siguiente corrida lo reintenta
+    embedder.fail_on = None
+    assert _indexer(store, embedder).run().documents_indexed == 1
@@ -0,0 +1,78 @@
+"""
+Cola de trabajos de chat: reclamo (un turno por sesión a la vez) y worker.
+"""
+import asyncio
+
+import pytest
+
+from apps.chat import jobs, turns
+from apps.chat.concurrency import LLMOverloadedError
+from apps.chat.management.commands.chat_worker import awork
+from apps.chat.models import ChatJob, ChatSession
+
+
+@pytest.fixture
+def empty_queue(db):
+    ChatJob.objects.all().delete()
+
+
+def test_claim_serializes_turns_of_a_session(empty_queue):
+    first, second = ChatSession.objects.create(), ChatSession.objects.create()
+    a1 = jobs.enqueue(first, 'service', 'uno')
+    a2 = jobs.enqueue(first, 'service', 'dos')
+    b1 = jobs.enqueue(second, 'service', 'otro')
+
+    claimed = jobs.claim_next('w1')
+    assert claimed.pk == a1.pk and claimed.status == 'running'
+    assert claimed.session.pk == first.pk
+    # a2 espera a que termine a1
+    assert jobs.claim_next('w2').pk == b1.pk
+    assert jobs.claim_next('w3') is None
+
+    ChatJob.objects.filter(pk=a1.pk).update(status='done')
+    assert jobs.claim_next('w3').pk == a2.pk
+
+
+def test_worker_runs_all_jobs_on_one_event_loop(empty_queue, monkeypatch):
+    loops = []
+
+    async def fake_turn(chat_session, message):
+        loops.append(asyncio.get_running_loop())
+        return {'response': message.upper(), 'status': 'success'}
+
+    monkeypatch.setattr(turns, 'run_service_turn', fake_turn)
+    created = [jobs.enqueue(ChatSession.objects.create(), 'service', f"m{i}") for i in range(3)]
+
+    assert asyncio.run(awork(poll_interval=0, burst=True)) == 3
+    assert len(loops) == 3 and len(set(map(id, loops))) == 1
+    for job in created:
+        job.refresh_from_db()
+        assert job.status == 'done'
+        assert job.result['response'] == job.message.upper()
+
+
+def test_overloaded_job_returns_to_queue(empty_queue, monkeypatch):
+    async def overloaded(chat_session, message):
+        raise LLMOverloadedError('saturado', retry_after=1)
+
+    monkeypatch.setattr(turns, 'run_service_turn', overloaded)
+    job = jobs.enqueue(ChatSession.objects.create(), 'service', 'hola')
+
+    claimed = jobs.claim_next('w1')
+    assert asyncio.run(jobs.arun_job(claimed)) is False
+    job.refresh_from_db()
+    assert (job.status, job.attempts, job.worker) == ('pending', 0, '')
+
+
+def test_failed_job_records_error(empty_queue, monkeypatch):
+    async def broken(chat_session, message):
+        raise RuntimeError('upstream caído')
+
+    monkeypatch.setattr(turns, 'run_service_turn', broken)
+    job = jobs.enqueue(ChatSession.objects.create(), 'service', 'hola')
+
+    assert asyncio.run(jobs.arun_job(jobs.claim_next('w1'))) is True
+    job.refresh_from_db()
+    assert job.status == 'failed'
+    assert job.error == 'upstream caído'
+    assert jobs.job_payload(job) == {'job_id': str(job.job_id), 'status': 'failed', 'error': 'upstream caído'}
@@ -0,0 +1,173 @@
+"""
+BM25Index (scoring, persistencia incremental) y HybridVectorStore (fusión).
+"""
+import math
+
+import pytest
+
+from apps.chat.embeddings import HashingEmbedder
+from apps.chat.lexical import BM25Index, HybridVectorStore, analyze
+from apps.chat.services import RetrievedDocument
+from apps.chat.vectorstores import NumpyVectorStore
+
+DOCUMENTS = [
+    ('motor', 'Reparación de motores diésel y motores a gasolina', {'area': 'taller'}),
+    ('frenos', 'Cambio de pastillas de freno y revisión de motores', {'area': 'taller'}),
+    ('pintura', 'Pintura automotriz y pulido de carrocería', {'area': 'estetica'}),
+    ('garantia', 'Garantía de seis meses en todas las reparaciones', {'area': 'ventas'}),
+]
+
+
+def _ids(results):
+    return [document.metadata['id'] for document in results]
+
+
+def _doc(doc_id, score):
+    return RetrievedDocument(content=doc_id, source=doc_id, score=score, metadata={'id': doc_id})
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(tmp_path / 'bm25')
+    index.upsert_many(DOCUMENTS)
+    return index
+
+
+class CountingVectorStore(NumpyVectorStore):
+    searches = 0
+
+    def search(self, query, top_k=5, filter=None):
+        self.searches += 1
+        return super().search(query, top_k=top_k, filter=filter)
+
+
+@pytest.fixture
+def hybrid(tmp_path):
+    vector_store = CountingVectorStore(tmp_path / 'vectors', HashingEmbedder(dimension=64))
+    store = HybridVectorStore(
+        vector_store, BM25Index(tmp_path / 'bm25', content_store=vector_store), alpha=0.5
+    )
+    store.upsert_many(DOCUMENTS)
+    return store
+
+
+# -----------------------------------------------------------------------------
+# BM25
+# -----------------------------------------------------------------------------
+
+def test_bm25_score_matches_formula(index):
+    k1, b = index.k1, index.b
+    lengths = {doc_id: len(analyze(content)) for doc_id, content, _ in DOCUMENTS}
+    avg_length = sum(lengths.values()) / len(lengths)
+    term = analyze('motores')[0]
+    matching = {doc_id: analyze(content).count(term) for doc_id, content, _ in DOCUMENTS}
+    matching = {doc_id: tf for doc_id, tf in matching.items() if tf}
+    idf = math.log(1 + (len(DOCUMENTS) - len(matching) + 0.5) / (len(matching) + 0.5))
+
+    results = index.search('motores', top_k=10)
+    assert set(_ids(results)) == set(matching)
+    for document in results:
+        tf = matching[document.metadata['id']]
+        norm = k1 * (1 - b + b * lengths[document.metadata['id']] / avg_length)
+        assert document.score == pytest.approx(idf * tf * (k1 + 1) / (tf + norm))
+
+
+def test_bm25_term_frequency_ranks_first(index):
+    assert _ids(index.search('motores', top_k=2)) == ['motor', 'frenos']
+
+
+def test_bm25_ties_are_ordered_by_id(tmp_path):
+    index = BM25Index(tmp_path / 'bm25')
+    index.upsert_many([('b', 'aceite sintético', {}), ('a', 'aceite sintético', {}), ('c', 'otro texto', {})])
+    assert _ids(index.search('aceite', top_k=5)) == ['a', 'b']
+
+
+def test_bm25_filter_and_no_match(index):
+    assert _ids(index.search('motores', filter={'area': 'ventas'})) == []
+    assert index.search('inexistente') == []
+    assert index.search('') == []
+
+
+def test_bm25_returns_content_and_metadata(index):
+    document = index.search('pintura', top_k=1)[0]
+    assert document.content == DOCUMENTS[2][1]
+    assert document.metadata['area'] == 'estetica'
+
+
+def test_bm25_upsert_replaces_and_delete_removes(index):
+    index.upsert('pintura', 'Alineación y balanceo', {'area': 'taller'})
+    assert index.search('pintura') == []
+    assert _ids(index.search('balanceo')) == ['pintura']
+    assert index.delete('motor')
+    assert not index.delete('motor')
+    assert 'motor' not in index.document_ids()
+    assert len(index) == 3
+
+
+def test_bm25_reopen_replays_deltas(index, tmp_path):
+    index.delete('garantia')
+    index.upsert('nuevo', 'Motores eléctricos', {'area': 'taller'})
+    reopened = BM25Index(tmp_path / 'bm25')
+    assert sorted(reopened.document_ids()) == sorted(index.document_ids())
+    for query in ('motores', 'pintura', 'garantía'):
+        assert [(d.metadata['id'], d.score) for d in reopened.search(query)] == \
+            [(d.metadata['id'], d.score) for d in index.search(query)]
+
+
+# -----------------------------------------------------------------------------
+# Fusión híbrida
+# -----------------------------------------------------------------------------
+
+def test_fuse_normalizes_and_weights():
+    store = HybridVectorStore(None, None, alpha=0.25)
+    fused = store.fuse(
+        [_doc('a', 0.8), _doc('b', 0.4)],
+        [_doc('b', 6.0), _doc('c', 3.0)],
+        top_k=5
+    )
+    scores = {document.metadata['id']: document.score for document in fused}
+    assert scores == pytest.approx({
+        'a': 0.25 * 1.0,
+        'b': 0.25 * 0.5 + 0.75 * 1.0,
+        'c': 0.75 * 0.5,
+    })
+    assert _ids(fused) == ['b', 'c', 'a']
+    assert fused[0].metadata['vector_score'] == pytest.approx(0.5)
+    assert fused[0].metadata['lexical_score'] == pytest.approx(1.0)
+
+
+def test_fuse_drops_zero_scores_and_breaks_ties_by_id():
+    store = HybridVectorStore(None, None, alpha=0.5)
+    fused = store.fuse([_doc('z', 1.0), _doc('y', -0.2)], [_doc('a', 2.0)], top_k=5)
+    assert _ids(fused) == ['a', 'z']
+
+
+def test_fuse_respects_top_k():
+    store = HybridVectorStore(None, None, alpha=1.0)
+    fused = store.fuse([_doc(str(i), 1.0 - i / 10) for i in range(5)], [], top_k=2)
+    assert _ids(fused) == ['0', '1']
+
+
+def test_short_query_skips_vector_search(hybrid):
+    assert _ids(hybrid.search('motores', top_k=2)) == ['motor', 'frenos']
+    assert hybrid.vector_store.searches == 0
+
+
+def test_long_query_fuses_both(hybrid):
+    results = hybrid.search('reparación de motores diésel a gasolina', top_k=2)
+    assert hybrid.vector_store.searches == 1
+    assert _ids(results)[0] == 'motor'
+    assert results[0].content == DOCUMENTS[0][1]
+
+
+def test_hybrid_lexical_index_keeps_no_content(hybrid):
+    assert hybrid.lexical.get_contents(['motor']) == {'motor': DOCUMENTS[0][1]}
+    assert not any(path.name.startswith('documents.') for path in hybrid.lexical.path.iterdir())
+
+
+def test_hybrid_document_ids_and_metadata(hybrid):
+    hybrid.lexical.delete('pintura')
+    assert hybrid.document_ids() == sorted(doc_id for doc_id, _, _ in DOCUMENTS)
+    assert hybrid.get_metadata('motor')['area'] == 'taller'
+    # Solo en uno de los índices: desincronizado
+    assert hybrid.get_metadata('pintura') is None
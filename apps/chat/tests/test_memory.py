@@ -0,0 +1,135 @@
+"""
+Memoria de conversación: ventana de turnos por presupuesto de tokens,
+bandera de compactación y compactación concurrente.
+"""
+import asyncio
+
+import pytest
+from django.test import override_settings
+
+from apps.chat import memory
+from apps.chat.memory import aload_recent_history, compact_session, load_recent_history, split_history
+from apps.chat.models import ChatMessage, ChatSession
+
+
+def _turn(text, reply=None):
+    return [{'role': 'user', 'parts': [text]}, {'role': 'model', 'parts': [reply or f"re: {text}"]}]
+
+
+def _history(count, size=8):
+    return [entry for i in range(count) for entry in _turn(f"{i}" * size)]
+
+
+@pytest.fixture
+def chat_session(db):
+    """Sesión con 5 turnos (10 mensajes) de largo similar."""
+    session = ChatSession.objects.create()
+    for i in range(5):
+        ChatMessage.objects.create(session=session, role='user', content=f"pregunta {i} " * 5)
+        ChatMessage.objects.create(session=session, role='assistant', content=f"respuesta {i} " * 5)
+    return session
+
+
+def _texts(entries):
+    return [memory.entry_text(entry) for entry in entries]
+
+
+# -----------------------------------------------------------------------------
+# Ventana por presupuesto
+# -----------------------------------------------------------------------------
+
+def test_split_history_keeps_whole_turns_within_budget():
+    history = _history(4)
+    per_turn = sum(memory.entry_tokens(entry) for entry in _turn('0' * 8))
+    older, recent = split_history(history, token_budget=per_turn * 2, max_turns=10)
+    assert recent == history[-4:]
+    assert older == history[:-4]
+
+
+def test_split_history_respects_max_turns():
+    history = _history(4)
+    older, recent = split_history(history, token_budget=10_000, max_turns=3)
+    assert (len(older), len(recent)) == (2, 6)
+
+
+def test_split_history_always_keeps_last_turn():
+    history = _history(2, size=400)
+    older, recent = split_history(history, token_budget=1, max_turns=10)
+    assert recent == history[-2:]
+
+
+def test_load_recent_history_within_window(chat_session):
+    recent, needs_compaction = load_recent_history(chat_session)
+    assert len(recent) == 10
+    assert recent[0] == {'role': 'user', 'parts': ['pregunta 0 ' * 5]}
+    assert recent[-1]['role'] == 'model'
+    assert not needs_compaction
+
+
+@override_settings(CHAT_MEMORY_MAX_TURNS=2)
+def test_load_recent_history_flags_overflow(chat_session):
+    recent, needs_compaction = load_recent_history(chat_session)
+    assert _texts(recent) == ['pregunta 3 ' * 5, 'respuesta 3 ' * 5, 'pregunta 4 ' * 5, 'respuesta 4 ' * 5]
+    assert needs_compaction
+
+
+def test_load_recent_history_flags_token_budget(chat_session):
+    with override_settings(CHAT_MEMORY_TOKEN_BUDGET=40):
+        recent, needs_compaction = load_recent_history(chat_session)
+    assert len(recent) == 2
+    assert needs_compaction
+
+
+@override_settings(CHAT_MEMORY_MAX_TURNS=2)
+def test_async_load_matches_sync(chat_session):
+    assert asyncio.run(aload_recent_history(chat_session)) == load_recent_history(chat_session)
+
+
+# -----------------------------------------------------------------------------
+# Compactación
+# -----------------------------------------------------------------------------
+
+@override_settings(CHAT_MEMORY_MAX_TURNS=2)
+def test_compact_session_summarizes_older_turns(chat_session, monkeypatch):
+    summarized = []
+
+    def summarize(previous, entries):
+        summarized.extend(_texts(entries))
+        return 'resumen'
+
+    monkeypatch.setattr(memory, 'summarize', summarize)
+    assert compact_session(chat_session.pk)
+
+    chat_session.refresh_from_db()
+    messages = list(ChatMessage.objects.filter(session=chat_session).order_by('created_at', 'id'))
+    assert chat_session.summary == 'resumen'
+    assert chat_session.summary_until == messages[5].id
+    assert len(summarized) == 6
+    # Lo resumido ya no cuenta en la ventana
+    recent, needs_compaction = load_recent_history(chat_session)
+    assert len(recent) == 4 and not needs_compaction
+    assert not compact_session(chat_session.pk)
+
+
+@override_settings(CHAT_MEMORY_MAX_TURNS=2)
+def test_compact_session_yields_to_concurrent_compaction(chat_session, monkeypatch):
+    """
+    Si otra compactación guarda mientras se llama al LLM, la re-lectura bajo
+    select_for_update lo detecta y no pisa su resumen.
+    """
+    winner_until = ChatMessage.objects.filter(session=chat_session).order_by('id')[1].id
+
+    def summarize(previous, entries):
+        ChatSession.objects.filter(pk=chat_session.pk).update(summary='otro', summary_until=winner_until)
+        return 'tardío'
+
+    monkeypatch.setattr(memory, 'summarize', summarize)
+    assert not compact_session(chat_session.pk)
+    chat_session.refresh_from_db()
+    assert (chat_session.summary, chat_session.summary_until) == ('otro', winner_until)
+
+
+def test_summarize_without_llm_keeps_latest_text():
+    with override_settings(CHAT_MEMORY_SUMMARY_MAX_CHARS=30):
+        summary = memory.summarize('previo', _turn('hola', 'buenas tardes'))
+    assert summary == 'Cliente: hola\nConsultor: buenas tardes'[-30:]
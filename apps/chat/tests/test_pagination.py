@@ -0,0 +1,105 @@
+"""
+Paginación keyset del historial: cursores y recorrido de /chat/history/.
+"""
+import base64
+from datetime import timedelta
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.chat.models import ChatMessage, ChatSession
+from apps.chat.pagination import InvalidCursor, after, before, decode_cursor, encode_cursor, message_cursor
+
+
+@pytest.fixture
+def chat_session(db):
+    """Sesión con 7 mensajes; los 3 del medio comparten created_at."""
+    session = ChatSession.objects.create()
+    start = (timezone.now() - timedelta(minutes=1)).replace(microsecond=0)
+    offsets = [0, 1, 2, 2, 2, 3, 4]
+    for index, offset in enumerate(offsets):
+        message = ChatMessage.objects.create(session=session, role='user', content=f"m{index}")
+        # auto_now_add ignora el valor al crear
+        ChatMessage.objects.filter(pk=message.pk).update(created_at=start + timedelta(seconds=offset))
+    return session
+
+
+def _ordered(session):
+    return list(ChatMessage.objects.filter(session=session).order_by('created_at', 'id'))
+
+
+def test_cursor_round_trip():
+    created_at = timezone.now()
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(timezone.now(), 7)
+    assert '=' not in cursor
+    assert set(cursor) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_')
+
+
+@pytest.mark.parametrize('raw', [
+    b'sin-separador',
+    b'2024-01-01T00:00:00+00:00|no-es-id',
+    b'no-es-fecha|5',
+    b'\xff\xfe|1',
+])
+def test_invalid_cursor(raw):
+    cursor = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_invalid_cursor_not_base64():
+    with pytest.raises(InvalidCursor):
+        decode_cursor('***')
+
+
+def test_message_cursor_none():
+    assert message_cursor(None) is None
+
+
+def test_after_and_before_break_ties_by_id(chat_session):
+    messages = _ordered(chat_session)
+    middle = messages[3]  # segundo de los tres con el mismo created_at
+    cursor = (middle.created_at, middle.id)
+    queryset = ChatMessage.objects.filter(session=chat_session).order_by('created_at', 'id')
+
+    assert [m.content for m in queryset.filter(after(cursor))] == ['m4', 'm5', 'm6']
+    assert [m.content for m in queryset.filter(before(cursor))] == ['m0', 'm1', 'm2']
+
+
+def test_history_pages_backwards_without_gaps(chat_session):
+    client = Client()
+    url = reverse('chat:history')
+    params = {'session_id': str(chat_session.session_id), 'limit': 3}
+    seen = []
+    while True:
+        data = client.get(url, params).json()
+        seen = [m['content'] for m in data['messages']] + seen
+        if not data['has_more']:
+            break
+        params['before'] = data['previous_cursor']
+    assert seen == [f"m{i}" for i in range(7)]
+
+
+def test_history_since_returns_only_new_messages(chat_session):
+    client = Client()
+    url = reverse('chat:history')
+    data = client.get(url, {'session_id': str(chat_session.session_id), 'limit': 2}).json()
+    assert [m['content'] for m in data['messages']] == ['m5', 'm6']
+
+    ChatMessage.objects.create(session=chat_session, role='assistant', content='m7')
+    data = client.get(url, {'session_id': str(chat_session.session_id), 'since': data['next_cursor']}).json()
+    assert [m['content'] for m in data['messages']] == ['m7']
+    assert not data['has_more']
+
+
+def test_history_rejects_bad_cursor(chat_session):
+    response = Client().get(reverse('chat:history'), {
+        'session_id': str(chat_session.session_id), 'before': '***'
+    })
+    assert response.status_code == 400
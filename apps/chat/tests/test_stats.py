@@ -0,0 +1,56 @@
+"""
+rollup de ChatDailyStats: marca de agua y ventana de días recientes.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.chat import stats
+from apps.chat.models import ChatDailyStats, ChatMessage, ChatSession
+
+
+@pytest.fixture
+def empty_stats(db):
+    ChatMessage.objects.all().delete()
+    ChatDailyStats.objects.all().delete()
+    return ChatSession.objects.create()
+
+
+def _reply(session, days_ago=0, latency_ms=100):
+    message = ChatMessage.objects.create(
+        session=session, role='assistant', content='respuesta', metadata={'latency_ms': latency_ms}
+    )
+    # auto_now_add ignora el valor al crear
+    created_at = timezone.now() - timedelta(days=days_ago)
+    ChatMessage.objects.filter(pk=message.pk).update(created_at=created_at)
+    return message
+
+
+def test_rollup_only_recomputes_new_and_trailing_days(empty_stats):
+    _reply(empty_stats, days_ago=5)
+    _reply(empty_stats)
+    assert len(stats.rollup()) == 2
+    # Nada nuevo: solo la ventana de días recientes
+    assert stats.rollup() == [timezone.localdate()]
+
+
+def test_turn_committed_below_watermark_is_counted(empty_stats):
+    _reply(empty_stats)
+    stats.rollup()
+    # Un turno con id menor confirmó después del rollup: la marca de agua
+    # ya lo supera (se simula adelantándola)
+    late = _reply(empty_stats, latency_ms=300)
+    ChatDailyStats.objects.update(last_message_id=late.pk + 100)
+
+    stats.rollup()
+    day = ChatDailyStats.objects.get(date=timezone.localdate())
+    assert day.turns == 2
+    assert day.avg_latency_ms == 200
+
+
+def test_full_rollup_recomputes_every_day(empty_stats):
+    for days_ago in (10, 5, 0):
+        _reply(empty_stats, days_ago=days_ago)
+    stats.rollup()
+    assert len(stats.rollup(full=True)) == 3
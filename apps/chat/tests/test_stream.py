@@ -0,0 +1,86 @@
+"""
+/chat/api/stream/: los errores antes del primer fragmento responden con su
+status real; después, el stream lleva los fragmentos y el evento done.
+"""
+import asyncio
+
+import pytest
+from django.test import AsyncClient
+
+from apps.chat import views
+from apps.chat.concurrency import LLMOverloadedError
+from apps.chat.services import LLMProvider, ProviderUnavailableError, StreamChunk
+
+
+class ScriptedProvider(LLMProvider):
+    """astream() que entrega `chunks` o lanza `error` antes del primero."""
+
+    def __init__(self, chunks=(), error=None):
+        self.chunks = chunks
+        self.error = error
+        self.closed = False
+
+    def generate(self, messages, temperature=0.7, max_tokens=1000, **kwargs):
+        raise NotImplementedError
+
+    def is_available(self):
+        return True
+
+    async def astream(self, messages, temperature=0.7, max_tokens=1000, **kwargs):
+        try:
+            if self.error is not None:
+                raise self.error
+            for chunk in self.chunks:
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def stream(db, monkeypatch):
+    """Configura el proveedor y retorna una función que hace el POST."""
+    monkeypatch.setattr(views.gemini_registry, 'configure', lambda: True)
+
+    def post(provider, message='hola'):
+        monkeypatch.setattr(views, 'get_gemini_provider', lambda: provider)
+
+        async def request():
+            response = await AsyncClient().post(
+                '/chat/api/stream/', data={'message': message}, content_type='application/json'
+            )
+            if response.streaming:
+                body = b''.join([part async for part in response.streaming_content])
+            else:
+                body = response.content
+            return response, body.decode('utf-8')
+
+        return asyncio.run(request())
+
+    return post
+
+
+def test_overloaded_before_first_chunk_is_503(stream):
+    response, _ = stream(ScriptedProvider(error=LLMOverloadedError('saturado', retry_after=7)))
+    assert response.status_code == 503
+    assert response['Retry-After'] == '7'
+    assert response.json()['status'] == 'overloaded'
+
+
+def test_provider_failure_before_first_chunk_is_500(stream):
+    response, _ = stream(ScriptedProvider(error=ProviderUnavailableError('circuito abierto')))
+    assert response.status_code == 500
+    assert response.json() == {'error': 'circuito abierto', 'status': 'error'}
+
+
+def test_successful_stream(stream):
+    provider = ScriptedProvider([
+        StreamChunk('Hola, ', 'modelo'),
+        StreamChunk('¿en qué te ayudo?', 'modelo'),
+        StreamChunk('', 'modelo', {'prompt': 3, 'completion': 5, 'total': 8}),
+    ])
+    response, body = stream(provider, message='mensaje sin caché')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/event-stream'
+    assert body.count('event: chunk') == 2
+    assert 'event: done' in body
+    assert provider.closed
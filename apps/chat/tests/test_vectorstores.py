@@ -0,0 +1,114 @@
+"""
+IVFVectorStore: búsqueda exacta como fallback, desempate determinista y
+persistencia de las asignaciones.
+"""
+import numpy as np
+import pytest
+
+from apps.chat.embeddings import HashingEmbedder
+from apps.chat.vectorstores import IVFVectorStore, NumpyVectorStore, _top_k_rows
+
+DIMENSION = 16
+
+
+def _vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _fill(store, vectors, prefix='doc'):
+    documents = [(f"{prefix}-{i}", f"contenido {i}", {'n': i}) for i in range(len(vectors))]
+    store.upsert_many(documents, embeddings=vectors)
+
+
+def _ids(results):
+    return [document.metadata['id'] for document in results]
+
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dimension=DIMENSION)
+
+
+@pytest.fixture
+def vectors():
+    return _vectors(200)
+
+
+@pytest.fixture
+def exact(tmp_path, embedder, vectors):
+    store = NumpyVectorStore(tmp_path / 'exact', embedder)
+    _fill(store, vectors)
+    return store
+
+
+def test_top_k_rows_breaks_ties_by_row():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.5], dtype=np.float32)
+    assert list(_top_k_rows(scores, 3, 5)) == [1, 3, 0]
+    assert list(_top_k_rows(scores, 10, 5)) == [1, 3, 0, 2, 4]
+
+
+def test_top_k_rows_skips_masked_rows():
+    scores = np.array([-np.inf, 0.2, -np.inf, 0.1], dtype=np.float32)
+    assert list(_top_k_rows(scores, 5, 2)) == [1, 3]
+
+
+def test_untrained_index_is_exact(tmp_path, embedder, vectors, exact):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=1, min_train_size=10)
+    _fill(store, vectors)
+    for query in _vectors(5, seed=1):
+        assert _ids(store.search_by_vector(query, top_k=10)) == _ids(exact.search_by_vector(query, top_k=10))
+
+
+def test_small_index_falls_back_to_exact(tmp_path, embedder, vectors, exact):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=1, min_train_size=1000)
+    _fill(store, vectors)
+    assert store.rebuild() == 8
+    for query in _vectors(5, seed=1):
+        assert _ids(store.search_by_vector(query, top_k=10)) == _ids(exact.search_by_vector(query, top_k=10))
+
+
+def test_probing_all_lists_matches_exact(tmp_path, embedder, vectors, exact):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=8, min_train_size=10)
+    _fill(store, vectors)
+    store.rebuild()
+    for query in _vectors(5, seed=1):
+        assert _ids(store.search_by_vector(query, top_k=10)) == _ids(exact.search_by_vector(query, top_k=10))
+
+
+def test_ties_are_ordered_by_insertion(tmp_path, embedder):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=2, nprobe=2, min_train_size=2)
+    same = np.repeat(_vectors(1), 6, axis=0)
+    _fill(store, np.vstack([same, _vectors(6, seed=3)]))
+    store.rebuild(seed=0)
+    results = store.search_by_vector(same[0], top_k=4)
+    assert _ids(results) == ['doc-0', 'doc-1', 'doc-2', 'doc-3']
+
+
+def test_rows_added_after_training_are_searchable(tmp_path, embedder, vectors):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=1, min_train_size=10)
+    _fill(store, vectors)
+    store.rebuild()
+    extra = _vectors(3, seed=7)
+    _fill(store, extra, prefix='new')
+    for i, query in enumerate(extra):
+        assert store.search_by_vector(query, top_k=1)[0].metadata['id'] == f"new-{i}"
+
+
+def test_deleted_rows_are_excluded(tmp_path, embedder, vectors):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=8, min_train_size=10)
+    _fill(store, vectors)
+    store.rebuild()
+    assert store.delete('doc-5')
+    assert 'doc-5' not in _ids(store.search_by_vector(vectors[5], top_k=5))
+
+
+def test_assignments_persist_across_instances(tmp_path, embedder, vectors):
+    store = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=2, min_train_size=10)
+    _fill(store, vectors)
+    store.rebuild()
+    assert (tmp_path / 'ivf' / 'assignments.npy').exists()
+
+    reopened = IVFVectorStore(tmp_path / 'ivf', embedder, nlist=8, nprobe=2, min_train_size=10)
+    for query in _vectors(5, seed=1):
+        assert _ids(reopened.search_by_vector(query, top_k=10)) == _ids(store.search_by_vector(query, top_k=10))
@@ -0,0 +1,48 @@
+"""
+Chat - Utilidades de texto en español (tokenización para RAG)
+"""
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Stopwords frecuentes (sin acentos, ya que se aplican tras fold_accents)
+SPANISH_STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun
+cada como con contra cual cuales cuando de del desde donde dos el ella
+ellas ellos en entre era eran es esa esas ese eso esos esta estan estas
+este esto estos fue fueron ha han hasta hay la las le les lo los mas me
+mi mis muy ni no nos nosotros o os otra otras otro otros para pero poco
+por porque que quien quienes se sea ser si sin sobre son su sus tambien
+te tiene tienen tu tus un una unas uno unos usted ustedes y ya yo
+""".split())
+
+
+def fold_accents(text: str) -> str:
+    """Minúsculas y sin acentos: 'IAlfabetización' -> 'ialfabetizacion'."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def stem(token: str) -> str:
+    """
+    Stemming liviano para español: solo plurales.
+    'precios' -> 'precio', 'automatizaciones' -> 'automatizacion'.
+    Tokens cortos ('saas', 'rpa') no se modifican.
+    """
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'lrndj':
+        return token[:-2]
+    if len(token) > 4 and token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str, drop_stopwords: bool = True, stemming: bool = False) -> List[str]:
+    """Tokens normalizados de un texto en español."""
+    tokens = _TOKEN_RE.findall(fold_accents(text))
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in SPANISH_STOPWORDS]
+    if stemming:
+        tokens = [stem(t) for t in tokens]
+    return tokens
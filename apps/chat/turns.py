@@ -0,0 +1,263 @@
+"""
+Chat - Ejecución de un turno de conversación
+
+Lógica compartida por las vistas (respuesta inmediata o streaming) y por
+`manage.py chat_worker` (modo asíncrono con cola de trabajos): generar la
+respuesta y guardar el turno es lo mismo en ambos caminos.
+"""
+import time
+
+from django.db.models import F
+from django.utils import timezone
+
+from bestia_site.metrics import llm_phase
+
+from .cache import response_cache
+from .memory import (
+    CONTEXT_ACK, aload_recent_history, build_gemini_history, entry_text, schedule_compaction,
+)
+from .models import ChatMessage, ChatSession
+from .services import Message, get_chat_service, get_gemini_provider
+
+# Marcador del ID de sesión dentro de respuestas cacheadas: la misma
+# respuesta se reutiliza entre sesiones y el ID se re-inserta al servirla.
+SESSION_ID_PLACEHOLDER = '\x00session_id\x00'
+
+
+# System prompt estático: es la clave del pool de GenerativeModel
+# (gemini.registry), así todas las conversaciones comparten un modelo. Lo
+# que depende de la sesión va en el historial (build_gemini_context).
+GEMINI_SYSTEM_PROMPT = (
+    "Eres el Consultor Técnico Senior de 'bestIA', ingeniería y desarrollo de software en Puerto Montt, Chile. "
+    "Tu Identidad: Profesional técnico, sobrio, experto. No usas saludos robóticos. "
+    "Base de Conocimiento: "
+    "1. Ubicación: Puerto Montt, Región de Los Lagos. "
+    "2. Servicios: Desarrollo a Medida (SaaS, Web Apps), Automatización IA, Consultoría de Arquitectura de Software. "
+    "3. Cursos: 'IAlfabetización' (programa práctico de IA para empresas/ejecutivos, no para programadores). "
+    "Reglas de Comportamiento: "
+    "1. NO uses listas con viñetas (bullets) salvo que sea IMPRESCINDIBLE. Prefiere párrafos cortos y fluidos. "
+    "2. Concisión Extrema: Máximo 3 oraciones por idea principal. Ve al grano. "
+    "3. Tono: Conversacional de negocios. Evita 'Espero haberte ayudado'. "
+    "4. SMART HANDOFF: Cuando detectes que el usuario quiere contactar a un humano o contratar, genera un enlace de WhatsApp "
+    "con el formato indicado en el contexto de la sesión. "
+    "Aclara siempre: 'Te paso con un ingeniero humano. Haz clic aquí para abrir WhatsApp con tu referencia de caso'."
+)
+
+
+def build_gemini_context(current_id):
+    """Contexto dinámico de la sesión (ID de sesión y handoff a WhatsApp)."""
+    # Lógica de Handoff (WhatsApp)
+    wa_number = "56972420708"
+    wa_text = f"Hola, vengo del chat web (Ref: {current_id}). Quiero hablar con un humano."
+    wa_link = f"https://wa.me/{wa_number}?text={wa_text.replace(' ', '%20')}"
+
+    return (
+        f"Contexto de la sesión: tu ID de sesión es {current_id}. "
+        f"El formato del enlace de WhatsApp DEBE ser: {wa_link}"
+    )
+
+
+def build_session_history(current_id, summary, recent_history):
+    """
+    Historial para model.start_chat(): contexto de la sesión como primer
+    intercambio, seguido del resumen y los turnos recientes.
+    """
+    return [
+        {'role': 'user', 'parts': [build_gemini_context(current_id)]},
+        {'role': 'model', 'parts': [CONTEXT_ACK]},
+    ] + build_gemini_history(summary, recent_history)
+
+
+def elapsed_ms(started):
+    """Milisegundos desde `started` (time.perf_counter())."""
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def turn_metadata(
+    model, cache_hit, tokens=None, estimated_prompt_tokens=0,
+    latency_ms=None, ttft_ms=None, retrieval_ms=None, turn_ms=None
+):
+    """
+    Metadatos del mensaje del asistente: mismos campos en todos los
+    caminos (/chat/message/, /chat/api/, streaming). Son la fuente de
+    ChatDailyStats (ver stats.py).
+
+    latency_ms: duración de la llamada al LLM; ttft_ms: hasta el primer
+    fragmento (igual a latency_ms sin streaming). Un acierto de caché no
+    llama al LLM: sin latencias ni tokens.
+    """
+    tokens = tokens or {}
+    return {
+        'model': model,
+        'cache_hit': cache_hit,
+        'latency_ms': None if cache_hit else latency_ms,
+        'ttft_ms': None if cache_hit else (ttft_ms if ttft_ms is not None else latency_ms),
+        'retrieval_ms': retrieval_ms,
+        'turn_ms': turn_ms,
+        'prompt_tokens': 0 if cache_hit else (tokens.get('prompt') or estimated_prompt_tokens),
+        'completion_tokens': 0 if cache_hit else (tokens.get('completion') or 0),
+    }
+
+
+async def save_gemini_turn(chat_session, user_message, response_text, metadata):
+    """
+    Agrega el turno como dos filas ChatMessage (append-only): el costo de
+    guardar no crece con el largo de la conversación.
+    """
+    await ChatMessage.objects.abulk_create([
+        ChatMessage(session=chat_session, role='user', content=user_message),
+        ChatMessage(
+            session=chat_session,
+            role='assistant',
+            content=response_text,
+            metadata=metadata
+        ),
+    ])
+    await ChatSession.objects.filter(pk=chat_session.pk).aupdate(
+        total_messages=F('total_messages') + 2,
+        updated_at=timezone.now()
+    )
+
+
+def gemini_cache_key(user_message, current_id):
+    """Clave de caché independiente de la sesión (solo para el primer turno)."""
+    return response_cache.make_key(
+        user_message,
+        GEMINI_SYSTEM_PROMPT,
+        build_gemini_context(current_id).replace(current_id, SESSION_ID_PLACEHOLDER)
+    )
+
+
+def cache_gemini_response(cache_key, response_text, model_name, current_id):
+    response_cache.set(cache_key, {
+        'text': response_text.replace(current_id, SESSION_ID_PLACEHOLDER),
+        'model': model_name,
+    })
+
+
+def cached_gemini_response(cache_key, current_id):
+    """Retorna (texto, modelo) desde la caché, o (None, None)."""
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        return None, None
+    return cached['text'].replace(SESSION_ID_PLACEHOLDER, current_id), cached['model']
+
+
+def to_messages(entries):
+    """Historial en formato Gemini -> Message (model -> assistant)."""
+    return [
+        Message(role='assistant' if entry['role'] == 'model' else 'user', content=entry_text(entry))
+        for entry in entries
+    ]
+
+
+def gemini_messages(chat_session, recent_history, user_message):
+    """Mensajes del turno para el proveedor: system prompt, contexto, historial y mensaje."""
+    messages = [Message(role='system', content=GEMINI_SYSTEM_PROMPT)]
+    messages += to_messages(build_session_history(
+        str(chat_session.session_id), chat_session.summary, recent_history
+    ))
+    messages.append(Message(role='user', content=user_message))
+    return messages
+
+
+async def run_gemini_turn(chat_session, user_message):
+    """
+    Turno completo de /chat/api/: contexto, memoria, caché, LLM y guardado.
+    Retorna el payload JSON de la respuesta.
+    """
+    turn_started = time.perf_counter()
+
+    # 1. Sesión (el system prompt es estático; el contexto va en el historial)
+    current_id = str(chat_session.session_id)
+
+    # 2. Gestión de Memoria (DB Persistence): turnos recientes + resumen
+    recent_history, needs_compaction = await aload_recent_history(chat_session)
+
+    # 3. Caché de respuestas (solo primer turno: sin historial previo)
+    cache_key = None
+    response_text = None
+    if not recent_history and not chat_session.summary:
+        cache_key = gemini_cache_key(user_message, current_id)
+        response_text, model_name = cached_gemini_response(cache_key, current_id)
+
+    if response_text is None:
+        # 4. Generar (failover al modelo de respaldo, deadline, hedging
+        #    y circuit breaker en el proveedor compartido del proceso)
+        messages = gemini_messages(chat_session, recent_history, user_message)
+        llm_started = time.perf_counter()
+        with llm_phase():
+            response = await get_gemini_provider().agenerate(messages)
+        metadata = turn_metadata(
+            response.model, False, tokens=response.tokens_used, latency_ms=elapsed_ms(llm_started),
+            turn_ms=elapsed_ms(turn_started)
+        )
+        response_text, model_name = response.content, response.model
+        if cache_key:
+            cache_gemini_response(cache_key, response_text, model_name, current_id)
+    else:
+        metadata = turn_metadata(model_name, True, turn_ms=elapsed_ms(turn_started))
+
+    # 5. Guardar el turno en BD (la compactación corre en segundo plano)
+    await save_gemini_turn(chat_session, user_message, response_text, metadata)
+    if needs_compaction:
+        schedule_compaction(chat_session.pk)
+
+    return {
+        "response": response_text,
+        "status": "success",
+        "model": model_name,
+        "session_id": current_id
+    }
+
+
+async def run_service_turn(chat_session, user_message):
+    """
+    Turno completo de /chat/message/ vía ChatService.
+    Retorna el payload JSON de la respuesta.
+    """
+    turn_started = time.perf_counter()
+
+    # Procesar con servicio de chat
+    chat_service = get_chat_service()
+    result = await chat_service.aprocess_message(
+        session_id=str(chat_session.session_id),
+        user_message=user_message
+    )
+    timings = result.get('timings', {})
+
+    # Guardar el turno (usuario + asistente) en un solo INSERT
+    user_msg, assistant_msg = await ChatMessage.objects.abulk_create([
+        ChatMessage(session=chat_session, role='user', content=user_message),
+        ChatMessage(
+            session=chat_session,
+            role='assistant',
+            content=result['response'],
+            sources=result.get('sources', []),
+            metadata=turn_metadata(
+                result.get('model'),
+                result.get('cache_hit', False),
+                tokens=result.get('tokens'),
+                estimated_prompt_tokens=result.get('prompt_tokens') or 0,
+                latency_ms=timings.get('llm_ms'),
+                retrieval_ms=timings.get('retrieval_ms'),
+                turn_ms=elapsed_ms(turn_started),
+            )
+        ),
+    ])
+
+    # Actualizar contador de mensajes (UPDATE atómico, sin leer la fila)
+    await ChatSession.objects.filter(pk=chat_session.pk).aupdate(
+        total_messages=F('total_messages') + 2,
+        updated_at=timezone.now()
+    )
+    # La compactación corre en segundo plano, igual que en run_gemini_turn
+    if result.get('needs_compaction'):
+        schedule_compaction(chat_session.pk)
+
+    return {
+        'response': result['response'],
+        'sources': result.get('sources', []),
+        'session_id': str(chat_session.session_id),
+        'message_id': assistant_msg.id,
+    }
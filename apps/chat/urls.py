@@ -11,4 +11,7 @@ urlpatterns = [
     path('message/', views.send_message, name='send_message'),
     path('history/', views.get_history, name='history'),
     path('api/', views.chat_with_gemini, name='api_chat'),
+    path('api/stream/', views.chat_with_gemini_stream, name='api_chat_stream'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('llm/status/', views.llm_status, name='llm_status'),
 ]
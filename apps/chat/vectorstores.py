@@ -0,0 +1,702 @@
+"""
+Chat - Vector stores locales (RAG sin servicios externos)
+
+NumpyVectorStore guarda los embeddings en una matriz float32 contigua,
+mapeada en memoria desde disco: todos los workers del host comparten las
+mismas páginas y la búsqueda es un único producto matriz-vector.
+
+Layout en disco (directorio del store):
+    vectors.f32        matriz (capacity, dim) float32, crece duplicando
+    documents.<n>.log  contenido y metadata, un JSON por línea (append-only)
+    index.json         ids y (offset, largo) de cada fila en el log
+    .lock              lock de escritura entre procesos
+
+index.json es lo único que se reescribe en cada upsert/delete y lo único
+que relee un proceso al detectar el cambio: el contenido se lee del log
+solo para los resultados (y la metadata, cacheada, para los filtros).
+Cuando el log acumula más bytes obsoletos que vigentes se compacta en un
+log nuevo (<n+1>).
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .services import Embedder, RetrievedDocument, VectorStore
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 64
+
+# Versión del layout en disco (1: contenido y metadata dentro de index.json)
+INDEX_VERSION = 2
+
+# Bytes obsoletos mínimos en el log antes de compactarlo
+COMPACT_MIN_BYTES = 1 << 20
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Vector store en proceso con similitud coseno vectorizada.
+
+    Los vectores se guardan normalizados, así que el score coseno es el
+    producto punto. upsert() escribe la fila en su lugar (o al final) sin
+    reconstruir la matriz y agrega el documento al log; los lectores
+    detectan cambios por el mtime de index.json y re-mapean el archivo.
+    """
+
+    def __init__(self, path: os.PathLike, embedder: Embedder):
+        self.path = Path(path)
+        self.embedder = embedder
+        self.dimension = embedder.dimension
+        self._lock = threading.RLock()
+        self._index_mtime: Optional[int] = None
+        self._ids: List[Optional[str]] = []
+        self._records: List[Optional[List[int]]] = []
+        self._garbage = 0
+        self._log = DocumentLog(self.path)
+        self._rows: Dict[str, int] = {}
+        self._valid = np.zeros(0, dtype=bool)
+        self._capacity = 0
+        self._matrix: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------
+    # API VectorStore
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        if top_k <= 0:
+            return []
+        query_vector = self.embedder.embed([query], task='query')[0]
+        return self.search_by_vector(query_vector, top_k=top_k, filter=filter)
+
+    def search_by_vector(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        """Búsqueda exacta (fuerza bruta) con un embedding ya calculado."""
+        with self._lock:
+            self._refresh()
+            count = len(self._ids)
+            if count == 0 or top_k <= 0:
+                return []
+            mask = self._mask(filter)
+            scores = self._matrix[:count] @ np.asarray(query_vector, dtype=np.float32)
+            scores = np.where(mask, scores, -np.inf)
+            rows = _top_k_rows(scores, top_k, int(mask.sum()))
+            return [self._to_document(int(row), float(scores[row])) for row in rows]
+
+    def upsert(
+        self,
+        document_id: str,
+        content: str,
+        metadata: Dict[str, Any]
+    ) -> bool:
+        return self.upsert_many([(document_id, content, metadata)]) == 1
+
+    def upsert_many(
+        self,
+        documents: Sequence[Tuple[str, str, Dict[str, Any]]],
+        embeddings: Optional[np.ndarray] = None
+    ) -> int:
+        """
+        Indexa varios documentos (document_id, content, metadata) en una
+        sola escritura. Si no se pasan embeddings, se calculan en batch.
+        """
+        if not documents:
+            return 0
+        if embeddings is None:
+            embeddings = self.embedder.embed([content for _, content, _ in documents])
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.shape != (len(documents), self.dimension):
+            raise ValueError(
+                f"Embeddings con forma {embeddings.shape}, se esperaba "
+                f"({len(documents)}, {self.dimension})"
+            )
+
+        with self._write_lock():
+            records = self._log.append((content, metadata) for _, content, metadata in documents)
+            rows = []
+            for (document_id, _, _), record in zip(documents, records):
+                row = self._rows.get(document_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(document_id)
+                    self._records.append(None)
+                    self._rows[document_id] = row
+                elif self._records[row] is not None:
+                    self._garbage += self._records[row][1]
+                self._records[row] = record
+                rows.append(row)
+
+            self._ensure_capacity(len(self._ids))
+            writable = np.memmap(
+                self._vectors_path, dtype=np.float32, mode='r+',
+                shape=(self._capacity, self.dimension)
+            )
+            writable[rows] = embeddings
+            writable.flush()
+            del writable
+            self._on_rows_written(rows, embeddings)
+            self._save_index()
+        return len(documents)
+
+    def delete(self, document_id: str) -> bool:
+        """Elimina un documento (la fila queda libre como tombstone)."""
+        with self._write_lock():
+            row = self._rows.pop(document_id, None)
+            if row is None:
+                return False
+            self._ids[row] = None
+            self._garbage += self._records[row][1]
+            self._records[row] = None
+            self._on_row_deleted(row)
+            self._save_index()
+        return True
+
+    def document_ids(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return [doc_id for doc_id in self._ids if doc_id is not None]
+
+    def get_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(document_id)
+            return None if row is None else self._log.metadata(self._records[row])
+
+    def get_contents(self, document_ids: Sequence[str]) -> Dict[str, str]:
+        with self._lock:
+            self._refresh()
+            return {
+                document_id: self._log.read(self._records[self._rows[document_id]])['content']
+                for document_id in document_ids if document_id in self._rows
+            }
+
+    def __len__(self) -> int:
+        return len(self.document_ids())
+
+    # ------------------------------------------------------------------
+    # Hooks para subclases (índices ANN)
+    # ------------------------------------------------------------------
+
+    def _on_rows_written(self, rows: List[int], embeddings: np.ndarray) -> None:
+        pass
+
+    def _on_row_deleted(self, row: int) -> None:
+        pass
+
+    def _on_index_loaded(self, state: Dict[str, Any]) -> None:
+        pass
+
+    def _extra_index_state(self) -> Dict[str, Any]:
+        return {}
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / 'vectors.f32'
+
+    @property
+    def _index_path(self) -> Path:
+        return self.path / 'index.json'
+
+    def _refresh(self) -> None:
+        """Recarga el índice si otro proceso lo modificó."""
+        # Una compactación concurrente puede borrar el log que nombra el
+        # index.json recién leído: se relee el índice
+        for _ in range(3):
+            try:
+                mtime = self._index_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._index_mtime:
+                return
+            with open(self._index_path, encoding='utf-8') as f:
+                state = json.load(f)
+            self._check_state(state)
+            try:
+                self._log.open(state['log'])
+            except FileNotFoundError:
+                continue
+            self._load_state(state, mtime)
+            return
+        raise FileNotFoundError(f"No se encontró el log de documentos de {self.path}")
+
+    def _check_state(self, state: Dict[str, Any]) -> None:
+        if state.get('version') != INDEX_VERSION:
+            raise ValueError(
+                f"El índice en {self.path} usa un formato anterior. "
+                "Es necesario borrarlo y reindexar."
+            )
+        if state['dimension'] != self.dimension:
+            raise ValueError(
+                f"El índice en {self.path} tiene dimensión {state['dimension']}, "
+                f"el embedder usa {self.dimension}. Es necesario reindexar."
+            )
+
+    def _load_state(self, state: Dict[str, Any], mtime: int) -> None:
+        self._ids = state['ids']
+        self._records = state['records']
+        self._garbage = state['garbage']
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids) if doc_id is not None}
+        self._valid = np.array([doc_id is not None for doc_id in self._ids], dtype=bool)
+        self._capacity = state['capacity']
+        self._matrix = self._open_matrix()
+        self._index_mtime = mtime
+        self._on_index_loaded(state)
+
+    def _open_matrix(self) -> np.ndarray:
+        if self._capacity == 0:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.memmap(
+            self._vectors_path, dtype=np.float32, mode='r',
+            shape=(self._capacity, self.dimension)
+        )
+
+    def _ensure_capacity(self, rows_needed: int) -> None:
+        if rows_needed <= self._capacity:
+            return
+        capacity = max(self._capacity, INITIAL_CAPACITY)
+        while capacity < rows_needed:
+            capacity *= 2
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(capacity * self.dimension * 4)
+        self._capacity = capacity
+
+    def _save_index(self) -> None:
+        stale_log = None
+        if self._log.needs_compaction(self._records, self._garbage):
+            self._records, stale_log = self._log.compact(self._records)
+            self._garbage = 0
+        state = {
+            'version': INDEX_VERSION,
+            'dimension': self.dimension,
+            'capacity': self._capacity,
+            'log': self._log.name,
+            'ids': self._ids,
+            'records': self._records,
+            'garbage': self._garbage,
+            **self._extra_index_state(),
+        }
+        tmp_path = self._index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self._index_path)
+        if stale_log is not None:
+            stale_log.unlink(missing_ok=True)
+        self._index_mtime = None
+        self._refresh()
+
+    @contextmanager
+    def _write_lock(self):
+        """Lock de escritura entre procesos + recarga del estado más reciente."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path / '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            except BaseException:
+                # Estado en memoria a medio escribir: se recarga del disco
+                self._index_mtime = None
+                raise
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _mask(self, filter: Optional[Dict] = None, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Filas válidas (no eliminadas) que cumplen el filtro de metadata.
+        Si se pasa `rows`, solo se evalúan esas filas.
+        """
+        valid = self._valid if rows is None else self._valid[rows]
+        if not filter:
+            return valid
+        selected = range(len(self._records)) if rows is None else rows
+        matches = np.fromiter(
+            (
+                self._records[row] is not None
+                and matches_filter(self._log.metadata(self._records[row]), filter)
+                for row in selected
+            ),
+            dtype=bool,
+            count=len(valid)
+        )
+        return valid & matches
+
+    def _to_document(self, row: int, score: float) -> RetrievedDocument:
+        doc = self._log.read(self._records[row])
+        metadata = doc['metadata']
+        return RetrievedDocument(
+            content=doc['content'],
+            source=metadata.get('source') or self._ids[row],
+            score=score,
+            metadata={**metadata, 'id': self._ids[row]}
+        )
+
+
+class DocumentLog:
+    """
+    Contenido y metadata de documentos en un log append-only, un JSON por
+    línea: <directorio>/documents.<n>.log.
+
+    El índice de quien lo usa guarda el nombre del log vigente (`name`) y
+    el [offset, largo] de cada documento. Un offset nunca cambia de
+    contenido, así que la metadata leída se cachea por offset. compact()
+    copia los documentos vigentes a la generación n+1.
+    """
+
+    def __init__(self, directory: os.PathLike):
+        self.directory = Path(directory)
+        self.name: Optional[str] = None
+        self._file: Optional[Tuple[str, int]] = None  # (nombre, fd) abierto para leer
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+
+    def open(self, name: Optional[str]) -> None:
+        """Apunta al log que nombra el índice recién leído."""
+        current = self._file[0] if self._file else None
+        if name != current:
+            fd = None if name is None else os.open(self.directory / name, os.O_RDONLY)
+            if self._file is not None:
+                os.close(self._file[1])
+            self._file = None if fd is None else (name, fd)
+            self._metadata = {}
+        self.name = name
+
+    def create(self) -> None:
+        """Crea (vacío) el log de la generación 0 si todavía no hay log."""
+        if self.name is None:
+            (self.directory / _log_name(0)).touch()
+            self.open(_log_name(0))
+
+    def append(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> List[List[int]]:
+        """Agrega (content, metadata) al final del log; retorna el [offset, largo] de cada uno."""
+        self.create()
+        records = []
+        with open(self.directory / self.name, 'ab') as log:
+            offset = log.tell()
+            for content, metadata in documents:
+                data = _encode_record(content, metadata)
+                log.write(data)
+                records.append([offset, len(data)])
+                offset += len(data)
+        self.open(self.name)
+        return records
+
+    def read(self, record: List[int]) -> Dict[str, Any]:
+        """{'content', 'metadata'} de un registro."""
+        offset, length = record
+        doc = json.loads(os.pread(self._file[1], length, offset))
+        self._metadata[offset] = doc['metadata']
+        return doc
+
+    def metadata(self, record: List[int]) -> Dict[str, Any]:
+        cached = self._metadata.get(record[0])
+        return cached if cached is not None else self.read(record)['metadata']
+
+    def needs_compaction(self, records: Iterable[Optional[List[int]]], garbage: int) -> bool:
+        """True si el log tiene más bytes obsoletos que vigentes (y al menos COMPACT_MIN_BYTES)."""
+        live = sum(record[1] for record in records if record is not None)
+        return self.name is not None and garbage >= max(live, COMPACT_MIN_BYTES)
+
+    def compact(self, records: List[Optional[List[int]]]) -> Tuple[List[Optional[List[int]]], Path]:
+        """
+        Copia los registros vigentes (en orden) a la generación siguiente.
+        Retorna (registros nuevos, log reemplazado): el llamador lo borra
+        después de guardar el índice que apunta al nuevo.
+        """
+        stale_log = self.directory / self.name
+        name = _log_name(int(self.name.split('.')[1]) + 1)
+        compacted: List[Optional[List[int]]] = []
+        offset = 0
+        with open(stale_log, 'rb') as source, open(self.directory / name, 'wb') as target:
+            for record in records:
+                if record is None:
+                    compacted.append(None)
+                    continue
+                source.seek(record[0])
+                target.write(source.read(record[1]))
+                compacted.append([offset, record[1]])
+                offset += record[1]
+        logger.info("Log de documentos compactado: %s -> %s (%d bytes)", self.name, name, offset)
+        self.open(name)
+        return compacted, stale_log
+
+
+def _log_name(generation: int) -> str:
+    return f"documents.{generation}.log"
+
+
+def _encode_record(content: str, metadata: Dict[str, Any]) -> bytes:
+    """Una línea JSON del log (el offset y el largo los guarda el índice)."""
+    record = json.dumps({'content': content, 'metadata': metadata}, ensure_ascii=False, separators=(',', ':'))
+    return record.encode('utf-8') + b'\n'
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict]) -> bool:
+    """Filtro por igualdad; un valor lista/tupla significa 'cualquiera de'."""
+    if not filter:
+        return True
+    for key, expected in filter.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _top_k_rows(scores: np.ndarray, top_k: int, valid: int) -> Iterable[int]:
+    """
+    Índices de los top_k scores, ordenados por score desc y luego por fila
+    (desempate determinista).
+    """
+    k = min(top_k, valid)
+    if k <= 0:
+        return []
+    # Umbral = k-ésimo mejor score; los empates en el umbral se resuelven
+    # por número de fila, no por el orden arbitrario de argpartition.
+    threshold = -np.partition(-scores, k - 1)[k - 1]
+    candidates = np.flatnonzero(scores >= threshold)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
+
+
+class IVFVectorStore(NumpyVectorStore):
+    """
+    Índice aproximado IVF (inverted file) sobre NumpyVectorStore.
+
+    Los vectores se agrupan con k-means esférico en `nlist` centroides; una
+    búsqueda solo evalúa las filas de los `nprobe` centroides más cercanos
+    a la query. Más nprobe = más recall y más latencia.
+
+    - Con menos de `min_train_size` documentos (o sin entrenar) la búsqueda
+      es exacta, igual que NumpyVectorStore.
+    - upsert() asigna las filas nuevas al centroide más cercano sin
+      reentrenar; conviene reconstruir (rebuild_vector_index) cuando la
+      base de conocimiento cambia mucho.
+    - El resultado es determinista para un mismo estado del índice.
+
+    Archivos adicionales:
+        centroids.npy     matriz (nlist, dim) float32
+        assignments.npy   vector (capacity,) int32 fila -> centroide (-1 sin
+                          asignar), mapeado en memoria junto a la matriz
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        embedder: Embedder,
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_train_size: int = 1024
+    ):
+        super().__init__(path, embedder)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._list_order = np.zeros(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+
+    @property
+    def _centroids_path(self) -> Path:
+        return self.path / 'centroids.npy'
+
+    @property
+    def _assignments_path(self) -> Path:
+        return self.path / 'assignments.npy'
+
+    def search_by_vector(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[RetrievedDocument]:
+        with self._lock:
+            self._refresh()
+            if self._centroids is None or len(self._rows) < self.min_train_size:
+                return super().search_by_vector(query_vector, top_k=top_k, filter=filter)
+            if top_k <= 0:
+                return []
+
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            candidates = self._candidate_rows(query_vector, top_k)
+            mask = self._mask(filter, rows=candidates)
+            scores = self._matrix[candidates] @ query_vector
+            scores = np.where(mask, scores, -np.inf)
+            positions = _top_k_rows(scores, top_k, int(mask.sum()))
+            return [
+                self._to_document(int(candidates[pos]), float(scores[pos]))
+                for pos in positions
+            ]
+
+    def rebuild(self, nlist: Optional[int] = None, iterations: int = 20, seed: int = 0) -> int:
+        """
+        Entrena los centroides (k-means) sobre todos los vectores y reasigna
+        cada fila. Retorna el número de listas del índice.
+        """
+        with self._write_lock():
+            rows = np.array(sorted(self._rows.values()), dtype=np.int64)
+            if len(rows) == 0:
+                return 0
+            nlist = nlist or self.nlist or max(1, int(np.sqrt(len(rows))))
+            nlist = min(nlist, len(rows))
+
+            data = np.asarray(self._matrix[rows])
+            centroids = _train_kmeans(data, nlist, iterations=iterations, seed=seed)
+
+            assignments = self._new_assignments()
+            assignments[rows] = _nearest_centroids(data, centroids)
+            self._replace_assignments(assignments)
+
+            tmp_path = self.path / 'centroids.tmp.npy'
+            np.save(tmp_path, centroids)
+            os.replace(tmp_path, self._centroids_path)
+            self._save_index()
+        logger.info("Índice IVF reconstruido: %d vectores, %d listas", len(rows), nlist)
+        return nlist
+
+    # ------------------------------------------------------------------
+    # Hooks de NumpyVectorStore
+    # ------------------------------------------------------------------
+
+    def _on_rows_written(self, rows: List[int], embeddings: np.ndarray) -> None:
+        writable = self._writable_assignments()
+        if self._centroids is not None:
+            writable[rows] = _nearest_centroids(embeddings, self._centroids)
+        else:
+            writable[rows] = -1
+        writable.flush()
+
+    def _on_row_deleted(self, row: int) -> None:
+        writable = self._writable_assignments()
+        writable[row] = -1
+        writable.flush()
+
+    def _on_index_loaded(self, state: Dict[str, Any]) -> None:
+        assignments = np.full(len(self._ids), -1, dtype=np.int32)
+        try:
+            stored = np.load(self._assignments_path, mmap_mode='r')
+        except FileNotFoundError:
+            stored = None
+        if stored is not None:
+            count = min(len(stored), len(self._ids))
+            assignments[:count] = stored[:count]
+            del stored
+
+        try:
+            self._centroids = np.load(self._centroids_path)
+        except FileNotFoundError:
+            self._centroids = None
+            self._assignments = assignments
+            return
+
+        # Asignaciones de otro entrenamiento (se leyeron entre el reemplazo
+        # de centroids.npy y el de assignments.npy): se tratan como sin asignar
+        assignments[assignments >= len(self._centroids)] = -1
+        self._assignments = assignments
+
+        # Listas invertidas: filas ordenadas por centroide + offsets.
+        # Las filas sin asignar (-1) quedan al inicio y se evalúan siempre.
+        self._list_order = np.argsort(assignments, kind='stable')
+        self._list_offsets = np.searchsorted(
+            assignments[self._list_order],
+            np.arange(-1, len(self._centroids) + 1)
+        )
+
+    def _new_assignments(self) -> np.ndarray:
+        return np.full(self._capacity, -1, dtype=np.int32)
+
+    def _replace_assignments(self, assignments: np.ndarray) -> None:
+        """Escribe assignments.npy completo (archivo temporal + os.replace)."""
+        tmp_path = self.path / 'assignments.tmp.npy'
+        np.save(tmp_path, assignments)
+        os.replace(tmp_path, self._assignments_path)
+
+    def _writable_assignments(self) -> np.ndarray:
+        """assignments.npy mapeado para escritura, del largo de la matriz."""
+        try:
+            stored = np.load(self._assignments_path, mmap_mode='r+')
+        except FileNotFoundError:
+            stored = None
+        if stored is None or len(stored) < self._capacity:
+            # La matriz creció (o es nueva): se copia a un archivo más grande
+            assignments = self._new_assignments()
+            if stored is not None:
+                assignments[:len(stored)] = stored
+                del stored
+            self._replace_assignments(assignments)
+            stored = np.load(self._assignments_path, mmap_mode='r+')
+        return stored
+
+    def _candidate_rows(self, query_vector: np.ndarray, top_k: int) -> np.ndarray:
+        """Filas de las listas más cercanas (al menos nprobe y top_k filas)."""
+        centroid_scores = self._centroids @ query_vector
+        ranked = np.lexsort((np.arange(len(centroid_scores)), -centroid_scores))
+
+        offsets = self._list_offsets
+        # Filas no asignadas (insertadas antes de entrenar)
+        chunks = [self._list_order[offsets[0]:offsets[1]]]
+        found = len(chunks[0])
+        for probed, centroid in enumerate(ranked):
+            if probed >= self.nprobe and found >= top_k:
+                break
+            start, end = offsets[centroid + 1], offsets[centroid + 2]
+            chunks.append(self._list_order[start:end])
+            found += end - start
+        return np.sort(np.concatenate(chunks))
+
+
+def _nearest_centroids(data: np.ndarray, centroids: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+    """Centroide más cercano (coseno) para cada fila, en batches."""
+    result = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), batch_size):
+        block = data[start:start + batch_size] @ centroids.T
+        result[start:start + batch_size] = np.argmax(block, axis=1)
+    return result
+
+
+def _train_kmeans(data: np.ndarray, nlist: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means esférico determinista (semilla fija). Retorna centroides normalizados."""
+    rng = np.random.default_rng(seed)
+    # Entrenar sobre una muestra acotada: suficiente para centroides estables
+    sample_size = min(len(data), max(nlist * 256, 10000))
+    sample = data[np.sort(rng.choice(len(data), sample_size, replace=False))]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Centroides vacíos: se re-siembran con una fila al azar
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
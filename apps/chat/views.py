@@ -2,12 +2,49 @@
 Chat - Vistas y endpoints para el chatbot
 """
 import json
+import logging
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
+from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
-from .models import ChatSession, ChatMessage
-from .services import get_chat_service
+from apps.core.ratelimit import Rule, client_ip, rate_limit
+from .models import ChatJob, ChatSession, ChatMessage
+from bestia_site.metrics import llm_phase
+from .cache import fingerprint
+from .concurrency import LLMOverloadedError, llm_gate
+from .pagination import InvalidCursor, after, before, decode_cursor, message_cursor
+from .jobs import aenqueue, job_payload
+from .services import get_gemini_provider
+from .turns import (
+    cache_gemini_response, cached_gemini_response, elapsed_ms, gemini_cache_key, gemini_messages,
+    run_gemini_turn, run_service_turn, save_gemini_turn, turn_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _rate_limit_session_key(request):
+    """
+    Bucket por sesión: la cookie de sesión de Django, sin tocar la BD ni
+    parsear el body. El session_id del body no se usa (el cliente lo
+    elige y lo puede rotar en cada request); sin cookie aplican solo los
+    buckets por IP y global.
+    """
+    return request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+
+# Se evalúan antes de crear sesiones o llamar al LLM; los endpoints de chat
+# comparten buckets (una misma cuota por sesión, por IP y global).
+chat_rate_limit = rate_limit(
+    Rule('chat-session', settings.CHAT_RATE_LIMIT_SESSION, key=_rate_limit_session_key),
+    Rule('chat-ip', settings.CHAT_RATE_LIMIT_IP, key=client_ip),
+    Rule('chat-global', settings.CHAT_RATE_LIMIT_GLOBAL),
+)
 
 
 def chat_interface(request):
@@ -29,7 +66,8 @@ def chat_interface(request):
 
 @require_POST
 @csrf_exempt  # TODO: Implementar CSRF token en frontend
-def send_message(request):
+@chat_rate_limit
+async def send_message(request):
     """
     Endpoint para enviar mensajes al chatbot.
     
@@ -37,6 +75,9 @@ def send_message(request):
     Body: {"message": "...", "session_id": "..."}
     
     Response: {"response": "...", "sources": [...]}
+    
+    Modo asíncrono ("async": true o CHAT_ASYNC_JOBS): responde 202 con
+    {"job_id": "...", "poll_url": "..."} y el turno lo ejecuta chat_worker.
     """
     try:
         data = json.loads(request.body)
@@ -52,194 +93,380 @@ def send_message(request):
     # Obtener o crear sesión
     try:
         if session_id:
-            session = ChatSession.objects.get(session_id=session_id)
+            session = await ChatSession.objects.aget(session_id=session_id)
         else:
-            session = ChatSession.objects.create()
+            session = await ChatSession.objects.acreate()
     except ChatSession.DoesNotExist:
-        session = ChatSession.objects.create()
-    
-    # Guardar mensaje del usuario
-    user_msg = ChatMessage.objects.create(
-        session=session,
-        role='user',
-        content=message
-    )
+        session = await ChatSession.objects.acreate()
     
-    # Procesar con servicio de chat
-    chat_service = get_chat_service()
-    result = chat_service.process_message(
-        session_id=str(session.session_id),
-        user_message=message
-    )
-    
-    # Guardar respuesta del asistente
-    assistant_msg = ChatMessage.objects.create(
-        session=session,
-        role='assistant',
-        content=result['response'],
-        sources=result.get('sources', []),
-        metadata={
-            'model': result.get('model'),
-            'tokens': result.get('tokens'),
-        }
-    )
+    if _async_requested(data):
+        return await _enqueue_turn(session, 'service', message)
     
-    # Actualizar contador de mensajes
-    session.total_messages += 2
-    session.save(update_fields=['total_messages', 'updated_at'])
-    
-    return JsonResponse({
-        'response': result['response'],
-        'sources': result.get('sources', []),
-        'session_id': str(session.session_id),
-        'message_id': assistant_msg.id,
-    })
+    try:
+        return JsonResponse(await run_service_turn(session, message))
+    except LLMOverloadedError as e:
+        return _overloaded_response(e)
+
+
+def _overloaded_response(error):
+    """503 con Retry-After: sin capacidad para otra llamada al LLM."""
+    response = JsonResponse({'error': str(error), 'status': 'overloaded'}, status=503)
+    response['Retry-After'] = str(error.retry_after)
+    return response
 
 
 @require_GET
-def get_history(request):
+@staff_member_required
+def llm_status(request):
     """
-    Obtiene el historial de mensajes de una sesión.
+    Estado del límite de concurrencia del LLM en este host.
+
+    GET /chat/llm/status/
+    Response: {"limit": 8, "in_flight": 3, "queue_size": 16, "queued": 0, "shed": 0}
+    (shed: rechazos en el worker que atendió la consulta)
+    """
+    return JsonResponse(llm_gate.stats())
+
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+@require_GET
+async def get_history(request):
+    """
+    Obtiene el historial de mensajes de una sesión, paginado por cursor.
+    
+    GET /chat/history/?session_id=...[&limit=50][&before=<cursor> | &since=<cursor>]
+    
+    - sin cursor: los últimos `limit` mensajes
+    - before: página de mensajes anteriores (scroll hacia atrás)
+    - since: solo los mensajes nuevos (polling del widget)
     
-    GET /chat/history/?session_id=...
+    Response: {"messages": [...], "has_more": bool,
+               "previous_cursor": "...", "next_cursor": "..."}
+    Los mensajes van en orden cronológico. Soporta ETag / If-None-Match.
     """
     session_id = request.GET.get('session_id')
     if not session_id:
         return JsonResponse({'error': 'session_id requerido'}, status=400)
     
     try:
-        session = ChatSession.objects.get(session_id=session_id)
-    except ChatSession.DoesNotExist:
+        limit = int(request.GET.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'limit inválido'}, status=400)
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    
+    before_cursor = request.GET.get('before')
+    since_cursor = request.GET.get('since')
+    if before_cursor and since_cursor:
+        return JsonResponse({'error': 'Usar before o since, no ambos'}, status=400)
+    try:
+        cursor = decode_cursor(before_cursor or since_cursor) if (before_cursor or since_cursor) else None
+    except InvalidCursor:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    
+    try:
+        session = await ChatSession.objects.only(
+            'session_id', 'updated_at', 'total_messages'
+        ).aget(session_id=session_id)
+    except (ChatSession.DoesNotExist, ValidationError):
         return JsonResponse({'error': 'Sesión no encontrada'}, status=404)
     
-    messages = session.messages.values('role', 'content', 'created_at')
+    # Los mensajes son append-only: (updated_at, total_messages) cambia con
+    # cada turno, así que basta para saber si la respuesta cambió.
+    etag = quote_etag(fingerprint(
+        str(session.session_id),
+        session.updated_at.isoformat(),
+        str(session.total_messages),
+        str(limit),
+        before_cursor or '',
+        since_cursor or '',
+    )[:32])
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
     
-    return JsonResponse({
+    messages = ChatMessage.objects.filter(session_id=session.pk).values(
+        'id', 'role', 'content', 'created_at'
+    )
+    if since_cursor:
+        page = [m async for m in messages.filter(after(cursor)).order_by('created_at', 'id')[:limit + 1]]
+        has_more = len(page) > limit
+        page = page[:limit]
+    else:
+        if before_cursor:
+            messages = messages.filter(before(cursor))
+        page = [m async for m in messages.order_by('-created_at', '-id')[:limit + 1]]
+        has_more = len(page) > limit
+        page = page[:limit]
+        page.reverse()
+    
+    response = JsonResponse({
         'session_id': str(session.session_id),
-        'messages': list(messages)
+        'messages': page,
+        'has_more': has_more,
+        'previous_cursor': message_cursor(page[0]) if page else before_cursor,
+        'next_cursor': message_cursor(page[-1]) if page else since_cursor,
     })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 # =============================================================================
 # Gemini Integration (New)
 # =============================================================================
-import google.generativeai as genai
-import os
+import asyncio
+import time
+from django.http import StreamingHttpResponse
+from .gemini import registry as gemini_registry
+from .memory import aload_recent_history, schedule_compaction
+
+
+async def _get_or_create_gemini_session(request):
+    """Recupera la sesión de chat desde la cookie (o crea una nueva)."""
+    session_id_str = await request.session.aget('chat_session_id')
+    chat_session = None
+
+    if session_id_str:
+        try:
+            chat_session = await ChatSession.objects.aget(session_id=session_id_str)
+        except ChatSession.DoesNotExist:
+            pass
+
+    if not chat_session:
+        chat_session = await ChatSession.objects.acreate()
+        await request.session.aset('chat_session_id', str(chat_session.session_id))
+
+    return chat_session
+
+
+def _parse_chat_message(request):
+    """
+    Extrae el mensaje del body JSON (se parsea una sola vez).
+    Retorna (mensaje, body, JsonResponse de error).
+    """
+    try:
+        data = json.loads(request.body)
+        user_message = data.get('message', '').strip()
+    except (json.JSONDecodeError, AttributeError):
+        return None, None, JsonResponse({'error': 'JSON inválido'}, status=400)
+
+    if not user_message:
+        return None, data, JsonResponse({'error': 'Mensaje vacío'}, status=400)
+
+    return user_message, data, None
+
 
 @require_POST
 @csrf_exempt
-def chat_with_gemini(request):
+@chat_rate_limit
+async def chat_with_gemini(request):
     """
     Controlador para chat directo con Gemini 2.0 Flask via API.
-    PERSISTENCIA: Usa base de datos (ChatSession.history).
+    PERSISTENCIA: Usa base de datos (filas ChatMessage + ChatSession.summary).
     """
     try:
-        # 1. Configuración
-        api_key = os.environ.get("GOOGLE_API_KEY")
-        if not api_key:
+        # 1. Configuración (una vez por proceso)
+        if not gemini_registry.configure():
             return JsonResponse({'error': 'API Key no configurada'}, status=500)
         
-        genai.configure(api_key=api_key)
-        
         # 2. Obtener datos y Sesión DB
+        user_message, data, error_response = _parse_chat_message(request)
+        if error_response:
+            return error_response
+
+        chat_session = await _get_or_create_gemini_session(request)
+
+        if _async_requested(data):
+            return await _enqueue_turn(chat_session, 'gemini', user_message)
+
+        return JsonResponse(await run_gemini_turn(chat_session, user_message))
+
+    except LLMOverloadedError as e:
+        return _overloaded_response(e)
+    except Exception as e:
+        logger.exception("Error en Gemini Chat")
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+
+
+def _async_requested(data):
+    """Modo asíncrono: "async" en el body o, si no viene, CHAT_ASYNC_JOBS."""
+    flag = data.get('async') if isinstance(data, dict) else None
+    return settings.CHAT_ASYNC_JOBS if flag is None else bool(flag)
+
+
+async def _enqueue_turn(chat_session, kind, user_message):
+    """Encola el turno para chat_worker y responde 202 con el job_id."""
+    job = await aenqueue(chat_session, kind, user_message)
+    return JsonResponse({
+        'job_id': str(job.job_id),
+        'status': job.status,
+        'session_id': str(chat_session.session_id),
+        'poll_url': reverse('chat:job_status', args=[job.job_id]),
+    }, status=202)
+
+
+@require_GET
+async def job_status(request, job_id):
+    """
+    Estado/resultado de un turno encolado (long-polling).
+
+    GET /chat/jobs/<job_id>/?wait=20
+
+    Espera hasta `wait` segundos (máx. CHAT_JOB_MAX_WAIT) a que el trabajo
+    termine. Response: {"status": "pending|running|done|failed", ...}; con
+    "done" incluye el mismo payload que la respuesta síncrona.
+    """
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        return JsonResponse({'error': 'wait inválido'}, status=400)
+    wait = max(0.0, min(wait, settings.CHAT_JOB_MAX_WAIT))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    interval = 0.1
+    while True:
         try:
-            data = json.loads(request.body)
-            user_message = data.get('message', '').strip()
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'JSON inválido'}, status=400)
-
-        if not user_message:
-            return JsonResponse({'error': 'Mensaje vacío'}, status=400)
-
-        # Recuperar ID de sesión de la cookie (o crear nueva)
-        session_id_str = request.session.get('chat_session_id')
-        chat_session = None
-
-        if session_id_str:
-            try:
-                chat_session = ChatSession.objects.get(session_id=session_id_str)
-            except ChatSession.DoesNotExist:
-                pass
-        
-        if not chat_session:
-            chat_session = ChatSession.objects.create()
-            request.session['chat_session_id'] = str(chat_session.session_id)
+            job = await ChatJob.objects.only('job_id', 'status', 'result', 'error').aget(job_id=job_id)
+        except ChatJob.DoesNotExist:
+            return JsonResponse({'error': 'Trabajo no encontrado'}, status=404)
+        remaining = deadline - loop.time()
+        if job.status in ('done', 'failed') or remaining <= 0:
+            return JsonResponse(job_payload(job))
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, 1.0)
 
-        # 3. Configurar Personalidad (System Prompt con Contexto Dinámico)
-        # ID de sesión para referencia
-        current_id = str(chat_session.session_id)
-        
-        # Lógica de Handoff (WhatsApp)
-        wa_number = "56972420708"
-        wa_text = f"Hola, vengo del chat web (Ref: {current_id}). Quiero hablar con un humano."
-        wa_link = f"https://wa.me/{wa_number}?text={wa_text.replace(' ', '%20')}"
-
-        CONTEXTO_BESTIA = (
-            f"Tu ID de sesión es: {current_id}. "
-            "Eres el Consultor Técnico Senior de 'bestIA', ingeniería y desarrollo de software en Puerto Montt, Chile. "
-            "Tu Identidad: Profesional técnico, sobrio, experto. No usas saludos robóticos. "
-            "Base de Conocimiento: "
-            "1. Ubicación: Puerto Montt, Región de Los Lagos. "
-            "2. Servicios: Desarrollo a Medida (SaaS, Web Apps), Automatización IA, Consultoría de Arquitectura de Software. "
-            "3. Cursos: 'IAlfabetización' (programa práctico de IA para empresas/ejecutivos, no para programadores). "
-            "Reglas de Comportamiento: "
-            "1. NO uses listas con viñetas (bullets) salvo que sea IMPRESCINDIBLE. Prefiere párrafos cortos y fluidos. "
-            "2. Concisión Extrema: Máximo 3 oraciones por idea principal. Ve al grano. "
-            "3. Tono: Conversacional de negocios. Evita 'Espero haberte ayudado'. "
-            "4. SMART HANDOFF: Cuando detectes que el usuario quiere contactar a un humano o contratar, genera un enlace de WhatsApp. "
-            f"El formato del enlace DEBE ser: {wa_link} "
-            "Aclara siempre: 'Te paso con un ingeniero humano. Haz clic aquí para abrir WhatsApp con tu referencia de caso'."
-        )
-
-        # 4. Inicializar Modelo
-        model_name = "gemini-flash-latest"
+
+async def _resume_stream(first_event, events):
+    """Re-emite el evento ya consumido y luego el resto; cierra el stream (y su cupo) al terminar."""
+    try:
+        yield first_event
+        async for event in events:
+            yield event
+    finally:
+        await events.aclose()
+
+
+def _sse_event(event, payload):
+    """Serializa un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@require_POST
+@csrf_exempt
+@chat_rate_limit
+async def chat_with_gemini_stream(request):
+    """
+    Variante streaming de /chat/api/ (Server-Sent Events).
+
+    POST /chat/api/stream/
+    Body: {"message": "..."}
+
+    Eventos:
+        chunk -> {"text": "..."}  (fragmento parcial de la respuesta)
+        done  -> {"status": "success", "model": "...", "session_id": "..."}
+        error -> {"error": "...", "status": "error"}
+
+    Todo lo que puede fallar antes del primer fragmento (memoria, cupo del
+    LLM, proveedores) se resuelve antes de responder: esos errores son
+    JSON con su status real (503 + Retry-After si el LLM está saturado,
+    500 si no), igual que /chat/api/. El evento error queda para fallas a
+    mitad del stream.
+
+    El turno completo se guarda como filas ChatMessage al terminar el stream.
+    """
+    if not gemini_registry.configure():
+        return JsonResponse({'error': 'API Key no configurada'}, status=500)
+
+    user_message, _, error_response = _parse_chat_message(request)
+    if error_response:
+        return error_response
+
+    # La sesión se resuelve antes de abrir el stream: la cookie debe
+    # viajar en los headers de la respuesta.
+    chat_session = await _get_or_create_gemini_session(request)
+    current_id = str(chat_session.session_id)
+    # El stream se consume después de que el middleware de métricas terminó
+    view_name = request.resolver_match.view_name
+
+    async def event_stream():
+        turn_started = time.perf_counter()
+        # Hasta el primer evento, los errores los responde la vista con su status
+        streaming = False
         try:
-            model = genai.GenerativeModel(
-                model_name=model_name,
-                system_instruction=CONTEXTO_BESTIA
-            )
-        except Exception as e:
-            print(f"Error initializing model {model_name}: {e}")
-            model_name = "gemini-pro"
-            model = genai.GenerativeModel(
-                model_name=model_name,
-                system_instruction=CONTEXTO_BESTIA
-            )
-
-        # 5. Gestión de Memoria (DB Persistence)
-        # Recuperar historial de la BD
-        raw_history = chat_session.history if chat_session.history else []
-        
-        # Validar formato (lista de dicts con 'role' y 'parts')
-        validated_history = []
-        if isinstance(raw_history, list):
-            for msg in raw_history:
-                if isinstance(msg, dict) and 'role' in msg and 'parts' in msg:
-                    validated_history.append(msg)
-        
-        # Iniciar chat con historial
-        chat = model.start_chat(history=validated_history)
+            recent_history, needs_compaction = await aload_recent_history(chat_session)
 
-        # 6. Generar Respuesta
-        response = chat.send_message(user_message)
-        
-        # 7. Actualizar y Guardar Historial en BD
-        new_history = validated_history + [
-            {'role': 'user', 'parts': [user_message]},
-            {'role': 'model', 'parts': [response.text]}
-        ]
-        
-        chat_session.history = new_history
-        chat_session.total_messages += 2
-        chat_session.save()
-        
-        return JsonResponse({
-            "response": response.text,
-            "status": "success",
-            "model": model_name,
-            "session_id": current_id
-        })
+            cache_key = None
+            response_text = None
+            if not recent_history and not chat_session.summary:
+                cache_key = gemini_cache_key(user_message, current_id)
+                response_text, model_name = cached_gemini_response(cache_key, current_id)
 
+            cache_hit = response_text is not None
+            if cache_hit:
+                streaming = True
+                yield _sse_event('chunk', {'text': response_text})
+                metadata = turn_metadata(model_name, True, turn_ms=elapsed_ms(turn_started))
+            else:
+                # Failover, deadline, hedging y circuit breaker en el
+                # proveedor compartido; el deadline aplica también entre fragmentos
+                messages = gemini_messages(chat_session, recent_history, user_message)
+                parts = []
+                tokens = None
+                ttft_ms = None
+                llm_started = time.perf_counter()
+                with llm_phase(view_name):
+                    async for chunk in get_gemini_provider().astream(messages):
+                        model_name = chunk.model
+                        if chunk.tokens_used:
+                            tokens = chunk.tokens_used
+                        if chunk.text:
+                            if ttft_ms is None:
+                                ttft_ms = elapsed_ms(llm_started)
+                            parts.append(chunk.text)
+                            streaming = True
+                            yield _sse_event('chunk', {'text': chunk.text})
+                latency_ms = elapsed_ms(llm_started)
+                response_text = ''.join(parts)
+                metadata = turn_metadata(
+                    model_name, False, tokens=tokens,
+                    latency_ms=latency_ms, ttft_ms=ttft_ms, turn_ms=elapsed_ms(turn_started)
+                )
+                if cache_key:
+                    cache_gemini_response(cache_key, response_text, model_name, current_id)
+
+            await save_gemini_turn(chat_session, user_message, response_text, metadata)
+            if needs_compaction:
+                schedule_compaction(chat_session.pk)
+
+            streaming = True
+            yield _sse_event('done', {
+                'status': 'success',
+                'model': model_name,
+                'session_id': current_id,
+            })
+        except Exception as e:
+            if not streaming:
+                raise
+            logger.exception("Error en Gemini Chat (stream)")
+            yield _sse_event('error', {'error': str(e), 'status': 'error'})
+
+    # El primer evento se espera aquí: toma el cupo del LLM (GatedLLMProvider)
+    # y pasa por failover/circuit breaker antes de elegir el status
+    events = event_stream()
+    try:
+        first_event = await anext(events)
+    except LLMOverloadedError as e:
+        return _overloaded_response(e)
     except Exception as e:
-        print(f"Error en Gemini Chat: {e}")
+        logger.exception("Error en Gemini Chat (stream)")
         return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+
+    response = StreamingHttpResponse(_resume_stream(first_event, events), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Evita buffering en proxies (nginx/Railway)
+    return response
@@ -0,0 +1,67 @@
+"""
+Core - Registro de consultas críticas ("hot queries")
+
+Cada app declara en su módulo hot_queries.py las consultas que más se
+ejecutan (changelists del admin, historial del chat, etc.):
+
+    from apps.core.hot_queries import register
+
+    @register('leads.admin_by_status')
+    def leads_by_status():
+        return Lead.objects.filter(status='new').order_by('-created_at')[:100]
+
+`manage.py explain_hot_queries` ejecuta EXPLAIN sobre todas y marca los
+escaneos secuenciales, para detectar índices faltantes antes de que las
+tablas crezcan.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from django.utils.module_loading import autodiscover_modules
+
+_registry: Dict[str, Callable] = {}
+
+# SQLite: "SCAN tabla" sin índice. Postgres: "Seq Scan on tabla".
+_SQLITE_SCAN_RE = re.compile(r"\bSCAN (?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX)(?!\w)")
+_POSTGRES_SCAN_RE = re.compile(r"Seq Scan on (\w+)")
+# Ordenamiento fuera de índice (ORDER BY sin índice que lo cubra)
+_SQLITE_SORT_RE = re.compile(r"USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY")
+_POSTGRES_SORT_RE = re.compile(r"^\s*(?:->\s*)?(?:Incremental )?Sort\b", re.MULTILINE)
+
+
+def register(name: str):
+    """Decorador: registra una función que retorna el QuerySet a auditar."""
+    def decorator(func: Callable) -> Callable:
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def autodiscover() -> Dict[str, Callable]:
+    """Importa hot_queries.py de cada app instalada y retorna el registro."""
+    autodiscover_modules('hot_queries')
+    return dict(sorted(_registry.items()))
+
+
+@dataclass
+class PlanReport:
+    name: str
+    plan: str
+    sequential_scans: List[str] = field(default_factory=list)
+    sorts_without_index: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.sequential_scans and not self.sorts_without_index
+
+
+def analyze_plan(name: str, plan: str, vendor: str) -> PlanReport:
+    """Busca escaneos secuenciales y ordenamientos en memoria en un plan."""
+    if vendor == 'postgresql':
+        scans = _POSTGRES_SCAN_RE.findall(plan)
+        sorts = bool(_POSTGRES_SORT_RE.search(plan))
+    else:
+        scans = _SQLITE_SCAN_RE.findall(plan)
+        sorts = bool(_SQLITE_SORT_RE.search(plan))
+    return PlanReport(name=name, plan=plan, sequential_scans=scans, sorts_without_index=sorts)
@@ -0,0 +1,137 @@
+"""
+Core - Variantes responsivas de imágenes (AVIF/WebP)
+
+build_variants() recorre las imágenes de static/img (PNG/JPEG) y genera
+variantes AVIF y WebP a varios anchos en static/img/responsive/, más un
+manifest.json con las dimensiones de cada original y sus variantes:
+
+- el nombre de cada variante lleva el hash del original y de la calidad
+  (logo-bestia.3f9a1c2b7d.320.webp): si ya existe no se vuelve a generar,
+  así el build es incremental; las que nadie referencia se borran
+- nunca se agranda: anchos de RESPONSIVE_IMAGE_WIDTHS menores al original
+  más el original (acotado al mayor de la lista)
+
+collectstatic (apps/core/management/commands/collectstatic.py) lo ejecuta
+antes de copiar: las variantes pasan por CompressedManifestStaticFilesStorage
+como cualquier estático. En templates: {% responsive_image %} (templatetags/assets.py).
+
+Pillow solo se necesita para generar (en el build), no para servir.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+SOURCE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+
+# (mtime, contenido) del manifest; se relee solo si cambió el archivo
+_manifest_cache = (None, {})
+
+
+def output_dir() -> Path:
+    return Path(settings.RESPONSIVE_IMAGE_SOURCE_DIR) / 'responsive'
+
+
+def static_path(name: str) -> str:
+    """Ruta estática ('img/...') de un archivo de RESPONSIVE_IMAGE_SOURCE_DIR."""
+    return f"{settings.RESPONSIVE_IMAGE_STATIC_PREFIX}{name}"
+
+
+def target_widths(width: int) -> List[int]:
+    widths = settings.RESPONSIVE_IMAGE_WIDTHS
+    return sorted({w for w in widths if w < width} | {min(width, max(widths))})
+
+
+def _digest(data: bytes, image_format: str, quality: int) -> str:
+    return hashlib.sha256(data + f"{image_format}:{quality}".encode()).hexdigest()[:10]
+
+
+def build_variants(force: bool = False) -> Dict[str, int]:
+    """Genera las variantes que falten y el manifest. Retorna contadores."""
+    from PIL import Image, features
+
+    formats = dict(settings.RESPONSIVE_IMAGE_FORMATS)
+    for image_format in list(formats):
+        if not features.check(image_format):
+            logger.warning("Pillow sin soporte para %s: se omiten esas variantes", image_format)
+            del formats[image_format]
+
+    source_dir = Path(settings.RESPONSIVE_IMAGE_SOURCE_DIR)
+    target = output_dir()
+    target.mkdir(parents=True, exist_ok=True)
+    stats = {'images': 0, 'generated': 0, 'reused': 0, 'removed': 0}
+    manifest, keep = {}, {MANIFEST_NAME}
+
+    for source in sorted(source_dir.iterdir()):
+        if not source.is_file() or source.suffix.lower() not in SOURCE_SUFFIXES:
+            continue
+        data = source.read_bytes()
+        with Image.open(source) as image:
+            width, height = image.size
+            entry = {'width': width, 'height': height, 'sources': {}}
+            for image_format, quality in formats.items():
+                digest = _digest(data, image_format, quality)
+                variants = []
+                for variant_width in target_widths(width):
+                    variant_height = round(height * variant_width / width)
+                    name = f"{source.stem}.{digest}.{variant_width}.{image_format}"
+                    keep.add(name)
+                    path = target / name
+                    if path.exists() and not force:
+                        stats['reused'] += 1
+                    else:
+                        _save_variant(image, path, (variant_width, variant_height), image_format, quality)
+                        stats['generated'] += 1
+                    variants.append({
+                        'width': variant_width,
+                        'height': variant_height,
+                        'path': static_path(f"responsive/{name}"),
+                    })
+                entry['sources'][image_format] = variants
+        manifest[static_path(source.name)] = entry
+        stats['images'] += 1
+
+    for path in target.iterdir():
+        if path.name not in keep:
+            path.unlink()
+            stats['removed'] += 1
+
+    (target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    return stats
+
+
+def _save_variant(image, path: Path, size, image_format: str, quality: int) -> None:
+    from PIL import Image
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+    resized = image.resize(size, Image.LANCZOS) if size != image.size else image
+    partial = path.with_name(f".{path.name}.part")
+    resized.save(partial, format=image_format.upper(), quality=quality)
+    os.replace(partial, path)
+
+
+def load_manifest() -> Dict:
+    """Manifest de variantes ({} si no se generó)."""
+    global _manifest_cache
+    path = output_dir() / MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    if _manifest_cache[0] != mtime:
+        _manifest_cache = (mtime, json.loads(path.read_text(encoding='utf-8')))
+    return _manifest_cache[1]
+
+
+def variants_for(path: str) -> Optional[Dict]:
+    """{'width', 'height', 'sources': {formato: [variantes]}} de 'img/...' o None."""
+    return load_manifest().get(path)
@@ -0,0 +1,30 @@
+"""
+Genera las variantes AVIF/WebP de static/img (sin collectstatic).
+
+collectstatic ya lo hace en el build; este comando sirve en desarrollo
+(DEBUG sirve static/img/responsive/ directamente) o para regenerar todo.
+
+Uso:
+    python manage.py build_images
+    python manage.py build_images --force     # ignora las variantes existentes
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.images import build_variants, output_dir
+
+
+class Command(BaseCommand):
+    help = 'Genera variantes responsivas (AVIF/WebP, varios anchos) de static/img.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenera todas las variantes aunque ya existan.'
+        )
+
+    def handle(self, *args, **options):
+        stats = build_variants(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['images']} imagen(es) en {output_dir()}: {stats['generated']} variantes "
+            f"generadas, {stats['reused']} reutilizadas, {stats['removed']} eliminadas."
+        ))
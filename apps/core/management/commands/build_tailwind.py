@@ -0,0 +1,164 @@
+"""
+Genera static/css/tailwind.css con el CLI standalone de Tailwind (v3).
+
+Reemplaza al compilador en el navegador (cdn.tailwindcss.com): el CLI
+escanea templates/**/*.html y static/js/*.js, deja solo las clases usadas
+y minifica. La configuración es la misma del bloque `tailwind.config = {...}`
+de templates/base.html (fuente única, la usa también el fallback del CDN),
+con los plugins forms y container-queries que carga el CDN.
+
+base.html enlaza el CSS con {% tailwind_stylesheet %} a través de
+{% static %}: collectstatic (CompressedManifestStaticFilesStorage) le pone
+hash y lo comprime. Si el archivo no existe se sigue usando el CDN.
+
+Se ejecuta en el build (nixpacks.toml), antes de collectstatic. El CLI se
+toma de TAILWIND_CLI, del PATH (tailwindcss) o se descarga de GitHub a
+var/tailwind/. La descarga se verifica contra el sha256 fijado en
+TAILWIND_SHA256: sin hash para la plataforma, o si no coincide, falla.
+
+Uso:
+    python manage.py build_tailwind
+    python manage.py build_tailwind --cli /usr/local/bin/tailwindcss
+"""
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.templatetags.assets import TAILWIND_CSS
+
+RELEASES_URL = 'https://github.com/tailwindlabs/tailwindcss/releases/download'
+
+# Objeto literal asignado a tailwind.config en base.html
+CONFIG_RE = re.compile(r'tailwind\.config\s*=\s*(\{.*?\})\s*;?\s*</script>', re.DOTALL)
+
+CONFIG_TEMPLATE = """\
+// Generado por manage.py build_tailwind desde templates/base.html
+const config = {config};
+
+module.exports = {{
+    ...config,
+    content: {content},
+    plugins: [require('@tailwindcss/forms'), require('@tailwindcss/container-queries')],
+}};
+"""
+
+INPUT_CSS = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+
+
+def extract_config(template: Path) -> str:
+    """Texto del objeto tailwind.config de la plantilla (JavaScript tal cual)."""
+    match = CONFIG_RE.search(template.read_text(encoding='utf-8'))
+    if not match:
+        raise CommandError(f"No se encontró `tailwind.config = {{...}}` en {template}")
+    return match.group(1)
+
+
+def release_asset() -> str:
+    """Nombre del binario standalone para esta plataforma."""
+    system = {'Linux': 'linux', 'Darwin': 'macos', 'Windows': 'windows'}.get(platform.system())
+    machine = {'x86_64': 'x64', 'amd64': 'x64', 'arm64': 'arm64', 'aarch64': 'arm64'}.get(
+        platform.machine().lower()
+    )
+    if not system or not machine:
+        raise CommandError(
+            f"Plataforma sin CLI standalone: {platform.system()} {platform.machine()} (usar --cli)"
+        )
+    return f"tailwindcss-{system}-{machine}" + ('.exe' if system == 'windows' else '')
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Compila el CSS de Tailwind (purgado y minificado) en static/css/ con el CLI standalone.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cli', default=None,
+            help='Ruta al CLI de Tailwind (default: TAILWIND_CLI, tailwindcss del PATH o descarga).'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help=f'Archivo de salida (default: static/{TAILWIND_CSS}).'
+        )
+
+    def handle(self, *args, **options):
+        base_dir = Path(settings.BASE_DIR)
+        output = Path(options['output'] or base_dir / 'static' / TAILWIND_CSS)
+        config = extract_config(base_dir / 'templates' / 'base.html')
+        content = [
+            str(base_dir / 'templates' / '**' / '*.html'),
+            str(base_dir / 'apps' / '**' / 'templates' / '**' / '*.html'),
+            str(base_dir / 'static' / 'js' / '*.js'),
+        ]
+        cli = self.find_cli(options['cli'])
+
+        with tempfile.TemporaryDirectory(prefix='tailwind-') as workdir:
+            config_path = Path(workdir) / 'tailwind.config.js'
+            input_path = Path(workdir) / 'input.css'
+            config_path.write_text(
+                CONFIG_TEMPLATE.format(config=config, content=json.dumps(content)),
+                encoding='utf-8'
+            )
+            input_path.write_text(INPUT_CSS, encoding='utf-8')
+            output.parent.mkdir(parents=True, exist_ok=True)
+            result = subprocess.run(
+                [str(cli), '-c', str(config_path), '-i', str(input_path), '-o', str(output), '--minify'],
+                cwd=base_dir, capture_output=True, text=True
+            )
+        if result.returncode != 0:
+            raise CommandError(f"Tailwind falló:\n{result.stderr.strip()}")
+
+        self.stdout.write(self.style.SUCCESS(f"{output} ({output.stat().st_size / 1024:.1f} KB)."))
+
+    def find_cli(self, cli=None) -> Path:
+        cli = cli or settings.TAILWIND_CLI or shutil.which('tailwindcss')
+        if cli:
+            if not Path(cli).is_file():
+                raise CommandError(f"No existe el CLI de Tailwind: {cli}")
+            return Path(cli)
+
+        version = settings.TAILWIND_VERSION
+        asset = release_asset()
+        target = Path(settings.BASE_DIR) / 'var' / 'tailwind' / f"{version}-{asset}"
+        if not target.exists():
+            expected = settings.TAILWIND_SHA256.get(asset, '').strip().lower()
+            if not expected:
+                raise CommandError(
+                    f"Sin sha256 fijado para {asset} {version}: definir TAILWIND_SHA256 "
+                    f"(sha256sums.txt del release) o usar TAILWIND_CLI / --cli"
+                )
+            url = f"{RELEASES_URL}/{version}/{asset}"
+            self.stdout.write(f"Descargando {url}...")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(target.name + '.part')
+            try:
+                with urllib.request.urlopen(url, timeout=120) as response, open(partial, 'wb') as f:
+                    shutil.copyfileobj(response, f)
+            except OSError as e:
+                partial.unlink(missing_ok=True)
+                raise CommandError(f"No se pudo descargar el CLI de Tailwind: {e}")
+            digest = file_sha256(partial)
+            if digest != expected:
+                partial.unlink()
+                raise CommandError(
+                    f"sha256 del CLI de Tailwind no coincide ({asset}): {digest}, se esperaba {expected}"
+                )
+            partial.chmod(0o755)
+            os.replace(partial, target)
+        return target
@@ -0,0 +1,35 @@
+"""
+collectstatic + variantes responsivas de static/img (apps.core.images).
+
+Genera primero las variantes AVIF/WebP que falten (incremental, por hash
+del original) y después copia todo como el collectstatic de Django, de
+modo que las variantes también reciben hash y compresión.
+
+Uso:
+    python manage.py collectstatic --noinput
+    python manage.py collectstatic --noinput --skip-images
+"""
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+
+from apps.core.images import build_variants
+
+
+class Command(CollectStaticCommand):
+    help = CollectStaticCommand.help + ' Antes genera las variantes AVIF/WebP de static/img.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--skip-images', action='store_true',
+            help='No genera las variantes responsivas de static/img.'
+        )
+
+    def handle(self, **options):
+        if not options['skip_images']:
+            stats = build_variants()
+            if options['verbosity'] >= 1:
+                self.stdout.write(
+                    f"Imágenes: {stats['images']} originales, {stats['generated']} variantes "
+                    f"generadas, {stats['reused']} reutilizadas, {stats['removed']} eliminadas."
+                )
+        return super().handle(**options)
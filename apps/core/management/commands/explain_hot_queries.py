@@ -0,0 +1,88 @@
+"""
+Audita los planes de ejecución de las consultas críticas.
+
+Ejecuta EXPLAIN sobre cada consulta registrada en los módulos
+hot_queries.py de las apps y marca escaneos secuenciales y ordenamientos
+sin índice. Soporta SQLite y PostgreSQL.
+
+Uso:
+    python manage.py explain_hot_queries
+    python manage.py explain_hot_queries --show-plans
+    python manage.py explain_hot_queries --strict        # falla si hay problemas (CI)
+    python manage.py explain_hot_queries --force-index   # Postgres con tablas pequeñas
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from apps.core.hot_queries import analyze_plan, autodiscover
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas críticas y marca escaneos secuenciales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Alias de base de datos (default: "default").'
+        )
+        parser.add_argument(
+            'names', nargs='*',
+            help='Consultas a auditar (default: todas).'
+        )
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help='Imprime el plan completo de cada consulta.'
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Termina con error si alguna consulta no usa índices.'
+        )
+        parser.add_argument(
+            '--force-index', action='store_true',
+            help='Postgres: desactiva seq scans (enable_seqscan=off) para verificar que '
+                 'existe un índice utilizable aunque la tabla sea pequeña.'
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        vendor = connections[alias].vendor
+        if vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f"Motor no soportado: {vendor} (solo sqlite y postgresql).")
+
+        queries = autodiscover()
+        if options['names']:
+            unknown = set(options['names']) - set(queries)
+            if unknown:
+                raise CommandError(f"Consultas no registradas: {', '.join(sorted(unknown))}")
+            queries = {name: queries[name] for name in options['names']}
+
+        problems = 0
+        for name, build_query in queries.items():
+            plan = self._explain(build_query().using(alias), alias, vendor, options['force_index'])
+            report = analyze_plan(name, plan, vendor)
+
+            if report.ok:
+                self.stdout.write(self.style.SUCCESS(f"OK    {name}"))
+            else:
+                problems += 1
+                issues = [f"seq scan en {table}" for table in report.sequential_scans]
+                if report.sorts_without_index:
+                    issues.append('ORDER BY sin índice')
+                self.stdout.write(self.style.WARNING(f"WARN  {name}: {'; '.join(issues)}"))
+
+            if options['show_plans'] or not report.ok:
+                for line in plan.splitlines():
+                    self.stdout.write(f"        {line}")
+
+        summary = f"{len(queries)} consultas auditadas en {vendor}, {problems} con problemas."
+        if problems and options['strict']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def _explain(self, queryset, alias, vendor, force_index):
+        if vendor == 'postgresql' and force_index:
+            with transaction.atomic(using=alias):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                return queryset.explain()
+        return queryset.explain()
@@ -0,0 +1,83 @@
+"""
+Pre-renderiza las páginas estáticas a HTML para que las sirva WhiteNoise.
+
+Renderiza cada URL con su vista (mismo camino que el caché de páginas: sin
+request ni token CSRF) y escribe index.html, index.html.gz e
+index.html.br (si está instalado brotli) en PRERENDER_ROOT, que es el
+WHITENOISE_ROOT: esas URLs ya no entran al stack de vistas de Django. El
+token CSRF y los mensajes los hidrata base.html desde core:state.
+
+Se ejecuta en el build (nixpacks.toml), después de collectstatic: los
+templates usan las URLs con hash del manifest.
+
+Uso:
+    python manage.py prerender                      # PRERENDER_PAGES
+    python manage.py prerender core:home core:privacy
+"""
+import gzip
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.urls import NoReverseMatch, resolve, reverse
+
+try:
+    import brotli
+except ImportError:  # sin variantes .br (whitenoise[brotli] lo instala)
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = 'Renderiza las páginas estáticas (PRERENDER_PAGES) a HTML comprimido para WhiteNoise.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pages', nargs='*',
+            help='Nombres de URL a renderizar (default: PRERENDER_PAGES).'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='Directorio de salida (default: PRERENDER_ROOT).'
+        )
+
+    def handle(self, *args, **options):
+        output = Path(options['output'] or settings.PRERENDER_ROOT)
+        pages = options['pages'] or settings.PRERENDER_PAGES
+
+        rendered = {name: self.render(name) for name in pages}
+
+        # Se reemplaza el directorio completo: no quedan páginas de un build anterior
+        shutil.rmtree(output, ignore_errors=True)
+        for name, (path, content) in rendered.items():
+            target = output / path.strip('/') / 'index.html'
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            target.with_name('index.html.gz').write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                target.with_name('index.html.br').write_bytes(brotli.compress(content))
+            self.stdout.write(f"  {name:<20} {path:<16} {len(content) / 1024:.1f} KB")
+
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("brotli no está instalado: solo variantes .gz."))
+        self.stdout.write(self.style.SUCCESS(f"{len(rendered)} página(s) en {output}."))
+
+    def render(self, name):
+        try:
+            path = reverse(name)
+        except NoReverseMatch:
+            raise CommandError(f"URL desconocida: {name}")
+
+        # Un request anónimo sin cookies siempre toma el camino del caché de
+        # páginas; PAGE_CACHE='default' evita escribir en el caché compartido
+        request = RequestFactory().get(path)
+        with override_settings(PAGE_CACHE_ENABLED=True, PAGE_CACHE='default'):
+            response = resolve(path).func(request)
+
+        if response.status_code != 200 or not response.has_header('ETag'):
+            raise CommandError(
+                f"{name} no se puede pre-renderizar: la vista debe responder con "
+                f"apps.core.pagecache.cached_page (status {response.status_code})."
+            )
+        return path, response.content
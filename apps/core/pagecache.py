@@ -0,0 +1,113 @@
+"""
+Core - Caché de páginas completas (home, nosotros, privacidad)
+
+Las páginas de marketing no dependen del request: se renderizan una vez,
+sin request, y el HTML queda en CACHES[PAGE_CACHE] ('shared', común a
+todos los workers) con una copia en la memoria del proceso.
+
+- La clave incluye release_version(): hash del manifest de estáticos y de
+  los templates, así cada deploy invalida las páginas sin borrar nada.
+- ETag fuerte (sha256 del HTML) y Last-Modified (momento del render): las
+  revalidaciones con If-None-Match / If-Modified-Since reciben 304.
+- El HTML no lleva token CSRF ({% csrf_token %} queda vacío): base.html
+  agrega el campo al enviar un formulario, desde la cookie csrftoken que
+  get_token() asegura en cada respuesta.
+- Usuarios autenticados y requests con mensajes pendientes (framework de
+  messages) se renderizan normal, sin caché.
+
+    from apps.core.pagecache import cached_page
+
+    def home(request):
+        return cached_page(request, 'pages/home.html', context)
+
+El contexto debe ser estático (no puede depender del request).
+"""
+import hashlib
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.autoreload import get_template_directories
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+@lru_cache(maxsize=1)
+def release_version() -> str:
+    """Hash del manifest de estáticos y de los templates (una vez por proceso)."""
+    digest = hashlib.sha256()
+    manifest = Path(settings.STATIC_ROOT) / 'staticfiles.json'
+    if manifest.exists():
+        digest.update(manifest.read_bytes())
+    for directory in sorted(get_template_directories()):
+        for path in sorted(directory.rglob('*')):
+            if path.is_file():
+                digest.update(str(path.relative_to(directory)).encode('utf-8'))
+                digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def is_cacheable(request: HttpRequest) -> bool:
+    """GET/HEAD de un visitante anónimo sin mensajes pendientes."""
+    if not settings.PAGE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES and CookieStorage.cookie_name not in request.COOKIES:
+        # Sin sesión ni cookie de mensajes no hay nada por qué variar
+        return True
+    if request.user.is_authenticated:
+        return False
+    # len() carga los mensajes sin marcarlos como leídos
+    return not len(messages.get_messages(request))
+
+
+def get_page(template_name: str, context: Optional[Dict] = None) -> Dict:
+    """{'content', 'etag', 'last_modified'} de la página; la renderiza si no está en caché."""
+    key = f"page:{release_version()}:{template_name}"
+    local = caches['default']
+    page = local.get(key)
+    if page is not None:
+        return page
+
+    shared = caches[settings.PAGE_CACHE]
+    page = shared.get(key)
+    if page is None:
+        # 'NOTPROVIDED': {% csrf_token %} no emite nada (ni advierte en DEBUG)
+        content = render_to_string(template_name, {**(context or {}), 'csrf_token': 'NOTPROVIDED'})
+        content = content.encode('utf-8')
+        page = {
+            'content': content,
+            'etag': f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+            'last_modified': int(time.time()),
+        }
+        shared.set(key, page, settings.PAGE_CACHE_TIMEOUT)
+    local.set(key, page, settings.PAGE_CACHE_TIMEOUT)
+    return page
+
+
+def cached_page(request: HttpRequest, template_name: str, context: Optional[Dict] = None) -> HttpResponse:
+    """Como render(), pero sirve el HTML desde el caché con ETag/Last-Modified."""
+    if not is_cacheable(request):
+        response = render(request, template_name, context)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    page = get_page(template_name, context)
+    get_token(request)  # cookie csrftoken para los formularios (ver base.html)
+    response = HttpResponse(page['content'])
+    response['ETag'] = page['etag']
+    response['Last-Modified'] = http_date(page['last_modified'])
+    # El navegador guarda la página pero revalida siempre (304 si no cambió)
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(
+        request, etag=page['etag'], last_modified=page['last_modified'], response=response
+    )
@@ -0,0 +1,178 @@
+"""
+Core - Rate limiting con token buckets
+
+Decorador para vistas (sync o async) que aplica uno o más token buckets
+antes de ejecutar la vista: si alguno está vacío responde 429 con
+Retry-After sin tocar la base de datos ni el LLM.
+
+    from apps.core.ratelimit import Rule, client_ip, rate_limit
+
+    @rate_limit(
+        Rule('chat-ip', '30/m', key=client_ip),
+        Rule('chat-global', '300/m'),          # sin key: bucket global
+    )
+    async def send_message(request): ...
+
+Los buckets viven en el caché CACHES[RATELIMIT_CACHE] ('shared'), común a
+todos los workers: Redis si hay REDIS_URL, o archivos en el host. El
+leer-modificar-escribir no es atómico; bajo concurrencia pueden pasar
+algunas solicitudes de más, suficiente para cortar abusos.
+"""
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest, JsonResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Estado de un bucket en el caché: (tokens disponibles, timestamp)
+BucketState = Tuple[float, float]
+
+
+@lru_cache(maxsize=64)
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """'30/m' -> (capacidad 30, 30 tokens cada 60 s = 0.5 tokens/s)."""
+    try:
+        count, period = rate.split('/')
+        capacity = int(count)
+        seconds = PERIODS[period.strip().lower()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Rate inválido: {rate!r} (formato 'N/s', 'N/m', 'N/h' o 'N/d')")
+    if capacity <= 0:
+        raise ValueError(f"Rate inválido: {rate!r} (N debe ser positivo)")
+    return capacity, capacity / seconds
+
+
+def client_ip(request: HttpRequest) -> Optional[str]:
+    """
+    IP del cliente. Detrás de N proxies confiables (RATELIMIT_PROXY_COUNT)
+    se toma la N-ésima entrada desde la derecha de X-Forwarded-For; las de
+    la izquierda las controla el cliente.
+    """
+    proxies = settings.RATELIMIT_PROXY_COUNT
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Un bucket: `scope` lo nombra, `key(request)` lo particiona (None = global)."""
+    scope: str
+    rate: str
+    key: Optional[Callable[[HttpRequest], Optional[str]]] = None
+
+    def cache_key(self, request: HttpRequest) -> Optional[str]:
+        """Clave del bucket para este request (None: la regla no aplica)."""
+        if self.key is None:
+            return f"rl:{self.scope}"
+        value = self.key(request)
+        if not value:
+            return None
+        digest = hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:20]
+        return f"rl:{self.scope}:{digest}"
+
+
+class TokenBucketLimiter:
+    """Token buckets sobre el framework de caché de Django."""
+
+    def __init__(self, cache_alias: Optional[str] = None):
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias or settings.RATELIMIT_CACHE]
+
+    def _buckets(self, rules, request) -> Dict[str, Tuple[int, float]]:
+        buckets = {}
+        for rule in rules:
+            key = rule.cache_key(request)
+            if key:
+                buckets[key] = parse_rate(rule.rate)
+        return buckets
+
+    def _consume(self, buckets, states, now) -> Tuple[float, Dict[str, BucketState]]:
+        """
+        Retorna (retry_after, nuevos estados). Solo se consume si todos los
+        buckets tienen un token: un rechazo no vacía los demás.
+        """
+        updates = {}
+        retry_after = 0.0
+        for key, (capacity, refill) in buckets.items():
+            tokens, updated = states.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / refill)
+            updates[key] = (tokens - 1, now)
+        return retry_after, updates
+
+    def _timeout(self, buckets) -> int:
+        # Un bucket lleno equivale a no tener entrada: expira al rellenarse
+        return max(math.ceil(capacity / refill) for capacity, refill in buckets.values()) + 1
+
+    def hit(self, rules: List[Rule], request: HttpRequest) -> float:
+        """Consume un token de cada bucket. Retorna 0 o los segundos a esperar."""
+        buckets = self._buckets(rules, request)
+        if not buckets:
+            return 0.0
+        states = self.cache.get_many(list(buckets))
+        retry_after, updates = self._consume(buckets, states, time.time())
+        if not retry_after:
+            self.cache.set_many(updates, timeout=self._timeout(buckets))
+        return retry_after
+
+    async def ahit(self, rules: List[Rule], request: HttpRequest) -> float:
+        buckets = self._buckets(rules, request)
+        if not buckets:
+            return 0.0
+        states = await self.cache.aget_many(list(buckets))
+        retry_after, updates = self._consume(buckets, states, time.time())
+        if not retry_after:
+            await self.cache.aset_many(updates, timeout=self._timeout(buckets))
+        return retry_after
+
+
+def too_many_requests(retry_after: float) -> JsonResponse:
+    seconds = max(1, math.ceil(retry_after))
+    response = JsonResponse(
+        {'error': 'Demasiadas solicitudes, intenta de nuevo más tarde', 'retry_after': seconds},
+        status=429
+    )
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def rate_limit(*rules: Rule, cache_alias: Optional[str] = None):
+    """Decorador: aplica los token buckets antes de la vista (RATELIMIT_ENABLED)."""
+    limiter = TokenBucketLimiter(cache_alias)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if settings.RATELIMIT_ENABLED:
+                    retry_after = await limiter.ahit(rules, request)
+                    if retry_after:
+                        return too_many_requests(retry_after)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED:
+                retry_after = limiter.hit(rules, request)
+                if retry_after:
+                    return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
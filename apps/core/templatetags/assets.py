@@ -0,0 +1,89 @@
+"""
+Core - Template tags de assets
+
+    {% load assets %}
+    {% tailwind_stylesheet as tailwind_css %}
+    {% if tailwind_css %}<link rel="stylesheet" href="{{ tailwind_css }}">{% else %}...CDN...{% endif %}
+
+    {% responsive_image 'img/logo-bestia.png' alt='bestIA' sizes='160px' class='h-10 w-auto' %}
+    {% responsive_images_json %}   {# mismas variantes para el JS (project-cards.js) #}
+"""
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join, json_script
+
+from apps.core.images import MIME_TYPES, load_manifest, variants_for
+
+register = template.Library()
+
+# Salida de manage.py build_tailwind (relativa a static/)
+TAILWIND_CSS = 'css/tailwind.css'
+
+
+@lru_cache(maxsize=1)
+def _built_stylesheet() -> str:
+    try:
+        return static(TAILWIND_CSS)
+    except ValueError:  # no está en el manifest: no se compiló en el build
+        return ''
+
+
+@register.simple_tag
+def tailwind_stylesheet() -> str:
+    """URL (con hash) de static/css/tailwind.css, o '' si no se generó."""
+    if settings.DEBUG:
+        # Sin manifest: se busca en cada render para tomar un build nuevo
+        return static(TAILWIND_CSS) if finders.find(TAILWIND_CSS) else ''
+    return _built_stylesheet()
+
+
+def _srcset(variants) -> str:
+    return ', '.join(f"{static(variant['path'])} {variant['width']}w" for variant in variants)
+
+
+@register.simple_tag
+def responsive_image(path, alt='', sizes='100vw', **attrs):
+    """
+    <picture> con un <source> por formato (AVIF, WebP) y el original como
+    <img> de respaldo, con width/height intrínsecos (evita saltos de
+    layout). Sin variantes generadas emite solo el <img>.
+    """
+    image = variants_for(path)
+    img_attrs = {'src': static(path), 'alt': alt, 'decoding': 'async', **attrs}
+    if image is None:
+        return format_html('<img{}>', flatatt(img_attrs))
+
+    img_attrs.setdefault('width', image['width'])
+    img_attrs.setdefault('height', image['height'])
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[image_format], _srcset(variants), sizes)
+         for image_format, variants in image['sources'].items())
+    )
+    return format_html('<picture>{}<img{}></picture>', sources, flatatt(img_attrs))
+
+
+@register.simple_tag
+def responsive_images_json(element_id='responsive-images'):
+    """
+    <script type="application/json"> con las variantes de todas las
+    imágenes, por URL sin hash (/static/img/...): {url: {width, height,
+    sources: {mime: srcset}}}.
+    """
+    images = {
+        f"{settings.STATIC_URL}{path}": {
+            'width': image['width'],
+            'height': image['height'],
+            'sources': {
+                MIME_TYPES[image_format]: _srcset(variants)
+                for image_format, variants in image['sources'].items()
+            },
+        }
+        for path, image in load_manifest().items()
+    }
+    return json_script(images, element_id)
@@ -0,0 +1,55 @@
+"""
+build_tailwind: la descarga del CLI se verifica contra TAILWIND_SHA256.
+"""
+import hashlib
+import io
+
+import pytest
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from apps.core.management.commands import build_tailwind
+from apps.core.management.commands.build_tailwind import Command, release_asset
+
+BINARY = b'#!/bin/sh\necho tailwind\n'
+
+
+@pytest.fixture
+def download(monkeypatch, tmp_path):
+    """urlopen falso que sirve BINARY; retorna la lista de URLs pedidas."""
+    requested = []
+
+    def urlopen(url, timeout=None):
+        requested.append(url)
+        return io.BytesIO(BINARY)
+
+    monkeypatch.setattr(build_tailwind.urllib.request, 'urlopen', urlopen)
+    monkeypatch.setattr(build_tailwind.shutil, 'which', lambda name: None)
+    return requested
+
+
+def _find_cli(tmp_path, sha256):
+    with override_settings(BASE_DIR=tmp_path, TAILWIND_CLI='', TAILWIND_SHA256=sha256):
+        return Command().find_cli()
+
+
+def test_download_with_matching_sha256(download, tmp_path):
+    cli = _find_cli(tmp_path, {release_asset(): hashlib.sha256(BINARY).hexdigest()})
+    assert cli.read_bytes() == BINARY
+    assert download == [f"{build_tailwind.RELEASES_URL}/{settings.TAILWIND_VERSION}/{release_asset()}"]
+    # Ya descargado: no se vuelve a pedir
+    _find_cli(tmp_path, {release_asset(): hashlib.sha256(BINARY).hexdigest()})
+    assert len(download) == 1
+
+
+def test_download_with_wrong_sha256_is_rejected(download, tmp_path):
+    with pytest.raises(CommandError, match='no coincide'):
+        _find_cli(tmp_path, {release_asset(): '0' * 64})
+    assert not any((tmp_path / 'var' / 'tailwind').iterdir())
+
+
+def test_no_pinned_sha256_does_not_download(download, tmp_path):
+    with pytest.raises(CommandError, match='TAILWIND_SHA256'):
+        _find_cli(tmp_path, {})
+    assert download == []
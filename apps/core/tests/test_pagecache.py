@@ -0,0 +1,101 @@
+"""
+Caché de páginas: ETag/Last-Modified, 304 y requests que no usan el caché
+(sesión autenticada, mensajes pendientes).
+"""
+import pytest
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+
+# Sin collectstatic no hay manifest: {% static %} con el storage simple
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@pytest.fixture(autouse=True)
+def page_cache(db):
+    caches['default'].clear()
+    caches[settings.PAGE_CACHE].clear()
+    with override_settings(PAGE_CACHE_ENABLED=True, STORAGES=STORAGES):
+        yield
+
+
+def _messages_cookie(text='Mensaje enviado'):
+    """Valor de la cookie del framework de messages con un mensaje pendiente."""
+    storage = CookieStorage(RequestFactory().get('/'))
+    storage.add(messages.SUCCESS, text)
+    response = HttpResponse()
+    storage.update(response)
+    return response.cookies[CookieStorage.cookie_name].value
+
+
+def _is_cached(response):
+    return response.has_header('ETag')
+
+
+def test_anonymous_page_has_validators():
+    response = Client().get('/')
+    assert response.status_code == 200
+    assert _is_cached(response) and response.has_header('Last-Modified')
+    assert response['Cache-Control'] == 'no-cache'
+    assert response['Vary'] == 'Cookie'
+    # Los formularios toman el token de esta cookie (el HTML no lo lleva)
+    assert 'csrftoken' in response.cookies
+
+
+def test_render_is_shared_between_clients():
+    first, second = Client().get('/nosotros/'), Client().get('/nosotros/')
+    assert first['ETag'] == second['ETag']
+    assert first['Last-Modified'] == second['Last-Modified']
+    assert first.content == second.content
+
+
+def test_if_none_match_returns_304():
+    etag = Client().get('/')['ETag']
+    response = Client().get('/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert Client().get('/', HTTP_IF_NONE_MATCH='"otro"').status_code == 200
+
+
+def test_if_modified_since_returns_304():
+    last_modified = Client().get('/privacidad/')['Last-Modified']
+    assert Client().get('/privacidad/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+
+def test_anonymous_session_cookie_still_uses_cache():
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = 'sesion-anonima'
+    assert _is_cached(client.get('/'))
+
+
+def test_pending_messages_bypass_cache():
+    client = Client()
+    client.cookies[CookieStorage.cookie_name] = _messages_cookie()
+    response = client.get('/')
+    assert response.status_code == 200
+    assert not _is_cached(response)
+    assert response['Vary'] == 'Cookie'
+
+
+def test_authenticated_user_bypasses_cache():
+    user, _ = get_user_model().objects.get_or_create(username='pagecache')
+    client = Client()
+    client.force_login(user)
+    response = client.get('/')
+    assert response.status_code == 200
+    assert not _is_cached(response)
+    assert client.get('/', HTTP_IF_NONE_MATCH='*').status_code == 200
+
+
+def test_disabled_cache_renders_normally():
+    with override_settings(PAGE_CACHE_ENABLED=False):
+        response = Client().get('/')
+    assert response.status_code == 200
+    assert not _is_cached(response)
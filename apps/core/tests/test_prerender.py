@@ -0,0 +1,73 @@
+"""
+manage.py prerender: HTML y variantes comprimidas por URL, servidas por
+WhiteNoise desde WHITENOISE_ROOT.
+"""
+import gzip
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from apps.core.management.commands import prerender
+
+# Sin collectstatic no hay manifest: {% static %} con el storage simple
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@pytest.fixture
+def output(db, tmp_path):
+    caches['default'].clear()
+    output = tmp_path / 'prerendered'
+    with override_settings(STORAGES=STORAGES):
+        call_command('prerender', '--output', str(output), stdout=StringIO())
+    return output
+
+
+def test_writes_every_page_with_gzip(output):
+    for name in settings.PRERENDER_PAGES:
+        page = output / reverse(name).strip('/') / 'index.html'
+        html = page.read_bytes()
+        assert html.lstrip().lower().startswith(b'<!doctype html')
+        assert gzip.decompress(page.with_name('index.html.gz').read_bytes()) == html
+        assert page.with_name('index.html.br').exists() == (prerender.brotli is not None)
+
+
+def test_output_has_no_csrf_token(output):
+    html = (output / 'index.html').read_text(encoding='utf-8')
+    assert 'NOTPROVIDED' not in html
+    assert 'csrfmiddlewaretoken" value=' not in html
+
+
+def test_rerun_replaces_previous_build(output):
+    stale = output / 'pagina-antigua' / 'index.html'
+    stale.parent.mkdir()
+    stale.write_text('antigua')
+    with override_settings(STORAGES=STORAGES):
+        call_command('prerender', 'core:home', '--output', str(output), stdout=StringIO())
+    assert not stale.exists()
+    assert not any(path.is_dir() for path in output.iterdir())
+
+
+def test_unknown_page_fails(tmp_path):
+    with pytest.raises(CommandError, match='URL desconocida'):
+        call_command('prerender', 'core:inexistente', '--output', str(tmp_path), stdout=StringIO())
+
+
+def test_whitenoise_serves_prerendered_pages(output):
+    with override_settings(WHITENOISE_ROOT=output, WHITENOISE_INDEX_FILE=True):
+        client = Client()
+        response = client.get('/nosotros/')
+        compressed = client.get('/nosotros/', HTTP_ACCEPT_ENCODING='gzip')
+    html = (output / 'nosotros' / 'index.html').read_bytes()
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == html
+    assert compressed['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(b''.join(compressed.streaming_content)) == html
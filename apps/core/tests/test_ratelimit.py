@@ -0,0 +1,154 @@
+"""
+Rate limiting: parseo de rates, token buckets y decorador.
+"""
+import asyncio
+
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from apps.core import ratelimit
+from apps.core.ratelimit import Rule, TokenBucketLimiter, client_ip, parse_rate, rate_limit
+
+factory = RequestFactory()
+
+
+class FakeTime:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(ratelimit, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def limiter():
+    caches['default'].clear()
+    return TokenBucketLimiter('default')
+
+
+def _request(ip='10.0.0.1', **extra):
+    return factory.post('/', REMOTE_ADDR=ip, **extra)
+
+
+@pytest.mark.parametrize('rate, expected', [
+    ('30/m', (30, 0.5)),
+    ('10/s', (10, 10.0)),
+    ('3600/hour', (3600, 1.0)),
+    ('86400/d', (86400, 1.0)),
+])
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == expected
+
+
+@pytest.mark.parametrize('rate', ['30', '0/m', '-1/m', 'x/m', '10/w', '10/'])
+def test_parse_rate_invalid(rate):
+    with pytest.raises(ValueError):
+        parse_rate(rate)
+
+
+def test_bucket_allows_burst_then_blocks(limiter, clock):
+    rules = [Rule('test', '3/m')]
+    request = _request()
+    assert [limiter.hit(rules, request) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.hit(rules, request) == pytest.approx(20.0)
+
+
+def test_bucket_refills_over_time(limiter, clock):
+    rules = [Rule('test', '2/m')]
+    request = _request()
+    limiter.hit(rules, request)
+    limiter.hit(rules, request)
+    assert limiter.hit(rules, request) == pytest.approx(30.0)
+    clock.now += 30
+    assert limiter.hit(rules, request) == 0.0
+    assert limiter.hit(rules, request) == pytest.approx(30.0)
+
+
+def test_rejection_does_not_drain_other_buckets(limiter, clock):
+    tight, loose = Rule('tight', '1/m'), Rule('loose', '5/m')
+    request = _request()
+    assert limiter.hit([tight, loose], request) == 0.0
+    for _ in range(3):
+        assert limiter.hit([tight, loose], request) > 0
+    # loose solo gastó el token del primer request
+    for _ in range(4):
+        assert limiter.hit([loose], request) == 0.0
+    assert limiter.hit([loose], request) > 0
+
+
+def test_buckets_are_partitioned_by_key(limiter, clock):
+    rules = [Rule('ip', '1/m', key=client_ip)]
+    assert limiter.hit(rules, _request('10.0.0.1')) == 0.0
+    assert limiter.hit(rules, _request('10.0.0.1')) > 0
+    assert limiter.hit(rules, _request('10.0.0.2')) == 0.0
+
+
+def test_rule_without_key_value_does_not_apply(limiter, clock):
+    rules = [Rule('session', '1/m', key=lambda request: None)]
+    request = _request()
+    assert limiter.hit(rules, request) == 0.0
+    assert limiter.hit(rules, request) == 0.0
+
+
+def test_async_hit_shares_state(limiter, clock):
+    rules = [Rule('test', '1/m')]
+    request = _request()
+    assert limiter.hit(rules, request) == 0.0
+    assert asyncio.run(limiter.ahit(rules, request)) > 0
+
+
+@override_settings(RATELIMIT_PROXY_COUNT=1)
+def test_client_ip_uses_trusted_proxy_entry():
+    request = _request('10.0.0.9', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2')
+    assert client_ip(request) == '2.2.2.2'
+
+
+@override_settings(RATELIMIT_PROXY_COUNT=0)
+def test_client_ip_ignores_forwarded_without_proxies():
+    request = _request('10.0.0.9', HTTP_X_FORWARDED_FOR='1.1.1.1')
+    assert client_ip(request) == '10.0.0.9'
+
+
+def test_decorator_returns_429_with_retry_after(clock):
+    caches['default'].clear()
+
+    @rate_limit(Rule('view', '1/m'), cache_alias='default')
+    def view(request):
+        return HttpResponse('ok')
+
+    assert view(_request()).status_code == 200
+    response = view(_request())
+    assert response.status_code == 429
+    assert response['Retry-After'] == '60'
+
+
+def test_async_decorator(clock):
+    caches['default'].clear()
+
+    @rate_limit(Rule('async-view', '1/m'), cache_alias='default')
+    async def view(request):
+        return HttpResponse('ok')
+
+    assert asyncio.run(view(_request())).status_code == 200
+    assert asyncio.run(view(_request())).status_code == 429
+
+
+def test_chat_session_key_ignores_body():
+    from apps.chat.views import _rate_limit_session_key
+
+    request = factory.post(
+        '/', data='{"message": "hola", "session_id": "rotado"}', content_type='application/json'
+    )
+    assert _rate_limit_session_key(request) is None
+    request.COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+    assert _rate_limit_session_key(request) == 'abc'
@@ -0,0 +1,110 @@
+"""
+{% responsive_image %}: <picture> con srcset por formato y <img> de
+respaldo cuando no hay variantes; build_variants() genera el manifest.
+"""
+import json
+
+import pytest
+from django.template import Context, Template
+from django.test import override_settings
+
+from apps.core import images
+
+# Sin collectstatic no hay manifest: {% static %} con el storage simple
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+MANIFEST = {
+    'img/logo.png': {
+        'width': 640,
+        'height': 320,
+        'sources': {
+            'avif': [
+                {'width': 160, 'height': 80, 'path': 'img/responsive/logo.aaa.160.avif'},
+                {'width': 640, 'height': 320, 'path': 'img/responsive/logo.aaa.640.avif'},
+            ],
+            'webp': [
+                {'width': 160, 'height': 80, 'path': 'img/responsive/logo.bbb.160.webp'},
+                {'width': 640, 'height': 320, 'path': 'img/responsive/logo.bbb.640.webp'},
+            ],
+        },
+    },
+}
+
+
+@pytest.fixture
+def source_dir(tmp_path, monkeypatch):
+    """RESPONSIVE_IMAGE_SOURCE_DIR temporal, sin el manifest del proceso en memoria."""
+    monkeypatch.setattr(images, '_manifest_cache', (None, {}))
+    with override_settings(RESPONSIVE_IMAGE_SOURCE_DIR=tmp_path, STORAGES=STORAGES):
+        yield tmp_path
+
+
+@pytest.fixture
+def manifest(source_dir):
+    target = images.output_dir()
+    target.mkdir()
+    (target / images.MANIFEST_NAME).write_text(json.dumps(MANIFEST), encoding='utf-8')
+    return MANIFEST
+
+
+def _render(source, **context):
+    return Template('{% load assets %}' + source).render(Context(context))
+
+
+def test_picture_with_srcset_per_format(manifest):
+    html = _render("{% responsive_image 'img/logo.png' alt='bestIA' sizes='160px' class='h-10' %}")
+    assert html == (
+        '<picture>'
+        '<source type="image/avif" srcset="/static/img/responsive/logo.aaa.160.avif 160w, '
+        '/static/img/responsive/logo.aaa.640.avif 640w" sizes="160px">'
+        '<source type="image/webp" srcset="/static/img/responsive/logo.bbb.160.webp 160w, '
+        '/static/img/responsive/logo.bbb.640.webp 640w" sizes="160px">'
+        '<img alt="bestIA" class="h-10" decoding="async" height="320" src="/static/img/logo.png" width="640">'
+        '</picture>'
+    )
+
+
+def test_explicit_dimensions_are_kept(manifest):
+    html = _render("{% responsive_image 'img/logo.png' width=100 height=50 %}")
+    assert 'height="50"' in html and 'width="100"' in html
+    assert 'width="640"' not in html
+
+
+def test_missing_variants_fall_back_to_img(manifest):
+    html = _render("{% responsive_image 'img/otra.png' alt='Otra' %}")
+    assert html == '<img alt="Otra" decoding="async" src="/static/img/otra.png">'
+
+
+def test_without_manifest_every_image_is_plain(source_dir):
+    assert images.load_manifest() == {}
+    assert _render("{% responsive_image 'img/logo.png' %}").startswith('<img ')
+
+
+def test_alt_is_escaped(source_dir):
+    html = _render("{% responsive_image 'img/logo.png' alt=alt %}", alt='"Tom & Jerry"')
+    assert 'alt="&quot;Tom &amp; Jerry&quot;"' in html
+
+
+def test_images_json_matches_manifest(manifest):
+    html = _render("{% responsive_images_json %}")
+    data = json.loads(html.split('>', 1)[1].rsplit('<', 1)[0])
+    assert data['/static/img/logo.png']['sources']['image/webp'] == (
+        '/static/img/responsive/logo.bbb.160.webp 160w, /static/img/responsive/logo.bbb.640.webp 640w'
+    )
+
+
+def test_build_variants_never_upscales(source_dir):
+    Image = pytest.importorskip('PIL.Image')
+    Image.new('RGB', (400, 200), 'white').save(source_dir / 'banner.png')
+    with override_settings(RESPONSIVE_IMAGE_FORMATS={'webp': 78}, RESPONSIVE_IMAGE_WIDTHS=[160, 320, 640]):
+        assert images.build_variants()['generated'] == 3
+        assert images.build_variants()['reused'] == 3
+
+    image = images.variants_for('img/banner.png')
+    assert (image['width'], image['height']) == (400, 200)
+    assert [(v['width'], v['height']) for v in image['sources']['webp']] == [(160, 80), (320, 160), (400, 200)]
+    for variant in image['sources']['webp']:
+        assert (source_dir / variant['path'].removeprefix('img/')).exists()
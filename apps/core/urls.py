@@ -10,4 +10,5 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('nosotros/', views.about, name='about'),
     path('privacidad/', views.privacy_policy, name='privacy'),
+    path('estado/', views.page_state, name='state'),
 ]
@@ -1,7 +1,16 @@
 """
 Core views - Home y páginas estáticas
+
+Las tres páginas tienen contexto estático: se sirven desde el caché de
+páginas (ver pagecache.py) o, pre-renderizadas, directo desde WhiteNoise
+(manage.py prerender). page_state entrega lo dinámico de esas páginas.
 """
-from django.shortcuts import render
+from django.contrib import messages
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+
+from .pagecache import cached_page
 
 
 def home(request):
@@ -14,14 +23,29 @@ def home(request):
         'meta_description': 'Ingeniería de Inteligencia Artificial para empresas. '
                            'Agentes autónomos, automatización, consultoría y formación profesional.',
     }
-    return render(request, 'pages/home.html', context)
+    return cached_page(request, 'pages/home.html', context)
 
 
 def about(request):
     """Vista de 'Nosotros' (si se separa de la home)"""
-    return render(request, 'pages/about.html')
+    return cached_page(request, 'pages/about.html')
 
 
 def privacy_policy(request):
     """Política de privacidad"""
-    return render(request, 'pages/privacy.html')
+    return cached_page(request, 'pages/privacy.html')
+
+
+@never_cache
+def page_state(request):
+    """
+    Estado dinámico de las páginas en caché o pre-renderizadas: token CSRF
+    (deja la cookie csrftoken) y mensajes pendientes, que quedan leídos.
+    """
+    return JsonResponse({
+        'csrf_token': get_token(request),
+        'messages': [
+            {'level': message.level_tag, 'text': str(message)}
+            for message in messages.get_messages(request)
+        ],
+    })
@@ -0,0 +1,22 @@
+"""
+Leads - Consultas críticas auditadas por `manage.py explain_hot_queries`
+"""
+from apps.core.hot_queries import register
+
+from .models import Lead
+
+
+@register('leads.admin')
+def admin_changelist():
+    return Lead.objects.order_by('-created_at')[:100]
+
+
+@register('leads.admin_by_status')
+def admin_by_status():
+    return Lead.objects.filter(status='new').order_by('-created_at')[:100]
+
+
+@register('leads.admin_by_interest')
+def admin_by_interest():
+    return Lead.objects.filter(interest='academy').order_by('-created_at')[:100]
+
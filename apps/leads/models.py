@@ -67,6 +67,12 @@ class Lead(models.Model):
         verbose_name = 'Lead'
         verbose_name_plural = 'Leads'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='lead_created_idx'),
+            # Filtros del admin (list_filter) con el orden por defecto
+            models.Index(fields=['status', '-created_at'], name='lead_status_created_idx'),
+            models.Index(fields=['interest', '-created_at'], name='lead_interest_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.company or 'Sin empresa'} ({self.get_interest_display()})"
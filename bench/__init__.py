@@ -0,0 +1,13 @@
+"""
+Benchmarks offline del sitio
+
+Levanta el sitio en un directorio temporal con un LLM falso (latencia,
+streaming y errores configurables; sin red ni API key) y mide rps,
+latencias p50/p95/p99 y consultas SQL por request de cada escenario:
+
+    python -m bench list
+    python -m bench run chat_api chat_stream --concurrency 16 --llm-latency 1.2
+    python -m bench compare bench/results/antes.json bench/results/despues.json
+
+Los resultados (JSON) quedan en bench/results/.
+"""
@@ -0,0 +1,328 @@
+"""
+Runner del benchmark
+
+    python -m bench run [escenarios...] [--concurrency 8] [--requests 200]
+    python -m bench compare base.json nuevo.json [--threshold 10]
+    python -m bench list
+"""
+import argparse
+import json
+import math
+import platform
+import re
+import subprocess
+import sys
+import os
+import threading
+import time
+import urllib.request
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bench.client import HttpSession
+from bench.config import FakeLLMConfig
+from bench.scenarios import SCENARIOS, Scenario
+from bench.server import BASE_DIR, LocalServer, metrics_request
+
+RESULTS_DIR = BASE_DIR / 'bench' / 'results'
+
+# Métricas comparadas y si "más es mejor"
+COMPARED = [
+    ('rps', True),
+    ('latency_ms.p50', False),
+    ('latency_ms.p95', False),
+    ('latency_ms.p99', False),
+    ('db_queries_per_request', False),
+    ('error_rate', False),
+]
+
+_SAMPLE = re.compile(r'^(?P<name>[a-z_]+)\{(?P<labels>[^}]*)\}\s+(?P<value>\S+)$')
+
+
+# -----------------------------------------------------------------------------
+# Métricas
+# -----------------------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil por rango más cercano (como apps.chat.stats)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def scrape_db_queries(base_url: str, token: Optional[str] = None) -> Dict[str, List[float]]:
+    """{vista: [suma de consultas, requests]} desde /metrics."""
+    with urllib.request.urlopen(metrics_request(base_url, token), timeout=10) as response:
+        text = response.read().decode('utf-8')
+    totals: Dict[str, List[float]] = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match or not match['name'].startswith('http_request_db_queries_'):
+            continue
+        view = re.search(r'view="([^"]*)"', match['labels'])
+        if not view:
+            continue
+        entry = totals.setdefault(view.group(1), [0.0, 0.0])
+        if match['name'].endswith('_sum'):
+            entry[0] += float(match['value'])
+        elif match['name'].endswith('_count'):
+            entry[1] += float(match['value'])
+    return totals
+
+
+def _db_queries_per_request(before, after, view: str) -> Optional[float]:
+    start, end = before.get(view, [0.0, 0.0]), after.get(view, [0.0, 0.0])
+    requests = end[1] - start[1]
+    if requests <= 0:
+        return None
+    return round((end[0] - start[0]) / requests, 2)
+
+
+# -----------------------------------------------------------------------------
+# Ejecución
+# -----------------------------------------------------------------------------
+
+def run_scenario(
+    base_url: str,
+    scenario: Scenario,
+    concurrency: int,
+    requests: int,
+    warmup: int,
+    metrics_token: Optional[str] = None
+) -> Dict:
+    """Ejecuta `requests` iteraciones repartidas entre `concurrency` workers."""
+    sessions = [HttpSession(base_url) for _ in range(concurrency)]
+    for session in sessions:
+        if scenario.setup:
+            scenario.setup(session)
+        for iteration in range(warmup // concurrency):
+            scenario.run(session, iteration)
+
+    before = scrape_db_queries(base_url, metrics_token)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    failures: Counter = Counter()
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker(session: HttpSession):
+        while True:
+            with lock:
+                iteration = next(counter, None)
+            if iteration is None:
+                return
+            try:
+                status, _, elapsed = scenario.run(session, iteration)
+            except Exception as e:
+                with lock:
+                    failures[type(e).__name__] += 1
+                session.close()
+                continue
+            with lock:
+                statuses[status] += 1
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(session,)) for session in sessions]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    after = scrape_db_queries(base_url, metrics_token)
+    for session in sessions:
+        session.close()
+
+    errors = sum(failures.values()) + sum(
+        count for status, count in statuses.items() if status >= 400
+    )
+    return {
+        'description': scenario.description,
+        'view': scenario.view,
+        'requests': requests,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4) if requests else 0.0,
+        'status': {str(status): count for status, count in sorted(statuses.items())},
+        'exceptions': dict(failures),
+        'duration_s': round(duration, 3),
+        'rps': round(len(latencies) / duration, 2) if duration else 0.0,
+        'latency_ms': {
+            'mean': round(1000 * sum(latencies) / len(latencies), 2) if latencies else None,
+            **{
+                name: round(1000 * percentile(latencies, q), 2) if latencies else None
+                for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+            },
+            'max': round(1000 * max(latencies), 2) if latencies else None,
+        },
+        'db_queries_per_request': _db_queries_per_request(before, after, scenario.view),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_report(results: Dict) -> None:
+    print(f"\n{'escenario':<14} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql/req':>8} {'errores':>8}")
+    for name, result in results['scenarios'].items():
+        latency = result['latency_ms']
+        print(
+            f"{name:<14} {result['rps']:>8} {_fmt(latency['p50'])} {_fmt(latency['p95'])} "
+            f"{_fmt(latency['p99'])} {_fmt(result['db_queries_per_request'])} {result['errors']:>8}"
+        )
+
+
+def _fmt(value) -> str:
+    return f"{'-' if value is None else value:>8}"
+
+
+def command_run(args) -> int:
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Escenarios desconocidos: {', '.join(unknown)} (ver `python -m bench list`)", file=sys.stderr)
+        return 2
+
+    fake_config = FakeLLMConfig(
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        ttft=args.llm_ttft,
+        chunks=args.llm_chunks,
+        error_rate=args.llm_error_rate,
+        seed=args.seed,
+    )
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        metrics_token = args.metrics_token
+    else:
+        server = LocalServer(fake_config, workers=args.workers, server=args.server).start()
+        base_url = server.url
+        metrics_token = server.metrics_token
+        print(f"Servidor {server.server} en {base_url} (logs: {server.log_path})")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'url': args.url,
+            'server': server.server if server else None,
+            'workers': args.workers if server else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'fake_llm': fake_config.as_env(),
+        },
+        'scenarios': {},
+    }
+    try:
+        for name in names:
+            print(f"- {name}...", flush=True)
+            results['scenarios'][name] = run_scenario(
+                base_url, SCENARIOS[name], args.concurrency, args.requests, args.warmup, metrics_token
+            )
+    finally:
+        if server:
+            server.stop()
+
+    _print_report(results)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nResultados: {out}")
+    return 0
+
+
+def _lookup(result: Dict, path: str):
+    value = result
+    for key in path.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def command_compare(args) -> int:
+    base = json.loads(Path(args.base).read_text())
+    new = json.loads(Path(args.new).read_text())
+    regressions = []
+    print(f"{'escenario':<14} {'métrica':<24} {'base':>10} {'nuevo':>10} {'cambio':>9}")
+    for name, result in new['scenarios'].items():
+        previous = base['scenarios'].get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            old_value, new_value = _lookup(previous, metric), _lookup(result, metric)
+            if old_value is None or new_value is None:
+                continue
+            if old_value == 0:
+                change = 0.0 if new_value == 0 else float('inf')
+            else:
+                change = 100 * (new_value - old_value) / old_value
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > args.threshold:
+                flag = '  REGRESIÓN'
+                regressions.append((name, metric))
+            print(f"{name:<14} {metric:<24} {old_value:>10} {new_value:>10} {change:>+8.1f}%{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} regresión(es) sobre {args.threshold:g}%")
+        return 1
+    return 0
+
+
+def command_list(args) -> int:
+    for name, scenario in SCENARIOS.items():
+        print(f"{name:<14} {scenario.description}")
+    return 0
+
+
+def main(argv=None) -> int:
+    defaults = FakeLLMConfig()
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Benchmarks del sitio (offline)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Ejecuta escenarios contra un servidor local')
+    run.add_argument('scenarios', nargs='*', help='Escenarios (por defecto, todos)')
+    run.add_argument('--concurrency', type=int, default=8)
+    run.add_argument('--requests', type=int, default=200, help='Requests medidos por escenario')
+    run.add_argument('--warmup', type=int, default=10, help='Requests de calentamiento por escenario')
+    run.add_argument('--workers', type=int, default=2, help='Workers de uvicorn')
+    run.add_argument('--server', choices=['uvicorn', 'runserver'], help='Por defecto uvicorn si está instalado')
+    run.add_argument('--url', help='Usar un servidor ya levantado (con bench.asgi o bench.runserver)')
+    run.add_argument(
+        '--metrics-token', default=os.environ.get('METRICS_TOKEN'),
+        help='METRICS_TOKEN del servidor de --url (por defecto, el del entorno)'
+    )
+    run.add_argument('--llm-latency', type=float, default=defaults.latency)
+    run.add_argument('--llm-jitter', type=float, default=defaults.jitter)
+    run.add_argument('--llm-ttft', type=float, default=defaults.ttft)
+    run.add_argument('--llm-chunks', type=int, default=defaults.chunks)
+    run.add_argument('--llm-error-rate', type=float, default=defaults.error_rate)
+    run.add_argument('--seed', type=int)
+    run.add_argument('--out', help='Archivo JSON (por defecto bench/results/<fecha>.json)')
+    run.set_defaults(handler=command_run)
+
+    compare = commands.add_parser('compare', help='Compara dos resultados JSON')
+    compare.add_argument('base')
+    compare.add_argument('new')
+    compare.add_argument('--threshold', type=float, default=10.0, help='Regresión máxima tolerada (%%)')
+    compare.set_defaults(handler=command_compare)
+
+    commands.add_parser('list', help='Lista los escenarios').set_defaults(handler=command_list)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
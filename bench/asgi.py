@@ -0,0 +1,19 @@
+"""
+Aplicación ASGI del sitio con los fakes del LLM instalados (benchmarks).
+
+    python -m uvicorn bench.asgi:application --workers 4
+
+La lanza bench/server.py; los parámetros del fake vienen del entorno
+(ver bench/fakes.py).
+"""
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bestia_site.settings')
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+
+from bench import fakes  # noqa: E402
+
+# Antes de cargar las apps: el stand-in de genai debe estar listo
+fakes.install()
+application = get_asgi_application()
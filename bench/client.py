@@ -0,0 +1,92 @@
+"""
+Cliente HTTP mínimo para los benchmarks (solo biblioteca estándar)
+
+Una HttpSession por worker del runner: conexión keep-alive, cookies
+(sesión de Django, csrftoken) y cuerpo leído completo, incluido el stream
+SSE de /chat/api/stream/.
+"""
+import http.client
+import json
+import time
+from http.cookies import SimpleCookie
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+
+class HttpSession:
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.cookies: Dict[str, str] = {}
+        self.state: Dict = {}  # datos del escenario (session_id, contadores, etc.)
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, bytes, float]:
+        """Retorna (status, cuerpo, segundos). Reintenta una vez si el keep-alive se cortó."""
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{name}={value}" for name, value in self.cookies.items())
+        for attempt in (1, 2):
+            connection = self._connect()
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt == 2:
+                    raise
+                continue
+            elapsed = time.perf_counter() - started
+            self._store_cookies(response)
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+            return response.status, content, elapsed
+
+    def get(self, path: str, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post_json(self, path: str, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        return self.request('POST', path, body=json.dumps(payload).encode('utf-8'), headers={
+            'Content-Type': 'application/json', **(headers or {})
+        })
+
+    def post_form(self, path: str, data: Dict, headers: Optional[Dict[str, str]] = None):
+        """POST de formulario con el token CSRF de la cookie (ver ensure_csrf)."""
+        return self.request('POST', path, body=urlencode(data).encode('utf-8'), headers={
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-CSRFToken': self.cookies.get('csrftoken', ''),
+            'X-Requested-With': 'XMLHttpRequest',
+            **(headers or {})
+        })
+
+    def ensure_csrf(self, path: str) -> None:
+        """Obtiene la cookie csrftoken visitando una página con formulario."""
+        if 'csrftoken' not in self.cookies:
+            self.get(path)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._connection
+
+    def _store_cookies(self, response) -> None:
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
@@ -0,0 +1,74 @@
+"""
+Parámetros del LLM falso (sin dependencias de Django)
+
+El runner los pasa al servidor como variables de entorno:
+
+    BENCH_LLM_LATENCY=0.8      mediana de la latencia total (segundos)
+    BENCH_LLM_JITTER=0.3       sigma de la distribución log-normal
+    BENCH_LLM_TTFT=0.25        fracción de la latencia hasta el primer fragmento
+    BENCH_LLM_CHUNKS=8         fragmentos por respuesta en streaming
+    BENCH_LLM_ERROR_RATE=0.0   probabilidad de error por llamada
+    BENCH_SEED=                semilla (resultados reproducibles)
+"""
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+class FakeUpstreamError(RuntimeError):
+    """Error sintético del upstream (BENCH_LLM_ERROR_RATE)."""
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.8
+    jitter: float = 0.3
+    ttft: float = 0.25
+    chunks: int = 8
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+    rng: random.Random = field(default_factory=random.Random, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.seed is not None:
+            self.rng.seed(self.seed)
+
+    @classmethod
+    def from_env(cls) -> 'FakeLLMConfig':
+        seed = os.environ.get('BENCH_SEED')
+        return cls(
+            latency=float(os.environ.get('BENCH_LLM_LATENCY', 0.8)),
+            jitter=float(os.environ.get('BENCH_LLM_JITTER', 0.3)),
+            ttft=float(os.environ.get('BENCH_LLM_TTFT', 0.25)),
+            chunks=max(1, int(os.environ.get('BENCH_LLM_CHUNKS', 8))),
+            error_rate=float(os.environ.get('BENCH_LLM_ERROR_RATE', 0.0)),
+            seed=int(seed) if seed else None,
+        )
+
+    def as_env(self) -> dict:
+        env = {
+            'BENCH_LLM_LATENCY': str(self.latency),
+            'BENCH_LLM_JITTER': str(self.jitter),
+            'BENCH_LLM_TTFT': str(self.ttft),
+            'BENCH_LLM_CHUNKS': str(self.chunks),
+            'BENCH_LLM_ERROR_RATE': str(self.error_rate),
+        }
+        if self.seed is not None:
+            env['BENCH_SEED'] = str(self.seed)
+        return env
+
+    def sample_latency(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return self.latency
+        return self.rng.lognormvariate(0, self.jitter) * self.latency
+
+    def maybe_fail(self) -> None:
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise FakeUpstreamError('error sintético del LLM (benchmark)')
+
+    def answer(self, prompt: str) -> str:
+        words = prompt.split()[-12:]
+        return 'Respuesta sintética de benchmark sobre: ' + ' '.join(words)
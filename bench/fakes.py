@@ -0,0 +1,207 @@
+"""
+Fakes del LLM para benchmarks (sin red ni API key)
+
+- FakeLLMProvider: PlaceholderLLMProvider con latencia sintética y tasa
+  de errores (ChatService, /chat/message/)
+- install_fake_genai(): reemplaza google.generativeai por un stand-in con
+  la misma superficie que usa el sitio (configure, GenerativeModel,
+  start_chat, send_message[_async] con y sin stream, generate_content,
+  embed_content, get_model). Cubre /chat/api/, el streaming SSE, los
+  resúmenes de memoria y el warm-up de gunicorn.
+
+Los parámetros (latencia, streaming, errores) vienen del entorno: ver
+bench/config.py.
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+import types
+from typing import List, Optional
+
+from apps.chat.services import LLMResponse, Message, PlaceholderLLMProvider
+
+from bench.config import FakeLLMConfig
+
+FAKE_MODEL = 'bench-fake'
+
+
+class FakeLLMProvider(PlaceholderLLMProvider):
+    """PlaceholderLLMProvider con latencia y errores sintéticos."""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig.from_env()
+
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        delay = self.config.sample_latency()
+        time.sleep(delay)
+        self.config.maybe_fail()
+        return self._response(messages)
+
+    async def agenerate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> LLMResponse:
+        await asyncio.sleep(self.config.sample_latency())
+        self.config.maybe_fail()
+        return self._response(messages)
+
+    def _response(self, messages: List[Message]) -> LLMResponse:
+        prompt = ' '.join(message.content for message in messages)
+        content = self.config.answer(messages[-1].content if messages else '')
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return LLMResponse(
+            content=content,
+            model=FAKE_MODEL,
+            tokens_used={
+                'prompt': prompt_tokens,
+                'completion': completion_tokens,
+                'total': prompt_tokens + completion_tokens,
+            },
+            finish_reason='stop'
+        )
+
+
+# -----------------------------------------------------------------------------
+# Stand-in de google.generativeai
+# -----------------------------------------------------------------------------
+
+def _usage(prompt: str, text: str):
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+    return types.SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=completion_tokens,
+        total_token_count=prompt_tokens + completion_tokens,
+    )
+
+
+class FakeResponse:
+    """Respuesta de Gemini: .text, .usage_metadata e iteración por fragmentos."""
+
+    def __init__(self, config: FakeLLMConfig, prompt: str, delay: float = 0.0):
+        self.config = config
+        self.text = config.answer(prompt)
+        self.usage_metadata = _usage(prompt, self.text)
+        self._delay = delay
+
+    def _chunks(self):
+        size = max(1, -(-len(self.text) // self.config.chunks))
+        return [self.text[i:i + size] for i in range(0, len(self.text), size)]
+
+    def _pauses(self, count: int):
+        first = self._delay * self.config.ttft
+        rest = (self._delay - first) / max(1, count - 1)
+        return [first] + [rest] * (count - 1)
+
+    def __iter__(self):
+        chunks = self._chunks()
+        for chunk, pause in zip(chunks, self._pauses(len(chunks))):
+            time.sleep(pause)
+            yield types.SimpleNamespace(text=chunk, usage_metadata=self.usage_metadata)
+
+    async def __aiter__(self):
+        chunks = self._chunks()
+        for chunk, pause in zip(chunks, self._pauses(len(chunks))):
+            await asyncio.sleep(pause)
+            yield types.SimpleNamespace(text=chunk, usage_metadata=self.usage_metadata)
+
+
+class FakeChatSession:
+    def __init__(self, config: FakeLLMConfig, history):
+        self.config = config
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False, **kwargs):
+        delay = self.config.sample_latency()
+        self.config.maybe_fail()
+        if stream:
+            return FakeResponse(self.config, str(content), delay)
+        time.sleep(delay)
+        return FakeResponse(self.config, str(content))
+
+    async def send_message_async(self, content, stream=False, **kwargs):
+        delay = self.config.sample_latency()
+        self.config.maybe_fail()
+        if stream:
+            # La espera ocurre al iterar (primer fragmento tras ttft)
+            return FakeResponse(self.config, str(content), delay)
+        await asyncio.sleep(delay)
+        return FakeResponse(self.config, str(content))
+
+
+class FakeGenerativeModel:
+    config = FakeLLMConfig()
+
+    def __init__(self, model_name=None, system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def start_chat(self, history=None, **kwargs):
+        return FakeChatSession(self.config, history)
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.config.sample_latency())
+        self.config.maybe_fail()
+        return FakeResponse(self.config, str(contents))
+
+    async def generate_content_async(self, contents, **kwargs):
+        await asyncio.sleep(self.config.sample_latency())
+        self.config.maybe_fail()
+        return FakeResponse(self.config, str(contents))
+
+
+def _fake_embed_content(model=None, content=None, task_type=None, **kwargs):
+    texts = content if isinstance(content, list) else [content]
+    vectors = []
+    for text in texts:
+        rng = random.Random(hash(text))
+        vectors.append([rng.uniform(-1, 1) for _ in range(768)])
+    return {'embedding': vectors if isinstance(content, list) else vectors[0]}
+
+
+def install_fake_genai(config: Optional[FakeLLMConfig] = None) -> types.ModuleType:
+    """
+    Reemplaza las funciones de google.generativeai por el stand-in (o
+    registra un módulo falso si el paquete no está instalado). Llamar antes
+    de atender requests.
+    """
+    FakeGenerativeModel.config = config or FakeLLMConfig.from_env()
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        genai = types.ModuleType('google.generativeai')
+        google = sys.modules.setdefault('google', types.ModuleType('google'))
+        google.generativeai = genai
+        sys.modules['google.generativeai'] = genai
+
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.get_model = lambda name, **kwargs: types.SimpleNamespace(name=name)
+    genai.embed_content = _fake_embed_content
+    return genai
+
+
+def install(config: Optional[FakeLLMConfig] = None) -> FakeLLMConfig:
+    """
+    Instala todos los fakes: genai y el proveedor de ChatService
+    (get_llm_provider -> FakeLLMProvider).
+    """
+    from apps.chat import services
+
+    config = config or FakeLLMConfig.from_env()
+    install_fake_genai(config)
+    os.environ.setdefault('GOOGLE_API_KEY', 'bench-fake-key')
+    provider = FakeLLMProvider(config)
+    services.get_llm_provider = lambda: provider
+    return config
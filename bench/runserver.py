@@ -0,0 +1,22 @@
+"""
+`manage.py runserver` con los fakes del LLM instalados: alternativa a
+bench/asgi.py cuando uvicorn no está disponible (un solo proceso).
+
+    python -m bench.runserver 127.0.0.1:8123
+"""
+import os
+import sys
+
+
+def main():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bestia_site.settings')
+    from django.core.management import execute_from_command_line
+
+    from bench import fakes
+    fakes.install()
+
+    execute_from_command_line(['manage.py', 'runserver', '--noreload', *sys.argv[1:]])
+
+
+if __name__ == '__main__':
+    main()
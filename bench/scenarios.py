@@ -0,0 +1,119 @@
+"""
+Escenarios del benchmark
+
+Cada escenario ejecuta un request por iteración con la HttpSession de su
+worker. `setup` corre una vez por worker, fuera de la medición (cookies
+CSRF, sesión de chat con historial). `view` es el nombre de la vista en
+/metrics, para calcular las consultas SQL por request.
+"""
+import json
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from bench.client import HttpSession
+
+# Preguntas frecuentes: se repiten, como en producción (aciertos de caché)
+QUESTIONS = [
+    '¿Cuánto cuesta el programa de IAlfabetización?',
+    '¿Dónde están ubicados?',
+    '¿Qué es un agente autónomo con RAG?',
+    '¿Hacen automatización de procesos con IA?',
+    'Quiero hablar con un humano',
+    '¿Cuánto dura el curso?',
+    '¿Trabajan con empresas fuera de Puerto Montt?',
+    '¿Qué incluye la consultoría estratégica?',
+]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    view: str
+    run: Callable[[HttpSession, int], tuple]
+    setup: Optional[Callable[[HttpSession], None]] = None
+    description: str = ''
+
+
+def _question(iteration: int) -> str:
+    return QUESTIONS[iteration % len(QUESTIONS)]
+
+
+def home(session: HttpSession, iteration: int):
+    return session.get('/')
+
+
+def chat_message(session: HttpSession, iteration: int):
+    """Conversación por /chat/message/ (ChatService); reutiliza la sesión."""
+    payload = {'message': _question(iteration)}
+    if session.state.get('chat_session_id'):
+        payload['session_id'] = session.state['chat_session_id']
+    status, body, elapsed = session.post_json('/chat/message/', payload)
+    if status == 200 and 'chat_session_id' not in session.state:
+        session.state['chat_session_id'] = json.loads(body)['session_id']
+    return status, body, elapsed
+
+
+def chat_api(session: HttpSession, iteration: int):
+    """Conversación por /chat/api/ (Gemini); la sesión viaja en la cookie."""
+    return session.post_json('/chat/api/', {'message': _question(iteration)})
+
+
+def chat_stream(session: HttpSession, iteration: int):
+    """Streaming SSE: el tiempo medido es hasta el último evento."""
+    return session.post_json('/chat/api/stream/', {'message': _question(iteration)})
+
+
+def history_setup(session: HttpSession) -> None:
+    """Sesión con 20 turnos para leer su historial."""
+    for iteration in range(20):
+        chat_message(session, iteration)
+
+
+def chat_history(session: HttpSession, iteration: int):
+    return session.get(f"/chat/history/?session_id={session.state['chat_session_id']}&limit=50")
+
+
+def contact_setup(session: HttpSession) -> None:
+    session.ensure_csrf('/leads/contact/')
+
+
+def contact(session: HttpSession, iteration: int):
+    return session.post_form('/leads/contact/', {
+        'name': 'Benchmark',
+        'email': f"bench-{uuid.uuid4().hex[:12]}@example.com",
+        'company': 'bestIA Bench',
+        'interest': 'solutions',
+        'message': 'Solicitud de diagnóstico generada por el benchmark.',
+    })
+
+
+def waitlist_setup(session: HttpSession) -> None:
+    session.ensure_csrf('/leads/contact/')
+
+
+def waitlist(session: HttpSession, iteration: int):
+    # Email único por request: la lista de espera no admite duplicados
+    return session.post_form('/academy/waitlist/', {
+        'email': f"waitlist-{uuid.uuid4().hex[:12]}@example.com",
+        'name': 'Benchmark',
+    })
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in [
+        Scenario('home', 'core:home', home, description='GET / (template)'),
+        Scenario('chat_message', 'chat:send_message', chat_message,
+                 description='POST /chat/message/ (ChatService + FakeLLMProvider)'),
+        Scenario('chat_api', 'chat:api_chat', chat_api,
+                 description='POST /chat/api/ (Gemini falso, memoria, caché)'),
+        Scenario('chat_stream', 'chat:api_chat_stream', chat_stream,
+                 description='POST /chat/api/stream/ (SSE)'),
+        Scenario('chat_history', 'chat:history', chat_history, setup=history_setup,
+                 description='GET /chat/history/ (50 mensajes)'),
+        Scenario('contact', 'leads:contact', contact, setup=contact_setup,
+                 description='POST /leads/contact/ (AJAX)'),
+        Scenario('waitlist', 'academy:waitlist', waitlist, setup=waitlist_setup,
+                 description='POST /academy/waitlist/'),
+    ]
+}
@@ -0,0 +1,141 @@
+"""
+Servidor local para benchmarks
+
+Levanta el sitio en un directorio temporal (SQLite, caché compartido,
+métricas multiproceso, estáticos y datos del chat propios), aplica las
+migraciones, ejecuta collectstatic y espera a que responda. Usa uvicorn
+(como en producción) si está instalado y si no, runserver.
+"""
+import importlib.util
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional
+
+from bench.config import FakeLLMConfig
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def metrics_request(base_url: str, token: Optional[str] = None) -> urllib.request.Request:
+    """GET /metrics con el token (el endpoint responde 404 sin METRICS_TOKEN)."""
+    headers = {'Authorization': f"Bearer {token}"} if token else {}
+    return urllib.request.Request(f"{base_url}/metrics", headers=headers)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """Proceso del sitio con los fakes del LLM, aislado en un directorio temporal."""
+
+    def __init__(
+        self,
+        fake_config: FakeLLMConfig,
+        workers: int = 2,
+        server: Optional[str] = None,
+        port: Optional[int] = None,
+        extra_env: Optional[Dict[str, str]] = None
+    ):
+        self.fake_config = fake_config
+        self.workers = workers
+        self.server = server or ('uvicorn' if importlib.util.find_spec('uvicorn') else 'runserver')
+        self.port = port or free_port()
+        self.extra_env = extra_env or {}
+        self.metrics_token = secrets.token_urlsafe(16)
+        self.workdir: Optional[Path] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.log_path: Optional[Path] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def environment(self) -> Dict[str, str]:
+        workdir = self.workdir
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'bestia_site.settings',
+            'DATABASE_URL': f"sqlite:///{workdir / 'bench.sqlite3'}",
+            'ALLOWED_HOSTS': '127.0.0.1,localhost',
+            'DEBUG': 'False',
+            'GOOGLE_API_KEY': 'bench-fake-key',
+            'CHAT_DATA_DIR': str(workdir / 'chat'),
+            'SHARED_CACHE_DIR': str(workdir / 'cache'),
+            'PROMETHEUS_MULTIPROC_DIR': str(workdir / 'prometheus'),
+            'STATIC_ROOT': str(workdir / 'static'),
+            # Los límites por cliente/IP medirían el rate limiter, no el sitio
+            'RATELIMIT_ENABLED': 'False',
+            'METRICS_TOKEN': self.metrics_token,
+            'PYTHONPATH': os.pathsep.join(filter(None, [str(BASE_DIR), os.environ.get('PYTHONPATH')])),
+        }
+        env.update(self.fake_config.as_env())
+        env.update(self.extra_env)
+        return env
+
+    def command(self):
+        if self.server == 'uvicorn':
+            return [
+                sys.executable, '-m', 'uvicorn', 'bench.asgi:application',
+                '--host', '127.0.0.1', '--port', str(self.port),
+                '--workers', str(self.workers), '--log-level', 'warning', '--no-access-log',
+            ]
+        return [sys.executable, '-m', 'bench.runserver', f"127.0.0.1:{self.port}"]
+
+    def start(self, timeout: float = 60.0) -> 'LocalServer':
+        self.workdir = Path(tempfile.mkdtemp(prefix='bestia-bench-'))
+        (self.workdir / 'prometheus').mkdir()
+        env = self.environment()
+        # Como en el build: con DEBUG=False {% static %} necesita el manifest
+        for command in (['migrate'], ['collectstatic']):
+            subprocess.run(
+                [sys.executable, 'manage.py', *command, '--noinput', '-v', '0'],
+                cwd=BASE_DIR, env=env, check=True
+            )
+        self.log_path = self.workdir / 'server.log'
+        with open(self.log_path, 'wb') as log:
+            self.process = subprocess.Popen(
+                self.command(), cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+        self._wait_ready(timeout)
+        return self
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.workdir is not None:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _wait_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"El servidor terminó al iniciar:\n{self.log_path.read_text()[-2000:]}")
+            try:
+                urllib.request.urlopen(metrics_request(self.url, self.metrics_token), timeout=2).read()
+                return
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"El servidor no respondió en {timeout:.0f} s")
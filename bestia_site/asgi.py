@@ -1,5 +1,14 @@
 """
 ASGI config for bestia_site project.
+
+Despliegue recomendado (vistas de chat async, cientos de llamadas LLM
+concurrentes por proceso):
+
+    gunicorn bestia_site.asgi:application -k uvicorn_worker.UvicornWorker
+
+Desarrollo local:
+
+    uvicorn bestia_site.asgi:application --reload
 """
 import os
 from django.core.asgi import get_asgi_application
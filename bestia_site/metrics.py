@@ -0,0 +1,201 @@
+"""
+Métricas Prometheus del sitio
+
+- latencia por vista (RequestMetricsMiddleware)
+- tiempo en BD, render de templates y llamadas al LLM por request
+  (fases acumuladas en un ContextVar y observadas al terminar el request)
+- GET /metrics en formato de texto de Prometheus
+
+Con varios workers de gunicorn cada proceso escribe sus métricas en
+PROMETHEUS_MULTIPROC_DIR (modo multiprocess de prometheus_client) y
+/metrics las agrega; gunicorn.conf.py define el directorio, lo limpia al
+arrancar y marca los workers que terminan.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+)
+
+# Buckets en segundos: requests normales (ms) hasta turnos de chat con LLM
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latencia de los requests por vista',
+    ['view', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Tiempo en consultas SQL por request',
+    ['view'], buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Consultas SQL por request',
+    ['view'], buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_TEMPLATE_TIME = Histogram(
+    'http_request_template_seconds', 'Tiempo de render de templates por request',
+    ['view'], buckets=LATENCY_BUCKETS
+)
+LLM_LATENCY = Histogram(
+    'chat_llm_duration_seconds', 'Duración de cada llamada al LLM',
+    ['view', 'outcome'], buckets=LATENCY_BUCKETS
+)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class RequestPhases:
+    """Tiempos acumulados de un request (BD, templates, LLM)."""
+
+    def __init__(self):
+        self.view = UNRESOLVED_VIEW
+        self.seconds: Dict[str, float] = {}
+        self.db_queries = 0
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+
+_current: ContextVar[Optional[RequestPhases]] = ContextVar('request_phases', default=None)
+
+
+def start_request() -> tuple:
+    """Abre el registro de fases del request. Retorna (fases, token del ContextVar)."""
+    phases = RequestPhases()
+    return phases, _current.set(phases)
+
+
+def finish_request(phases: RequestPhases, token, method: str, status: int, elapsed: float) -> None:
+    _current.reset(token)
+    view = phases.view
+    REQUEST_LATENCY.labels(view, method, f"{status // 100}xx").observe(elapsed)
+    REQUEST_DB_TIME.labels(view).observe(phases.seconds.get('db', 0.0))
+    REQUEST_DB_QUERIES.labels(view).observe(phases.db_queries)
+    if 'template' in phases.seconds:
+        REQUEST_TEMPLATE_TIME.labels(view).observe(phases.seconds['template'])
+
+
+def set_view(view: str) -> None:
+    phases = _current.get()
+    if phases is not None:
+        phases.view = view
+
+
+def current_view() -> str:
+    phases = _current.get()
+    return phases.view if phases is not None else UNRESOLVED_VIEW
+
+
+@contextmanager
+def phase(name: str):
+    """Suma la duración del bloque a la fase `name` del request en curso."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = _current.get()
+        if phases is not None:
+            phases.add(name, time.perf_counter() - started)
+
+
+@contextmanager
+def llm_phase(view: Optional[str] = None):
+    """
+    Mide una llamada al LLM (histograma propio, también fuera de requests).
+    `view` etiqueta llamadas hechas después de que el request terminó
+    (respuestas streaming).
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        with phase('llm'):
+            yield
+        outcome = 'ok'
+    finally:
+        LLM_LATENCY.labels(view or current_view(), outcome).observe(time.perf_counter() - started)
+
+
+# -----------------------------------------------------------------------------
+# Base de datos: execute_wrapper en cada conexión nueva
+# -----------------------------------------------------------------------------
+
+def _time_query(execute, sql, params, many, context):
+    phases = _current.get()
+    if phases is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        phases.add('db', time.perf_counter() - started)
+        phases.db_queries += 1
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_query_timer, dispatch_uid='bestia_site.metrics.query_timer')
+
+
+# -----------------------------------------------------------------------------
+# Templates: backend que mide el render
+# -----------------------------------------------------------------------------
+
+class InstrumentedTemplate:
+    """Envoltorio de un template del backend: mide render() como fase 'template'."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with phase('template'):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates con medición del tiempo de render (TEMPLATES['BACKEND'])."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+# -----------------------------------------------------------------------------
+# Endpoint /metrics
+# -----------------------------------------------------------------------------
+
+def metrics_view(request):
+    """
+    Métricas en formato de texto de Prometheus.
+    Exige "Authorization: Bearer <METRICS_TOKEN>"; sin token configurado
+    solo responde con DEBUG (404 en producción).
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif request.headers.get('Authorization') != f"Bearer {token}":
+        return HttpResponse(status=401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,54 @@
+"""
+Middleware del proyecto
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    """
+    Latencia por vista y desglose (BD, templates, LLM) para /metrics.
+    Sync y async: bajo ASGI no fuerza un cambio de contexto por request.
+
+    Va después de WhiteNoise: los archivos estáticos no se miden.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        phases, token = metrics.start_request()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.finish_request(phases, token, request.method, status, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        phases, token = metrics.start_request()
+        status = 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.finish_request(phases, token, request.method, status, time.perf_counter() - started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match is not None:
+            metrics.set_view(request.resolver_match.view_name)
+        return None
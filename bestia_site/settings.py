@@ -43,9 +43,10 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Antes de staticfiles: su collectstatic genera además las variantes de imágenes
+    'apps.core',
     'django.contrib.staticfiles',
     # Local apps
-    'apps.core',
     'apps.leads',
     'apps.academy',
     'apps.chat',
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Static files in production
+    'bestia_site.middleware.RequestMetricsMiddleware',  # Latencias para /metrics
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -66,7 +68,8 @@ ROOT_URLCONF = 'bestia_site.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (/metrics)
+        'BACKEND': 'bestia_site.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # Global templates directory
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,20 +84,73 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'bestia_site.wsgi.application'
+ASGI_APPLICATION = 'bestia_site.asgi.application'
 
 # =============================================================================
 # DATABASE
 # =============================================================================
 
 # Default to SQLite for local development
+# Bajo ASGI las conexiones persistentes no se reciclan entre requests:
+# usar DB_CONN_MAX_AGE=0 (default) o un pooler externo (PgBouncer).
 DATABASES = {
     'default': dj_database_url.config(
         default=config('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3'),
-        conn_max_age=600,
+        conn_max_age=config('DB_CONN_MAX_AGE', default=0, cast=int),
         conn_health_checks=True,
     )
 }
 
+# =============================================================================
+# CACHE
+# =============================================================================
+
+# 'default': memoria local del proceso. 'shared': común a todos los workers
+# (rate limiting, contadores): Redis si hay REDIS_URL (requiere el paquete
+# redis), o archivos en el host.
+REDIS_URL = config('REDIS_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('SHARED_CACHE_DIR', default=str(BASE_DIR / 'var' / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# =============================================================================
+# RATE LIMITING (token buckets en CACHES['shared'])
+# =============================================================================
+
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+RATELIMIT_CACHE = config('RATELIMIT_CACHE', default='shared')
+# Proxies confiables delante de la app (X-Forwarded-For); 0 = usar REMOTE_ADDR
+RATELIMIT_PROXY_COUNT = config('RATELIMIT_PROXY_COUNT', default=0, cast=int)
+
+# =============================================================================
+# CACHÉ DE PÁGINAS (apps.core.pagecache)
+# =============================================================================
+
+# HTML de home/nosotros/privacidad en CACHES[PAGE_CACHE]; la clave incluye el
+# hash del manifest de estáticos y de los templates (cada deploy invalida).
+# Desactivado en DEBUG para ver los cambios de templates al guardar.
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=not DEBUG, cast=bool)
+PAGE_CACHE = config('PAGE_CACHE', default='shared')
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=86400, cast=int)
+
+# =============================================================================
+# MÉTRICAS (Prometheus, GET /metrics)
+# =============================================================================
+
+# /metrics exige "Authorization: Bearer <METRICS_TOKEN>"; si no se define,
+# /metrics responde 404 salvo con DEBUG
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # =============================================================================
 # PASSWORD VALIDATION
 # =============================================================================
@@ -121,10 +177,126 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATIC_ROOT = Path(config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles')))
+
+# WhiteNoise configuration for production (nombres con hash + .gz/.br).
+# Django 5.1 ya no lee STATICFILES_STORAGE: el backend va en STORAGES.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Variantes responsivas de static/img (apps.core.images): las genera
+# collectstatic en static/img/responsive/ y las usa {% responsive_image %}.
+# RESPONSIVE_IMAGE_FORMATS: formato -> calidad.
+RESPONSIVE_IMAGE_SOURCE_DIR = BASE_DIR / 'static' / 'img'
+RESPONSIVE_IMAGE_STATIC_PREFIX = 'img/'
+RESPONSIVE_IMAGE_WIDTHS = [160, 320, 640, 960, 1280]
+RESPONSIVE_IMAGE_FORMATS = {'avif': 55, 'webp': 78}
+
+# Tailwind compilado en el build (manage.py build_tailwind -> static/css/tailwind.css).
+# TAILWIND_CLI: binario standalone ya instalado; si no, se descarga TAILWIND_VERSION.
+TAILWIND_CLI = config('TAILWIND_CLI', default='')
+TAILWIND_VERSION = config('TAILWIND_VERSION', default='v3.4.17')
+# sha256 de los binarios de TAILWIND_VERSION (sha256sums.txt del release), por
+# asset: "tailwindcss-linux-x64=<sha256>,...". Sin hash fijado para la
+# plataforma no se descarga nada; al cambiar la versión hay que actualizarlos.
+TAILWIND_SHA256 = dict(
+    item.split('=', 1) for item in config('TAILWIND_SHA256', default='', cast=Csv()) if '=' in item
+)
+
+# Páginas pre-renderizadas (manage.py prerender, en el build): WhiteNoise las
+# sirve en su URL (index.html + .gz/.br) sin pasar por las vistas. Sin el
+# directorio (desarrollo) responden las vistas con el caché de páginas.
+PRERENDER_ROOT = Path(config('PRERENDER_ROOT', default=str(BASE_DIR / 'prerendered')))
+PRERENDER_PAGES = ['core:home', 'core:about', 'core:privacy', 'academy:program']
+if PRERENDER_ROOT.is_dir():
+    WHITENOISE_ROOT = PRERENDER_ROOT
+    WHITENOISE_INDEX_FILE = True
+
+# =============================================================================
+# CHAT (LLM / RAG)
+# =============================================================================
+
+# Directorio para datos locales del chatbot (índices, stamps de caché, etc.)
+CHAT_DATA_DIR = config('CHAT_DATA_DIR', default=str(BASE_DIR / 'var' / 'chat'))
+
+# Rate limiting de los endpoints de chat ("N/s", "N/m", "N/h"): por sesión,
+# por IP y global (protege la cuota del LLM y el pool de workers)
+CHAT_RATE_LIMIT_SESSION = config('CHAT_RATE_LIMIT_SESSION', default='10/m')
+CHAT_RATE_LIMIT_IP = config('CHAT_RATE_LIMIT_IP', default='30/m')
+CHAT_RATE_LIMIT_GLOBAL = config('CHAT_RATE_LIMIT_GLOBAL', default='600/m')
+
+# Caché de respuestas (preguntas frecuentes)
+CHAT_RESPONSE_CACHE_TTL = config('CHAT_RESPONSE_CACHE_TTL', default=3600, cast=int)
+CHAT_RESPONSE_CACHE_MAX_ENTRIES = config('CHAT_RESPONSE_CACHE_MAX_ENTRIES', default=512, cast=int)
+
+# LLM de ChatService: 'placeholder' (sin API) o 'gemini'
+CHAT_LLM_PROVIDER = config('CHAT_LLM_PROVIDER', default='placeholder')
+# Resiliencia de llamadas al LLM: deadline por llamada (segundos), llamada
+# de respaldo tras el p95 de latencia, y circuit breaker por proveedor
+CHAT_LLM_TIMEOUT = config('CHAT_LLM_TIMEOUT', default=20.0, cast=float)
+CHAT_LLM_HEDGE = config('CHAT_LLM_HEDGE', default=True, cast=bool)
+CHAT_LLM_BREAKER_THRESHOLD = config('CHAT_LLM_BREAKER_THRESHOLD', default=3, cast=int)
+CHAT_LLM_BREAKER_RESET = config('CHAT_LLM_BREAKER_RESET', default=30.0, cast=float)
+# El warm-up de cada worker (gunicorn post_worker_init) llena el pool de
+# modelos sin red; con True además consulta el modelo principal a la API
+# (un round-trip bloqueante por worker, falla visible al arrancar)
+GEMINI_WARM_UP_PING = config('GEMINI_WARM_UP_PING', default=False, cast=bool)
+
+# Límite de llamadas concurrentes al LLM en todo el host (file locks en
+# CHAT_DATA_DIR, compartidos por workers web y chat_worker). Sin slot libre
+# se espera en una cola acotada; con la cola llena o tras
+# CHAT_LLM_QUEUE_TIMEOUT se responde 503. 0 = sin límite.
+CHAT_LLM_MAX_CONCURRENCY = config('CHAT_LLM_MAX_CONCURRENCY', default=8, cast=int)
+CHAT_LLM_QUEUE_SIZE = config('CHAT_LLM_QUEUE_SIZE', default=16, cast=int)
+CHAT_LLM_QUEUE_TIMEOUT = config('CHAT_LLM_QUEUE_TIMEOUT', default=10.0, cast=float)
+
+# Modo asíncrono: los turnos se encolan (ChatJob) y los ejecuta
+# `manage.py chat_worker`; el cliente hace polling de /chat/jobs/<id>/
+CHAT_ASYNC_JOBS = config('CHAT_ASYNC_JOBS', default=False, cast=bool)
+# Segundos tras los cuales un trabajo 'running' se considera huérfano
+CHAT_JOB_TIMEOUT = config('CHAT_JOB_TIMEOUT', default=300, cast=int)
+# Espera máxima del long-polling (segundos)
+CHAT_JOB_MAX_WAIT = config('CHAT_JOB_MAX_WAIT', default=25, cast=float)
+# Cada cuántos segundos chat_worker actualiza ChatDailyStats (0 = nunca;
+# también `manage.py rollup_chat_stats`)
+CHAT_STATS_ROLLUP_INTERVAL = config('CHAT_STATS_ROLLUP_INTERVAL', default=300, cast=int)
+
+# Presupuesto de tokens del prompt (system + contexto RAG + mensaje); los
+# documentos de menor score se recortan o descartan para no excederlo
+CHAT_PROMPT_TOKEN_BUDGET = config('CHAT_PROMPT_TOKEN_BUDGET', default=3000, cast=int)
+# Espacio mínimo para incluir un documento recortado
+CHAT_PROMPT_MIN_DOCUMENT_TOKENS = config('CHAT_PROMPT_MIN_DOCUMENT_TOKENS', default=64, cast=int)
+
+# Deadlines (segundos) de las etapas previas al LLM, que corren en paralelo;
+# si la recuperación se atrasa se responde sin RAG. Una etapa vencida sigue
+# ocupando su worker hasta terminar: CHAT_PIPELINE_WORKERS debe cubrir los
+# turnos síncronos concurrentes (2 etapas cada uno) más las abandonadas
+CHAT_RETRIEVAL_TIMEOUT = config('CHAT_RETRIEVAL_TIMEOUT', default=1.5, cast=float)
+CHAT_HISTORY_TIMEOUT = config('CHAT_HISTORY_TIMEOUT', default=1.0, cast=float)
+CHAT_PIPELINE_WORKERS = config('CHAT_PIPELINE_WORKERS', default=4, cast=int)
+
+# Memoria de conversación: turnos recientes textuales dentro de un
+# presupuesto de tokens; el resto se resume en ChatSession.summary
+CHAT_MEMORY_TOKEN_BUDGET = config('CHAT_MEMORY_TOKEN_BUDGET', default=1500, cast=int)
+CHAT_MEMORY_MAX_TURNS = config('CHAT_MEMORY_MAX_TURNS', default=6, cast=int)
+CHAT_MEMORY_SUMMARY_MAX_CHARS = config('CHAT_MEMORY_SUMMARY_MAX_CHARS', default=2000, cast=int)
 
-# WhiteNoise configuration for production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# RAG: 'placeholder' (sin RAG), 'numpy' (índice exacto mapeado en memoria)
+# o 'ivf' (índice aproximado para bases de conocimiento grandes)
+CHAT_VECTOR_STORE = config('CHAT_VECTOR_STORE', default='placeholder')
+# IVF: listas (0 = sqrt(N)), listas evaluadas por query (recall vs latencia)
+# y tamaño mínimo bajo el cual la búsqueda sigue siendo exacta
+CHAT_IVF_NLIST = config('CHAT_IVF_NLIST', default=0, cast=int)
+CHAT_IVF_NPROBE = config('CHAT_IVF_NPROBE', default=8, cast=int)
+CHAT_IVF_MIN_TRAIN_SIZE = config('CHAT_IVF_MIN_TRAIN_SIZE', default=1024, cast=int)
+# Recuperación: 'vector' (solo embeddings), 'lexical' (BM25) o 'hybrid'
+CHAT_RETRIEVAL_MODE = config('CHAT_RETRIEVAL_MODE', default='vector')
+# Peso del score vectorial en modo híbrido (1 - alpha para BM25)
+CHAT_HYBRID_ALPHA = config('CHAT_HYBRID_ALPHA', default=0.5, cast=float)
+# Embeddings: 'hashing' (local, sin API) o 'gemini'
+CHAT_EMBEDDER = config('CHAT_EMBEDDER', default='hashing')
 
 # =============================================================================
 # DEFAULT PRIMARY KEY FIELD TYPE
@@ -4,10 +4,15 @@ URL configuration for bestia_site project.
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     # Admin
     path('admin/', admin.site.urls),
     
+    # Métricas Prometheus
+    path('metrics', metrics_view, name='metrics'),
+    
     # Apps
     path('', include('apps.core.urls')),           # Home y páginas estáticas
     path('leads/', include('apps.leads.urls')),    # Formularios de contacto
@@ -0,0 +1,37 @@
+"""
+Configuración de pytest (sin pytest-django)
+
+Settings del sitio con una base SQLite y directorios de datos temporales,
+sin API key ni Redis. El fixture `db` aplica las migraciones una vez.
+
+    pip install pytest
+    python -m pytest
+"""
+import os
+import tempfile
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix='bestia-tests-')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bestia_site.settings')
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_TMP_DIR}/db.sqlite3",
+    SHARED_CACHE_DIR=os.path.join(_TMP_DIR, 'cache'),
+    CHAT_DATA_DIR=os.path.join(_TMP_DIR, 'chat'),
+    REDIS_URL='',
+    ALLOWED_HOSTS='testserver,localhost,127.0.0.1',
+    GOOGLE_API_KEY='',
+)
+
+import django  # noqa: E402
+
+django.setup()
+
+
+@pytest.fixture(scope='session')
+def db():
+    """Base de pruebas migrada (compartida por la sesión de pytest)."""
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
@@ -0,0 +1,33 @@
+"""
+Configuración de gunicorn (se carga automáticamente desde el directorio de trabajo).
+"""
+import os
+import shutil
+from pathlib import Path
+
+# Métricas Prometheus agregadas entre workers: cada worker escribe en este
+# directorio (prometheus_client multiprocess) y /metrics las combina. Se
+# define aquí, en el master, antes de que los workers importen Django.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', str(Path(__file__).resolve().parent / 'var' / 'prometheus')
+)
+
+
+def on_starting(server):
+    """Descarta las métricas de una ejecución anterior."""
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def post_worker_init(worker):
+    """Warm-up por worker: configura Gemini y su cliente antes del primer request."""
+    from apps.chat.gemini import registry
+
+    registry.warm_up()
+
+
+def child_exit(server, worker):
+    """Archiva las métricas del worker que terminó (gauges 'live*')."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
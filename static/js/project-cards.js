@@ -78,6 +78,20 @@ const projectsData = [
     }
 ];
 
+// Variantes AVIF/WebP de las imágenes locales ({% responsive_images_json %} en home.html)
+const responsiveImages = JSON.parse(document.getElementById('responsive-images')?.textContent || '{}');
+
+function responsivePicture(url, alt, attrs = '') {
+    const image = responsiveImages[url];
+    const size = image ? `width="${image.width}" height="${image.height}"` : '';
+    const img = `<img src="${url}" alt="${alt}" class="w-full h-full object-cover" decoding="async" ${size} ${attrs}>`;
+    if (!image) return img;
+    const sources = Object.entries(image.sources)
+        .map(([type, srcset]) => `<source type="${type}" srcset="${srcset}" sizes="(min-width: 768px) 50vw, 100vw">`)
+        .join('');
+    return `<picture class="block w-full h-full">${sources}${img}</picture>`;
+}
+
 class ImageCarousel {
     constructor(images, elementId) {
         this.images = images;
@@ -94,11 +108,7 @@ class ImageCarousel {
         const slidesHtml = this.images.map((url, index) => `
             <div class="absolute inset-0 transition-opacity duration-500 ease-in-out ${index === 0 ? 'opacity-100 z-10' : 'opacity-0 z-0'}" 
                  data-index="${index}">
-                <img src="${url}" 
-                     alt="Project screenshot ${index + 1}" 
-                     class="w-full h-full object-cover"
-                     ${index === 0 ? '' : 'loading="lazy"'}
-                >
+                ${responsivePicture(url, `Project screenshot ${index + 1}`, index === 0 ? '' : 'loading="lazy"')}
                 <div class="absolute inset-0 bg-gradient-to-t from-surface-dark/90 via-transparent to-transparent"></div>
             </div>
         `).join('');